@@ -60,6 +60,9 @@ export const cocktailApi = {
     search?: string;
     filter?: string;
     page?: number;
+    limit?: number;
+    cursor?: string;
+    fields?: string;
   }): Promise<ApiResponseType<Cocktail[]>> => {
     try {
       const response = await api.get('/api/cocktails/', { params });
@@ -76,6 +79,26 @@ export const cocktailApi = {
     }
   },
 
+  // Full-text search, ranked by relevance
+  searchCocktails: async (q: string, params?: {
+    limit?: number;
+    fields?: string;
+  }): Promise<ApiResponseType<Cocktail[]>> => {
+    try {
+      const response = await api.get('/api/cocktails/search/', { params: { q, ...params } });
+      return {
+        success: true,
+        data: response.data,
+      };
+    } catch (error) {
+      console.error('Error searching cocktails:', error);
+      return {
+        success: false,
+        error: 'Failed to search cocktails',
+      };
+    }
+  },
+
   // Get a single cocktail by ID
   getCocktail: async (id: number): Promise<ApiResponseType<Cocktail>> => {
     try {
@@ -125,6 +148,26 @@ export const cocktailApi = {
       };
     }
   },
+
+  // Favorite, unfavorite or delete many cocktails in one transaction
+  bulkUpdateCocktails: async (
+    action: 'favorite' | 'unfavorite' | 'delete',
+    ids: number[]
+  ): Promise<ApiResponseType<{ requested: number; affected: number }>> => {
+    try {
+      const response = await api.post('/api/cocktails/bulk/', { action, ids });
+      return {
+        success: true,
+        data: response.data,
+      };
+    } catch (error) {
+      console.error('Error updating cocktails:', error);
+      return {
+        success: false,
+        error: 'Failed to update cocktails',
+      };
+    }
+  },
 };
 
 export default api;
\ No newline at end of file
@@ -15,10 +15,13 @@ export interface Cocktail {
   ingredients: string;
   musical_ambiance: string;
   image_prompt: string;
+  image_url?: string | null;
+  thumbnail_url?: string | null;
   music_suggestions?: MusicSuggestion;
   user_request: string;
   created_at: string;
   is_favorite: boolean;
+  search_rank?: number | null;
 }
 
 export interface CocktailRequest {
@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Cocktail
+from .ingredients import index_cocktail_ingredients
+from .models import Cocktail, GenerationJob, Ingredient
+from .search import search_filter, search_terms
+from .versions import cocktails_changed, ingredients_changed
 
 
 @admin.register(Cocktail)
@@ -17,7 +20,7 @@ class CocktailAdmin(admin.ModelAdmin):
             'fields': ('ingredients', 'musical_ambiance')
         }),
         ('IA et génération', {
-            'fields': ('user_request', 'image_prompt')
+            'fields': ('user_request', 'image_prompt', 'image_hash')
         }),
         ('Métadonnées', {
             'fields': ('created_at',),
@@ -27,3 +30,41 @@ class CocktailAdmin(admin.ModelAdmin):
     
     def get_queryset(self, request):
         return super().get_queryset(request).order_by('-created_at')
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if not change or 'ingredients' in form.changed_data:
+            index_cocktail_ingredients([obj])
+        cocktails_changed([obj.pk])
+    
+    def delete_model(self, request, obj):
+        cocktail_id = obj.pk
+        super().delete_model(request, obj)
+        cocktails_changed([cocktail_id])
+        ingredients_changed()
+    
+    def delete_queryset(self, request, queryset):
+        ids = list(queryset.values_list('pk', flat=True))
+        super().delete_queryset(request, queryset)
+        cocktails_changed(ids)
+        ingredients_changed()
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Même index plein texte que l'API plutôt qu'un icontains par champ
+        terms = search_terms(search_term)
+        if not terms:
+            return queryset, False
+        return queryset.filter(search_filter(terms)), False
+
+
+@admin.register(Ingredient)
+class IngredientAdmin(admin.ModelAdmin):
+    list_display = ('name',)
+    search_fields = ('name',)
+
+
+@admin.register(GenerationJob)
+class GenerationJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'attempts', 'worker', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind')
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
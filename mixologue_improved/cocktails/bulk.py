@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Modifications groupées des cocktails (favoris, suppressions)
+Chaque opération est une instruction UPDATE ou DELETE conditionnelle
+exécutée dans une transaction : pas de save() de toutes les colonnes, donc
+pas de course lecture-modification-écriture entre deux requêtes
+simultanées. Seuls les identifiants concernés sont relus, pour n'invalider
+que les versions de cocktails existants (voir versions.py). Les identifiants
+sont traités par paquets de CHUNK_SIZE pour rester sous la limite de
+paramètres des bases.
+"""
+
+import logging
+from typing import Any, Iterator, List, Optional
+from django.db import transaction
+from django.db.models import Case, Value, When
+from .models import Cocktail
+from .similarity import request_index
+from .versions import cocktails_changed, ingredients_changed
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+ACTIONS = ('favorite', 'unfavorite', 'delete')
+
+
+def parse_ids(value: Any, max_ids: int) -> List[int]:
+    """
+    Valide une liste d'identifiants de cocktails.
+
+    Args:
+        value: Liste reçue dans le corps de la requête
+        max_ids: Nombre maximal d'identifiants acceptés
+
+    Returns:
+        Identifiants distincts, dans l'ordre reçu
+
+    Raises:
+        ValueError: Si la liste est absente, trop longue ou contient autre chose que des entiers
+    """
+    if not isinstance(value, list) or not value:
+        raise ValueError("Liste d'identifiants manquante")
+    if len(value) > max_ids:
+        raise ValueError(f"Maximum {max_ids} identifiants par requête")
+    if not all(isinstance(item, int) and not isinstance(item, bool) for item in value):
+        raise ValueError("Les identifiants doivent être des entiers")
+    return list(dict.fromkeys(value))
+
+
+def _chunks(ids: List[int]) -> Iterator[List[int]]:
+    for start in range(0, len(ids), CHUNK_SIZE):
+        yield ids[start:start + CHUNK_SIZE]
+
+
+def set_favorite(ids: List[int], is_favorite: bool) -> int:
+    """
+    Marque ou démarque des cocktails comme favoris.
+
+    Seules les lignes dont l'état change sont écrites
+    (UPDATE ... WHERE id IN (...) AND is_favorite <> valeur).
+
+    Returns:
+        Nombre de cocktails modifiés
+    """
+    updated, changed = 0, []
+    with transaction.atomic():
+        for chunk in _chunks(ids):
+            queryset = Cocktail.objects.filter(id__in=chunk).exclude(is_favorite=is_favorite)
+            chunk_changed = list(queryset.values_list('id', flat=True))
+            if chunk_changed:
+                updated += queryset.filter(id__in=chunk_changed).update(is_favorite=is_favorite)
+                changed.extend(chunk_changed)
+    if updated:
+        cocktails_changed(changed)
+    return updated
+
+
+def toggle_favorite(cocktail_id: int) -> Optional[bool]:
+    """
+    Inverse le statut favori d'un cocktail en une instruction UPDATE.
+
+    Returns:
+        Nouveau statut, ou None si le cocktail n'existe pas
+    """
+    with transaction.atomic():
+        updated = Cocktail.objects.filter(id=cocktail_id).update(
+            is_favorite=Case(When(is_favorite=True, then=Value(False)), default=Value(True))
+        )
+        if not updated:
+            return None
+        # La ligne reste verrouillée par l'UPDATE jusqu'à la fin de la transaction
+        is_favorite = Cocktail.objects.filter(id=cocktail_id).values_list('is_favorite', flat=True).first()
+    cocktails_changed([cocktail_id])
+    return is_favorite
+
+
+def delete_cocktails(ids: List[int]) -> int:
+    """
+    Supprime des cocktails et leurs lignes d'ingrédients.
+
+    Returns:
+        Nombre de cocktails supprimés
+    """
+    deleted, existing = 0, []
+    with transaction.atomic():
+        for chunk in _chunks(ids):
+            chunk_existing = list(Cocktail.objects.filter(id__in=chunk).values_list('id', flat=True))
+            if chunk_existing:
+                # only('id') : Django ne relit que les identifiants avant les DELETE en cascade
+                _, counts = Cocktail.objects.filter(id__in=chunk_existing).only('id').delete()
+                deleted += counts.get(Cocktail._meta.label, 0)
+                existing.extend(chunk_existing)
+    
+    for cocktail_id in existing:
+        request_index.remove(cocktail_id)
+    if deleted:
+        cocktails_changed(existing)
+        ingredients_changed()
+    logger.info(f"{deleted} cocktails supprimés ({len(ids)} demandés)")
+    return deleted
+
+
+def apply_action(action: str, ids: List[int]) -> int:
+    """
+    Applique une action groupée.
+
+    Args:
+        action: favorite, unfavorite ou delete
+        ids: Identifiants des cocktails
+
+    Returns:
+        Nombre de cocktails modifiés ou supprimés
+    """
+    if action == 'delete':
+        return delete_cocktails(ids)
+    return set_favorite(ids, action == 'favorite')
@@ -0,0 +1,380 @@
+# -*- coding: utf-8 -*-
+"""
+Backends de cache pour les résultats des modèles
+- SQLiteCache : cache persistant partagé par tous les workers d'un hôte,
+  qui survit aux redémarrages (un fichier SQLite en mode WAL).
+- TieredCache : LRU borné en mémoire du processus devant un cache partagé,
+  avec des compteurs de succès/échecs/évictions par espace de noms.
+"""
+
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.connection import ConnectionProxy
+
+# État partagé par toutes les instances d'un même cache dans le processus
+# (Django crée une instance de backend par thread, comme pour LocMemCache)
+_local_tiers: Dict[str, OrderedDict] = {}
+_local_locks: Dict[str, threading.Lock] = {}
+_tier_stats: Dict[str, Dict[str, Dict[str, int]]] = {}
+_shared_evictions: Dict[str, Dict[str, int]] = {}
+_stats_lock = threading.Lock()
+
+
+def key_namespace(key: str) -> str:
+    """
+    Espace de noms d'une clé de cache : son préfixe avant le premier ':'.
+
+    Args:
+        key: Clé brute (recipe:v1:..., health:ollama...)
+
+    Returns:
+        Nom de l'espace de noms ('default' si la clé n'a pas de préfixe)
+    """
+    return key.split(':', 1)[0] if ':' in key else 'default'
+
+
+class SQLiteCache(BaseCache):
+    """
+    Cache persistant stocké dans un fichier SQLite.
+
+    LOCATION est le chemin du fichier. Les valeurs sont sérialisées avec
+    pickle ; au-delà de MAX_ENTRIES, les entrées expirées puis celles qui
+    expirent le plus tôt sont supprimées (1/CULL_FREQUENCY des entrées).
+    add() est atomique entre processus, ce qui permet de l'utiliser comme
+    verrou (single-flight, sondes de santé) ; incr() aussi (versions des
+    données).
+    """
+    
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+    
+    def __init__(self, location: str, params: Dict[str, Any]):
+        super().__init__(params)
+        self.location = str(location)
+        self._connections = threading.local()
+        self._evictions = _shared_evictions.setdefault(self.location, defaultdict(int))
+    
+    # ------------------------------------------------------------------
+    # Connexion
+    # ------------------------------------------------------------------
+    
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._connections, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.location, timeout=10, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache_entries ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS cache_entries_expires ON cache_entries (expires)')
+            self._connections.connection = connection
+        return connection
+    
+    @staticmethod
+    def _alive_clause() -> str:
+        return '(expires IS NULL OR expires > ?)'
+    
+    def _dumps(self, value: Any) -> bytes:
+        return pickle.dumps(value, self.pickle_protocol)
+    
+    # ------------------------------------------------------------------
+    # API du cache
+    # ------------------------------------------------------------------
+    
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection().execute(
+            f'SELECT value FROM cache_entries WHERE key = ? AND {self._alive_clause()}',
+            (key, time.time())
+        ).fetchone()
+        if row is None:
+            return default
+        return pickle.loads(row[0])
+    
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        connection = self._connection()
+        connection.execute(
+            'INSERT OR REPLACE INTO cache_entries (key, value, expires) VALUES (?, ?, ?)',
+            (key, self._dumps(value), self.get_backend_timeout(timeout))
+        )
+        self._cull(connection)
+    
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        connection = self._connection()
+        # Une seule instruction : insertion, ou remplacement d'une entrée expirée
+        cursor = connection.execute(
+            'INSERT INTO cache_entries (key, value, expires) VALUES (?, ?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires '
+            'WHERE cache_entries.expires IS NOT NULL AND cache_entries.expires <= ?',
+            (key, self._dumps(value), self.get_backend_timeout(timeout), time.time())
+        )
+        added = cursor.rowcount == 1
+        if added:
+            self._cull(connection)
+        return added
+    
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        connection = self._connection()
+        # Lecture et écriture sous le même verrou d'écriture : atomique entre processus
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                f'SELECT value FROM cache_entries WHERE key = ? AND {self._alive_clause()}',
+                (key, time.time())
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            connection.execute('UPDATE cache_entries SET value = ? WHERE key = ?', (self._dumps(value), key))
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return value
+    
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection().execute(
+            f'UPDATE cache_entries SET expires = ? WHERE key = ? AND {self._alive_clause()}',
+            (self.get_backend_timeout(timeout), key, time.time())
+        )
+        return cursor.rowcount == 1
+    
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection().execute('DELETE FROM cache_entries WHERE key = ?', (key,))
+        return cursor.rowcount == 1
+    
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        rows = [(self.make_and_validate_key(key, version=version), self._dumps(value), expires)
+                for key, value in data.items()]
+        connection = self._connection()
+        # Une seule transaction (et un seul cull) plutôt qu'une écriture synchronisée par clé
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.executemany(
+                'INSERT OR REPLACE INTO cache_entries (key, value, expires) VALUES (?, ?, ?)', rows
+            )
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        self._cull(connection)
+        return []
+    
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection().execute(
+            f'SELECT 1 FROM cache_entries WHERE key = ? AND {self._alive_clause()}',
+            (key, time.time())
+        ).fetchone()
+        return row is not None
+    
+    def clear(self):
+        self._connection().execute('DELETE FROM cache_entries')
+    
+    def _cull(self, connection: sqlite3.Connection):
+        """Applique la limite MAX_ENTRIES après une écriture."""
+        count = connection.execute('SELECT COUNT(*) FROM cache_entries').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        
+        connection.execute('DELETE FROM cache_entries WHERE expires <= ?', (time.time(),))
+        count = connection.execute('SELECT COUNT(*) FROM cache_entries').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        
+        if self._cull_frequency == 0:
+            victims = connection.execute('SELECT key FROM cache_entries').fetchall()
+        else:
+            victims = connection.execute(
+                'SELECT key FROM cache_entries ORDER BY expires IS NULL, expires LIMIT ?',
+                (max(1, count // self._cull_frequency),)
+            ).fetchall()
+        connection.executemany('DELETE FROM cache_entries WHERE key = ?', victims)
+        
+        with _stats_lock:
+            for (key,) in victims:
+                # Clé stockée : <KEY_PREFIX>:<version>:<clé brute>
+                self._evictions[key_namespace(key.split(':', 2)[-1])] += 1
+    
+    def evictions(self) -> Dict[str, int]:
+        """Évictions par espace de noms effectuées par ce processus."""
+        with _stats_lock:
+            return dict(self._evictions)
+
+
+class TieredCache(BaseCache):
+    """
+    Cache à deux niveaux : LRU en mémoire devant un cache partagé.
+
+    LOCATION est l'alias (dans CACHES) du niveau partagé. Les écritures vont
+    dans les deux niveaux ; les lectures essaient d'abord le LRU local, puis
+    le niveau partagé, dont les succès sont recopiés localement. Une entrée
+    locale vit au plus LOCAL_TIMEOUT secondes, ce qui borne le décalage avec
+    les écritures des autres workers. add() ne passe que par le niveau
+    partagé pour rester atomique entre processus.
+
+    OPTIONS :
+        MAX_ENTRIES   : taille du LRU local (défaut 300)
+        LOCAL_TIMEOUT : durée de vie maximale d'une entrée locale (défaut 300)
+    """
+    
+    def __init__(self, location: str, params: Dict[str, Any]):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = location or 'default'
+        self.local_timeout = int(options.get('LOCAL_TIMEOUT', 300))
+        self._local = _local_tiers.setdefault(location, OrderedDict())
+        self._lock = _local_locks.setdefault(location, threading.Lock())
+        self._stats = _tier_stats.setdefault(location, defaultdict(lambda: defaultdict(int)))
+    
+    @property
+    def shared(self) -> BaseCache:
+        return caches[self.shared_alias]
+    
+    def _count(self, key: str, counter: str):
+        with _stats_lock:
+            self._stats[key_namespace(key)][counter] += 1
+    
+    # ------------------------------------------------------------------
+    # Niveau local (LRU)
+    # ------------------------------------------------------------------
+    
+    def _local_get(self, local_key: str):
+        with self._lock:
+            entry = self._local.get(local_key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.time():
+                del self._local[local_key]
+                return None
+            self._local.move_to_end(local_key)
+            return entry
+    
+    def _local_set(self, key: str, local_key: str, value: Any, timeout):
+        backend_timeout = self.get_backend_timeout(timeout)
+        expires = time.time() + self.local_timeout
+        if backend_timeout is not None:
+            expires = min(expires, backend_timeout)
+        
+        evicted = []
+        with self._lock:
+            # Valeur sérialisée, comme LocMemCache : l'appelant qui modifie
+            # l'objet renvoyé ne modifie pas l'entrée en cache
+            self._local[local_key] = (expires, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+            self._local.move_to_end(local_key)
+            while len(self._local) > self._max_entries:
+                evicted.append(self._local.popitem(last=False)[0])
+        
+        for evicted_key in evicted:
+            self._count(evicted_key.split(':', 2)[-1], 'local_evictions')
+    
+    def _local_delete(self, local_key: str):
+        with self._lock:
+            self._local.pop(local_key, None)
+    
+    # ------------------------------------------------------------------
+    # API du cache
+    # ------------------------------------------------------------------
+    
+    def get(self, key, default=None, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        entry = self._local_get(local_key)
+        if entry is not None:
+            self._count(key, 'local_hits')
+            return pickle.loads(entry[1])
+        
+        sentinel = object()
+        value = self.shared.get(key, sentinel, version=version)
+        if value is sentinel:
+            self._count(key, 'misses')
+            return default
+        
+        self._count(key, 'shared_hits')
+        self._local_set(key, local_key, value, self.local_timeout)
+        return value
+    
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        self.shared.set(key, value, timeout, version=version)
+        self._local_set(key, local_key, value, timeout)
+    
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.make_and_validate_key(key, version=version)
+        return self.shared.add(key, value, timeout, version=version)
+    
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._local_delete(self.make_and_validate_key(key, version=version))
+        return self.shared.touch(key, timeout, version=version)
+    
+    def delete(self, key, version=None):
+        self._local_delete(self.make_and_validate_key(key, version=version))
+        return self.shared.delete(key, version=version)
+    
+    def has_key(self, key, version=None):
+        if self._local_get(self.make_and_validate_key(key, version=version)) is not None:
+            return True
+        return self.shared.has_key(key, version=version)
+    
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+        self.shared.clear()
+    
+    # ------------------------------------------------------------------
+    # Statistiques
+    # ------------------------------------------------------------------
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Compteurs par espace de noms depuis le démarrage du processus.
+
+        Returns:
+            Dictionnaire {espace: {local_hits, shared_hits, misses,
+            local_evictions, shared_evictions, hit_rate}}
+        """
+        shared_evictions = getattr(self.shared, 'evictions', dict)()
+        with _stats_lock:
+            counters = {namespace: dict(values) for namespace, values in self._stats.items()}
+        
+        report = {}
+        for namespace in sorted(set(counters) | set(shared_evictions)):
+            values = counters.get(namespace, {})
+            hits = values.get('local_hits', 0) + values.get('shared_hits', 0)
+            lookups = hits + values.get('misses', 0)
+            report[namespace] = {
+                'local_hits': values.get('local_hits', 0),
+                'shared_hits': values.get('shared_hits', 0),
+                'misses': values.get('misses', 0),
+                'local_evictions': values.get('local_evictions', 0),
+                'shared_evictions': shared_evictions.get(namespace, 0),
+                'hit_rate': round(hits / lookups, 3) if lookups else None,
+            }
+        return report
+    
+    @property
+    def local_size(self) -> int:
+        return len(self._local)
+
+
+def get_llm_cache_alias() -> str:
+    """Alias du cache des résultats des modèles ('llm' s'il est configuré)."""
+    from django.conf import settings
+    return 'llm' if 'llm' in settings.CACHES else 'default'
+
+
+# Cache des résultats des modèles, à utiliser comme django.core.cache.cache
+llm_cache = ConnectionProxy(caches, get_llm_cache_alias())
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Clés de cache canoniques
+Les clés sont construites à partir de paramètres normalisés (casse, accents,
+espaces, ordre des ingrédients) puis condensées par SHA-256 : elles sont donc
+identiques d'un worker à l'autre et d'un redémarrage à l'autre, contrairement
+à hash() dont la graine change à chaque processus.
+"""
+
+import hashlib
+import json
+import unicodedata
+from typing import Any, Iterable, List
+
+# Version des gabarits de prompts : à incrémenter à chaque modification d'un
+# prompt pour ne plus servir les réponses générées avec l'ancien gabarit.
+PROMPT_TEMPLATE_VERSION = 1
+
+
+def normalize_text(value: Any) -> str:
+    """
+    Normalise un texte libre : minuscules, sans accents, espaces compactés.
+
+    Args:
+        value: Texte (ou valeur convertible en texte)
+
+    Returns:
+        Texte normalisé
+    """
+    text = unicodedata.normalize('NFKD', str(value))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.casefold().split())
+
+
+def normalize_ingredients(ingredients: Iterable[Any]) -> List[str]:
+    """
+    Normalise une liste d'ingrédients : chaque nom est normalisé, les
+    doublons et les entrées vides sont retirés, puis la liste est triée.
+
+    Args:
+        ingredients: Liste d'ingrédients
+
+    Returns:
+        Liste canonique
+    """
+    return sorted({normalize_text(ingredient) for ingredient in ingredients} - {''})
+
+
+def make_cache_key(namespace: str, **params: Any) -> str:
+    """
+    Construit une clé de cache stable pour un espace de noms.
+
+    Les chaînes sont normalisées avec normalize_text ; les autres valeurs
+    (nombres, listes déjà canoniques, dictionnaires) sont sérialisées telles
+    quelles, avec les clés triées.
+
+    Args:
+        namespace: Préfixe lisible de la clé (recipe, suggestions...)
+        **params: Paramètres déterminant le résultat (modèle, options...)
+
+    Returns:
+        Clé de la forme "<namespace>:v<version>:<empreinte>"
+    """
+    canonical = {
+        name: normalize_text(value) if isinstance(value, str) else value
+        for name, value in params.items()
+    }
+    payload = json.dumps(canonical, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    digest = hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+    return f"{namespace}:v{PROMPT_TEMPLATE_VERSION}:{digest}"
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+Surveillance des dépendances IA (Ollama, Stable Diffusion)
+Ce module sonde les services en arrière-plan, partage leur état entre les
+workers via le cache Django et applique un disjoncteur (circuit breaker)
+pour que les vues échouent immédiatement lorsqu'un service est tombé.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# États du disjoncteur
+BREAKER_CLOSED = 'closed'        # Service sain, requêtes autorisées
+BREAKER_OPEN = 'open'            # Trop d'échecs, requêtes refusées
+BREAKER_HALF_OPEN = 'half_open'  # Délai écoulé, une seule requête d'essai à la fois
+
+
+def _probe_url(url: str, timeout: float) -> None:
+    """Sonde HTTP : lève une exception si le service ne répond pas 200."""
+    from .ollama_service import get_http_session
+    
+    response = get_http_session().get(url, timeout=timeout)
+    if response.status_code != 200:
+        raise RuntimeError(f"HTTP {response.status_code}")
+
+
+class DependencyMonitor:
+    """
+    Moniteur de santé des dépendances avec disjoncteur.
+
+    L'état de chaque dépendance est stocké dans le cache sous forme de
+    dictionnaire (disponibilité, latence, échecs consécutifs, état du
+    disjoncteur) afin d'être partagé par tous les workers. Un thread démon
+    par processus sonde les dépendances ; un verrou de cache garantit qu'un
+    seul worker sonde une dépendance donnée à chaque intervalle.
+    """
+    
+    def __init__(self):
+        self.interval = getattr(settings, 'HEALTH_CHECK_INTERVAL', 15)
+        self.probe_timeout = getattr(settings, 'HEALTH_CHECK_TIMEOUT', 5)
+        self.failure_threshold = getattr(settings, 'CIRCUIT_BREAKER_THRESHOLD', 3)
+        self.cooldown = getattr(settings, 'CIRCUIT_BREAKER_COOLDOWN', 30)
+        self.probes: Dict[str, Callable[[], None]] = {}
+        self._thread = None
+        self._lock = threading.Lock()
+    
+    def register(self, name: str, probe: Callable[[], None]):
+        """
+        Enregistre une dépendance à surveiller.
+
+        Args:
+            name: Nom de la dépendance
+            probe: Fonction qui lève une exception si la dépendance est indisponible
+        """
+        self.probes[name] = probe
+    
+    # ------------------------------------------------------------------
+    # État partagé
+    # ------------------------------------------------------------------
+    
+    def _cache_key(self, name: str) -> str:
+        return f"health:{name}"
+    
+    def _trial_key(self, name: str) -> str:
+        # Verrou de la requête d'essai en semi-ouvert (expire si elle n'aboutit jamais)
+        return f"health:{name}:probe"
+    
+    def get_state(self, name: str) -> Dict[str, Any]:
+        """
+        Retourne l'état connu d'une dépendance, sans sonde en direct.
+
+        Args:
+            name: Nom de la dépendance
+
+        Returns:
+            Dictionnaire d'état (available vaut None tant qu'aucune sonde n'a abouti)
+        """
+        self.ensure_started()
+        return cache.get(self._cache_key(name)) or {
+            'available': None,
+            'latency_ms': None,
+            'last_check': None,
+            'last_error': None,
+            'consecutive_failures': 0,
+            'breaker': BREAKER_CLOSED,
+            'opened_at': None,
+        }
+    
+    def _save_state(self, name: str, state: Dict[str, Any]):
+        # L'état expire si plus aucun worker ne sonde
+        cache.set(self._cache_key(name), state, max(self.interval * 10, self.cooldown * 2))
+    
+    def record_success(self, name: str, latency: Optional[float] = None):
+        """
+        Enregistre un appel réussi : referme le disjoncteur.
+
+        Args:
+            name: Nom de la dépendance
+            latency: Durée de l'appel en secondes
+        """
+        state = self.get_state(name)
+        if state['available'] and state['breaker'] == BREAKER_CLOSED and latency is None:
+            return
+        
+        state.update({
+            'available': True,
+            'last_check': time.time(),
+            'last_error': None,
+            'consecutive_failures': 0,
+            'breaker': BREAKER_CLOSED,
+            'opened_at': None,
+        })
+        if latency is not None:
+            state['latency_ms'] = round(latency * 1000, 1)
+        self._save_state(name, state)
+        cache.delete(self._trial_key(name))
+    
+    def record_failure(self, name: str, error: str = ''):
+        """
+        Enregistre un échec : ouvre le disjoncteur au-delà du seuil.
+
+        Args:
+            name: Nom de la dépendance
+            error: Description de l'erreur
+        """
+        state = self.get_state(name)
+        state['available'] = False
+        state['last_check'] = time.time()
+        state['last_error'] = error[:200]
+        state['consecutive_failures'] += 1
+        
+        if (state['breaker'] == BREAKER_HALF_OPEN
+                or state['consecutive_failures'] >= self.failure_threshold):
+            if state['breaker'] != BREAKER_OPEN:
+                logger.warning(f"Disjoncteur ouvert pour {name}: {error}")
+            state['breaker'] = BREAKER_OPEN
+            state['opened_at'] = time.time()
+        self._save_state(name, state)
+        cache.delete(self._trial_key(name))
+    
+    # Versions pour les vues asynchrones : l'état est lu et écrit dans le
+    # cache SQLite (verrou jusqu'à 10 s), jamais sur la boucle d'événements
+    
+    async def arecord_success(self, name: str, latency: Optional[float] = None):
+        """Version asynchrone de record_success."""
+        await sync_to_async(self.record_success)(name, latency)
+    
+    async def arecord_failure(self, name: str, error: str = ''):
+        """Version asynchrone de record_failure."""
+        await sync_to_async(self.record_failure)(name, error)
+    
+    def allow_request(self, name: str) -> bool:
+        """
+        Indique si une requête vers la dépendance peut être tentée.
+
+        Le disjoncteur ouvert refuse les requêtes pendant CIRCUIT_BREAKER_COOLDOWN
+        secondes, puis passe en semi-ouvert : une seule requête (tous workers
+        confondus) sert de test, les autres sont refusées jusqu'à son résultat.
+
+        Args:
+            name: Nom de la dépendance
+
+        Returns:
+            False si la vue doit répondre 503 immédiatement
+        """
+        state = self.get_state(name)
+        if state['breaker'] == BREAKER_CLOSED:
+            return True
+        if (state['breaker'] == BREAKER_OPEN
+                and time.time() - (state['opened_at'] or 0) < self.cooldown):
+            return False
+        
+        # add() est atomique entre workers : un seul gagnant par essai
+        if not cache.add(self._trial_key(name), True, self.cooldown):
+            return False
+        if state['breaker'] == BREAKER_OPEN:
+            state['breaker'] = BREAKER_HALF_OPEN
+            self._save_state(name, state)
+        return True
+    
+    def retry_after(self, name: str) -> int:
+        """Nombre de secondes avant la prochaine tentative (en-tête Retry-After)."""
+        state = self.get_state(name)
+        if state['breaker'] == BREAKER_HALF_OPEN:
+            return 1  # Requête d'essai en cours
+        if state['breaker'] != BREAKER_OPEN:
+            return 0
+        remaining = self.cooldown - (time.time() - (state['opened_at'] or 0))
+        return max(1, int(remaining))
+    
+    # ------------------------------------------------------------------
+    # Sondes en arrière-plan
+    # ------------------------------------------------------------------
+    
+    def probe(self, name: str):
+        """Sonde une dépendance et met à jour son état partagé."""
+        started = time.monotonic()
+        try:
+            self.probes[name]()
+        except Exception as e:
+            self.record_failure(name, str(e))
+        else:
+            self.record_success(name, time.monotonic() - started)
+    
+    def _run(self):
+        while True:
+            for name in list(self.probes):
+                try:
+                    # Un seul worker sonde chaque dépendance par intervalle
+                    if cache.add(f"health:probe_lock:{name}", True, self.interval):
+                        self.probe(name)
+                except Exception as e:
+                    logger.error(f"Erreur du moniteur de santé ({name}): {e}")
+            time.sleep(self.interval)
+    
+    def ensure_started(self):
+        """Démarre le thread de sonde du processus courant s'il ne tourne pas."""
+        if not getattr(settings, 'HEALTH_MONITOR_ENABLED', True):
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='dependency-monitor', daemon=True)
+                self._thread.start()
+    
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """Retourne l'état de toutes les dépendances surveillées."""
+        return {name: self.get_state(name) for name in self.probes}
+
+
+# Instance globale du moniteur
+health_monitor = DependencyMonitor()
+health_monitor.register(
+    'ollama',
+    lambda: _probe_url(
+        f"{getattr(settings, 'OLLAMA_URL', 'http://ollama:11434')}/api/tags",
+        health_monitor.probe_timeout
+    )
+)
+health_monitor.register(
+    'stable_diffusion',
+    lambda: _probe_url(
+        f"{getattr(settings, 'STABLE_DIFFUSION_URL', 'http://localhost:7860')}/docs",
+        health_monitor.probe_timeout
+    )
+)
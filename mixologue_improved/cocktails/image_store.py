@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Stockage des images générées, adressé par contenu
+Chaque image est écrite une seule fois dans le stockage Django
+(default_storage, MEDIA_ROOT par défaut) sous l'empreinte SHA-256 de ses
+octets. L'URL d'une image ne change donc jamais et peut être mise en cache
+indéfiniment par les navigateurs et les proxys.
+
+En mode reproductible, la graine est dérivée du prompt et des paramètres
+de génération : une demande identique désigne la même image, retrouvée
+dans le cache partagé sans rappeler Stable Diffusion.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import re
+from typing import Any, Dict, Optional
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from .cache_keys import make_cache_key
+
+logger = logging.getLogger(__name__)
+
+IMAGE_DIR = 'cocktails/images'
+DIGEST_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+# Une URL d'image ne désigne jamais qu'un seul contenu
+IMAGE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def is_valid_digest(digest: str) -> bool:
+    """Vérifie qu'une empreinte est un SHA-256 hexadécimal (pas de chemin arbitraire)."""
+    return bool(DIGEST_PATTERN.match(digest or ''))
+
+
+def image_path(digest: str) -> str:
+    """Chemin de stockage d'une image (sous-dossier par préfixe d'empreinte)."""
+    return f"{IMAGE_DIR}/{digest[:2]}/{digest}.png"
+
+
+def image_url(digest: str, size: Optional[str] = None, fmt: Optional[str] = None) -> Optional[str]:
+    """
+    URL stable d'une image ou d'une de ses déclinaisons, ou None sans empreinte.
+
+    Args:
+        digest: Empreinte de l'image
+        size: Taille nommée (IMAGE_VARIANT_SIZES), None pour l'original
+        fmt: Format de la déclinaison, None pour le négocier selon l'en-tête Accept
+    """
+    if not digest:
+        return None
+    url = reverse('cocktails:image', args=[digest])
+    if size:
+        url += f"?size={size}" + (f"&format={fmt}" if fmt else '')
+    return url
+
+
+def save_image(image_base64: str) -> str:
+    """
+    Enregistre une image encodée en base64 si elle n'est pas déjà stockée.
+
+    Args:
+        image_base64: Image PNG encodée en base64 (réponse de Stable Diffusion)
+
+    Returns:
+        Empreinte SHA-256 de l'image
+    """
+    content = base64.b64decode(image_base64)
+    digest = hashlib.sha256(content).hexdigest()
+    path = image_path(digest)
+    
+    if not default_storage.exists(path):
+        saved = default_storage.save(path, ContentFile(content))
+        if saved != path:
+            # Écriture concurrente de la même image : le stockage a renommé la copie
+            default_storage.delete(saved)
+        logger.info(f"Image enregistrée: {path} ({len(content)} octets)")
+    return digest
+
+
+def read_image_base64(digest: str) -> Optional[str]:
+    """Contenu d'une image stockée, encodé en base64 (ancien format de réponse)."""
+    image = open_image(digest)
+    if image is None:
+        return None
+    with image:
+        return base64.b64encode(image.read()).decode('ascii')
+
+
+def open_image(digest: str):
+    """
+    Ouvre une image stockée.
+
+    Returns:
+        Fichier ouvert en lecture binaire, ou None si l'image est inconnue
+    """
+    if not is_valid_digest(digest):
+        return None
+    path = image_path(digest)
+    if not default_storage.exists(path):
+        return None
+    return default_storage.open(path, 'rb')
+
+
+# ----------------------------------------------------------------------
+# Cache d'images reproductibles
+# ----------------------------------------------------------------------
+
+def reproducible_seed(generation_params: Dict[str, Any]) -> int:
+    """
+    Graine déterminée par le prompt et les paramètres de génération.
+
+    Args:
+        generation_params: Paramètres txt2img (la graine éventuelle est ignorée)
+
+    Returns:
+        Graine positive sur 31 bits
+    """
+    params = {key: value for key, value in generation_params.items() if key != 'seed'}
+    payload = json.dumps(params, sort_keys=True, ensure_ascii=False)
+    return int(hashlib.sha256(payload.encode('utf-8')).hexdigest()[:8], 16) & 0x7fffffff
+
+
+def _image_cache_key(generation_params: Dict[str, Any]) -> str:
+    return make_cache_key('image', **generation_params)
+
+
+def find_cached_image(generation_params: Dict[str, Any]) -> Optional[str]:
+    """
+    Cherche une image déjà générée avec exactement ces paramètres (graine comprise).
+
+    Returns:
+        Empreinte de l'image, ou None si elle n'a pas été générée ou a disparu du stockage
+    """
+    digest = cache.get(_image_cache_key(generation_params))
+    if digest and default_storage.exists(image_path(digest)):
+        return digest
+    return None
+
+
+def remember_image(generation_params: Dict[str, Any], digest: str):
+    """Associe des paramètres de génération reproductibles à l'image obtenue."""
+    cache.set(_image_cache_key(generation_params), digest, getattr(settings, 'IMAGE_CACHE_TIMEOUT', 2592000))
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Déclinaisons des images générées (miniatures, WebP, AVIF)
+L'historique n'affiche que de petites images : chaque image stockée peut
+être servie dans une taille (IMAGE_VARIANT_SIZES) et un format plus légers.
+Le redimensionnement et l'encodage, coûteux en CPU, s'exécutent dans un
+pool de processus : les déclinaisons usuelles sont préparées en arrière-plan
+dès l'enregistrement de l'image, les autres à la première demande.
+"""
+
+import io
+import logging
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from .image_store import is_valid_digest, open_image
+
+try:
+    from PIL import Image, features
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+VARIANT_DIR = 'cocktails/variants'
+
+# Format -> (format Pillow, type MIME)
+VARIANT_FORMATS = {
+    'avif': ('AVIF', 'image/avif'),
+    'webp': ('WEBP', 'image/webp'),
+    'png': ('PNG', 'image/png'),
+}
+
+
+def supported_formats() -> Tuple[str, ...]:
+    """Formats d'encodage disponibles avec la version de Pillow installée."""
+    if not PIL_AVAILABLE:
+        return ()
+    return tuple(name for name in VARIANT_FORMATS if name == 'png' or features.check(name))
+
+
+def variant_sizes() -> Dict[str, int]:
+    """Tailles nommées -> côté maximal en pixels."""
+    return getattr(settings, 'IMAGE_VARIANT_SIZES', {'thumb': 128, 'card': 256})
+
+
+def negotiate_format(accept: str) -> str:
+    """
+    Choisit le format le plus léger accepté par le client (en-tête Accept).
+
+    Args:
+        accept: Valeur de l'en-tête Accept
+
+    Returns:
+        Nom du format (avif, webp ou png)
+    """
+    available = supported_formats()
+    for name in ('avif', 'webp'):
+        if name in available and VARIANT_FORMATS[name][1] in (accept or ''):
+            return name
+    return 'png'
+
+
+def variant_path(digest: str, size: str, fmt: str) -> str:
+    """Chemin de stockage d'une déclinaison."""
+    return f"{VARIANT_DIR}/{digest[:2]}/{digest}-{size}.{fmt}"
+
+
+def render_variant(content: bytes, max_side: int, fmt: str, quality: int) -> bytes:
+    """
+    Redimensionne et réencode une image (exécuté dans le pool de processus).
+
+    Args:
+        content: Octets de l'image d'origine
+        max_side: Côté maximal en pixels (proportions conservées)
+        fmt: Format de sortie (clé de VARIANT_FORMATS)
+        quality: Qualité d'encodage avec perte
+
+    Returns:
+        Octets de la déclinaison
+    """
+    with Image.open(io.BytesIO(content)) as image:
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, format=VARIANT_FORMATS[fmt][0], quality=quality, optimize=True)
+        return output.getvalue()
+
+
+class VariantRenderer:
+    """
+    Produit et stocke les déclinaisons d'images dans un pool de processus.
+
+    Les rendus en cours sont partagés : plusieurs requêtes demandant la même
+    déclinaison attendent le même calcul.
+    """
+    
+    def __init__(self):
+        self.workers = getattr(settings, 'IMAGE_VARIANT_WORKERS', 2)
+        self.quality = getattr(settings, 'IMAGE_VARIANT_QUALITY', 80)
+        self.timeout = getattr(settings, 'IMAGE_VARIANT_TIMEOUT', 30)
+        self._executor = None
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Créé paresseusement, après le fork des workers gunicorn
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+    
+    def _submit(self, digest: str, size: str, fmt: str) -> Optional[Future]:
+        """Lance (ou rejoint) le rendu d'une déclinaison absente du stockage."""
+        path = variant_path(digest, size, fmt)
+        with self._lock:
+            future = self._pending.get(path)
+            if future is not None:
+                return future
+            if default_storage.exists(path):
+                return None
+            
+            original = open_image(digest)
+            if original is None:
+                return None
+            with original:
+                content = original.read()
+            
+            future = self._get_executor().submit(render_variant, content, variant_sizes()[size], fmt, self.quality)
+            self._pending[path] = future
+        future.add_done_callback(lambda done: self._store(path, done))
+        return future
+    
+    def _store(self, path: str, future: Future):
+        try:
+            if default_storage.exists(path):
+                return
+            saved = default_storage.save(path, ContentFile(future.result()))
+            if saved != path:
+                default_storage.delete(saved)
+            logger.info(f"Déclinaison enregistrée: {path}")
+        except Exception as e:
+            logger.error(f"Échec de la déclinaison {path}: {e}")
+        finally:
+            with self._lock:
+                self._pending.pop(path, None)
+    
+    def is_valid(self, size: str, fmt: str) -> bool:
+        """Vérifie qu'une taille et un format peuvent être produits."""
+        return size in variant_sizes() and fmt in supported_formats()
+    
+    def open(self, digest: str, size: str, fmt: str):
+        """
+        Ouvre une déclinaison, en la produisant si elle n'existe pas encore.
+
+        Args:
+            digest: Empreinte de l'image d'origine
+            size: Taille nommée (clé de IMAGE_VARIANT_SIZES)
+            fmt: Format (avif, webp, png)
+
+        Returns:
+            Fichier ouvert en lecture binaire, ou None si l'image est inconnue
+            ou si la déclinaison ne peut pas être produite
+        """
+        if not is_valid_digest(digest) or not self.is_valid(size, fmt):
+            return None
+        
+        path = variant_path(digest, size, fmt)
+        future = self._submit(digest, size, fmt)
+        if future is not None:
+            try:
+                content = future.result(timeout=self.timeout)
+            except Exception as e:
+                logger.error(f"Échec de la déclinaison {path}: {e}")
+                return None
+            # Servie directement, sans attendre l'écriture par le callback
+            return ContentFile(content, name=path)
+        
+        if not default_storage.exists(path):
+            return None
+        return default_storage.open(path, 'rb')
+    
+    def schedule(self, digest: str):
+        """Prépare en arrière-plan les déclinaisons de IMAGE_VARIANT_PREGENERATE."""
+        if not PIL_AVAILABLE:
+            return
+        for size, fmt in getattr(settings, 'IMAGE_VARIANT_PREGENERATE', [('thumb', 'webp'), ('card', 'webp')]):
+            if self.is_valid(size, fmt):
+                self._submit(digest, size, fmt)
+
+
+# Instance globale du processus
+variant_renderer = VariantRenderer()
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Catalogue normalisé des ingrédients
+Cocktail.ingredients est un texte libre (une ligne par ingrédient). Ce module
+découpe chaque ligne en quantité et nom normalisé, alimente les tables
+Ingredient / CocktailIngredient à chaque création de cocktail, et répond aux
+recherches « qu'est-ce que je peux faire avec ce que j'ai » par des lectures
+de l'index inversé ingrédient -> cocktails au lieu de relire chaque recette.
+"""
+
+import logging
+import re
+from typing import Any, Dict, Iterable, List, Tuple
+from django.db import transaction
+from django.db.models import Count, F, Q
+from .cache_keys import normalize_text
+from .versions import ingredients_changed
+
+logger = logging.getLogger(__name__)
+
+NAME_MAX_LENGTH = 100
+
+# Unités reconnues après une quantité (texte normalisé, sans accents)
+UNITS = (
+    r'cl|ml|dl|l|oz|g|kg|cs|cc|cas|cac|tsp|tbsp|'
+    r'cuilleres? a (?:cafe|soupe)|barspoons?|bar spoons?|'
+    r'traits?|dash(?:es)?|gouttes?|drops?|pincees?|pinch(?:es)?|'
+    r'tranches?|slices?|rondelles?|quartiers?|wedges?|feuilles?|leaves|brins?|sprigs?|'
+    r'cubes?|mesures?|parts?|doses?|shots?'
+)
+INGREDIENT_PATTERN = re.compile(
+    r'^(?P<quantity>\d+(?:[.,]\d+)?(?:/\d+)?'
+    r'(?:\s*(?:-|a|to)\s*\d+(?:[.,]\d+)?)?'
+    rf'(?:\s*(?:{UNITS})\b\.?)?)'
+    r"\s*(?:(?:de |d'|of )\s*)?(?P<name>.+)$"
+)
+
+
+def parse_ingredient(line: str) -> Tuple[str, str]:
+    """
+    Découpe une ligne de recette en nom normalisé et quantité.
+
+    Args:
+        line: Ligne du champ ingredients ("4 cl de Gin", "Zeste de citron vert")
+
+    Returns:
+        Tuple (nom normalisé, quantité) ; nom vide si la ligne n'en contient pas
+    """
+    text = normalize_text(line).lstrip('-*• ').replace('’', "'").replace('⁄', '/')
+    # Précisions entre parenthèses : "gin (london dry)" -> "gin"
+    text = re.sub(r'\s*\([^)]*\)', '', text).strip(' .,;:')
+    match = INGREDIENT_PATTERN.match(text)
+    if match:
+        quantity, name = match.group('quantity').strip(), match.group('name')
+    else:
+        quantity, name = '', text
+    return name.strip(' .,;:')[:NAME_MAX_LENGTH], quantity
+
+
+def parse_ingredients(ingredients: Any) -> List[Tuple[str, str]]:
+    """Lignes (nom, quantité) d'un champ ingredients, sans doublon de nom."""
+    if isinstance(ingredients, (list, tuple)):
+        lines = [str(item) for item in ingredients]
+    else:
+        lines = str(ingredients or '').split('\n')
+    
+    parsed, seen = [], set()
+    for line in lines:
+        name, quantity = parse_ingredient(line)
+        if name and name not in seen:
+            seen.add(name)
+            parsed.append((name, quantity))
+    return parsed
+
+
+def index_cocktail_ingredients(cocktails: Iterable[Any]):
+    """
+    (Ré)écrit les lignes d'ingrédients normalisées de cocktails enregistrés.
+
+    Le nombre de requêtes ne dépend pas du nombre de cocktails (catalogue lu
+    et complété en masse, lignes insérées par un seul bulk_create), ce qui
+    convient aussi aux lots de bulk_create.
+
+    Args:
+        cocktails: Cocktails ayant un id
+    """
+    from .models import CocktailIngredient, Ingredient
+    
+    parsed = {cocktail.id: parse_ingredients(cocktail.ingredients)
+              for cocktail in cocktails if cocktail.id is not None}
+    if not parsed:
+        return
+    names = {name for lines in parsed.values() for name, _ in lines}
+    
+    with transaction.atomic():
+        catalog = Ingredient.objects.in_bulk(names, field_name='name')
+        missing = names - set(catalog)
+        if missing:
+            # ignore_conflicts : un autre worker peut créer le même ingrédient
+            Ingredient.objects.bulk_create([Ingredient(name=name) for name in missing], ignore_conflicts=True)
+            catalog = Ingredient.objects.in_bulk(names, field_name='name')
+        
+        replaced, _ = CocktailIngredient.objects.filter(cocktail_id__in=list(parsed)).delete()
+        if replaced:
+            # Cocktails déjà indexés : la matrice des recommandations est à reconstruire
+            ingredients_changed()
+        CocktailIngredient.objects.bulk_create([
+            CocktailIngredient(cocktail_id=cocktail_id, ingredient=catalog[name], quantity=quantity, position=position)
+            for cocktail_id, lines in parsed.items()
+            for position, (name, quantity) in enumerate(lines)
+        ])
+
+
+def parse_pantry(value: Any) -> List[str]:
+    """Ingrédients disponibles ("gin, citron vert" ou liste), normalisés."""
+    items = value if isinstance(value, (list, tuple)) else str(value or '').split(',')
+    return sorted({normalize_text(item) for item in items if normalize_text(item)})
+
+
+def _ingredient_filter(term: str) -> Q:
+    # Le terme est un mot entier du nom : "citron vert" trouve "jus de citron vert"
+    return (Q(name=term) | Q(name__startswith=f'{term} ')
+            | Q(name__endswith=f' {term}') | Q(name__contains=f' {term} '))
+
+
+def pantry_matches(pantry: List[str], limit: int) -> List[Dict[str, Any]]:
+    """
+    Cocktails réalisables avec les ingrédients disponibles, les plus complets d'abord.
+
+    Args:
+        pantry: Ingrédients disponibles (normalisés, voir parse_pantry)
+        limit: Nombre maximal de cocktails
+
+    Returns:
+        Liste de {cocktail_id, matched, missing, score} triée par nombre
+        d'ingrédients manquants puis d'ingrédients trouvés ; score est la
+        part des ingrédients de la recette disponibles
+    """
+    from .models import CocktailIngredient, Ingredient
+    
+    if not pantry:
+        return []
+    condition = Q()
+    for term in pantry:
+        condition |= _ingredient_filter(term)
+    available = set(Ingredient.objects.filter(condition).values_list('id', flat=True))
+    if not available:
+        return []
+    
+    # Lectures par l'index inversé : seuls les cocktails ayant un ingrédient disponible
+    ranked = list(
+        CocktailIngredient.objects
+        .filter(cocktail_id__in=CocktailIngredient.objects.filter(ingredient_id__in=available).values('cocktail_id'))
+        .values('cocktail_id')
+        .annotate(
+            total=Count('ingredient_id', distinct=True),
+            matched=Count('ingredient_id', filter=Q(ingredient_id__in=available), distinct=True),
+        )
+        .annotate(missing=F('total') - F('matched'))
+        .order_by('missing', '-matched', '-cocktail_id')[:limit]
+    )
+    
+    lines = (CocktailIngredient.objects
+             .filter(cocktail_id__in=[row['cocktail_id'] for row in ranked])
+             .select_related('ingredient')
+             .order_by('cocktail_id', 'position'))
+    names = {}
+    for line in lines:
+        names.setdefault(line.cocktail_id, []).append((line.ingredient.name, line.ingredient_id in available))
+    
+    return [{
+        'cocktail_id': row['cocktail_id'],
+        'matched': [name for name, found in names.get(row['cocktail_id'], []) if found],
+        'missing': [name for name, found in names.get(row['cocktail_id'], []) if not found],
+        'score': round(row['matched'] / row['total'], 3),
+    } for row in ranked]
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+Exécution des tâches de génération en arrière-plan
+Les tâches (GenerationJob) sont réclamées par une mise à jour conditionnelle
+en base, ce qui permet à plusieurs processus (serveur web, commande
+run_generation_jobs) de se partager la file sans verrou externe. Chaque
+processus exécute au plus JOB_WORKERS tâches à la fois.
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any, Callable, Dict, Optional
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import GenerationJob
+
+logger = logging.getLogger(__name__)
+
+# Pipelines disponibles : type de tâche -> fonction payload -> résultat (None = échec)
+JOB_HANDLERS = {
+    'cocktail_with_media': 'cocktails.jobs.run_cocktail_with_media',
+}
+
+
+def run_cocktail_with_media(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Pipeline de views.generate_cocktail_with_media."""
+    from .views import build_cocktail_with_media
+    return build_cocktail_with_media(payload['user_request'])
+
+
+def get_handler(kind: str) -> Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """Retourne la fonction exécutant un type de tâche."""
+    return import_string(JOB_HANDLERS[kind])
+
+
+class JobWorkerPool:
+    """
+    Pool borné de workers exécutant les tâches de génération.
+
+    Les tâches sont réclamées une à une ; une tâche restée « en cours » plus
+    de JOB_STALE_AFTER secondes (processus arrêté en pleine exécution) est
+    de nouveau réclamable, dans la limite de JOB_MAX_ATTEMPTS tentatives.
+    """
+    
+    def __init__(self, size: Optional[int] = None):
+        self.size = size or getattr(settings, 'JOB_WORKERS', 2)
+        self.stale_after = getattr(settings, 'JOB_STALE_AFTER', 600)
+        self.max_attempts = getattr(settings, 'JOB_MAX_ATTEMPTS', 3)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._executor = None
+        self._active = 0
+        self._started = False
+        self._lock = threading.Lock()
+    
+    # ------------------------------------------------------------------
+    # File d'attente
+    # ------------------------------------------------------------------
+    
+    def enqueue(self, kind: str, payload: Dict[str, Any]) -> GenerationJob:
+        """
+        Crée une tâche et réveille un worker local si le pool s'exécute ici.
+
+        Args:
+            kind: Type de tâche (clé de JOB_HANDLERS)
+            payload: Paramètres de la tâche
+
+        Returns:
+            Tâche créée, en attente
+        """
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Type de tâche inconnu: {kind}")
+        job = GenerationJob.objects.create(kind=kind, payload=payload)
+        if getattr(settings, 'JOB_RUNNER', 'thread') == 'thread':
+            self.wake()
+        return job
+    
+    def _claimable(self):
+        stale_before = timezone.now() - timedelta(seconds=self.stale_after)
+        return GenerationJob.objects.filter(
+            Q(status=GenerationJob.STATUS_PENDING)
+            | Q(status=GenerationJob.STATUS_RUNNING, started_at__lt=stale_before)
+        ).filter(attempts__lt=self.max_attempts)
+    
+    def claim(self) -> Optional[GenerationJob]:
+        """
+        Réclame la plus ancienne tâche disponible.
+
+        La mise à jour n'aboutit que si la tâche est toujours dans l'état
+        lu : si un autre worker l'a prise entre-temps, on passe à la suivante.
+
+        Returns:
+            Tâche réclamée (statut running) ou None si la file est vide
+        """
+        while True:
+            candidate = self._claimable().order_by('created_at').values('id', 'status', 'started_at').first()
+            if candidate is None:
+                return None
+            
+            claimed = GenerationJob.objects.filter(
+                id=candidate['id'],
+                status=candidate['status'],
+                started_at=candidate['started_at'],
+            ).update(
+                status=GenerationJob.STATUS_RUNNING,
+                worker=self.worker_id,
+                started_at=timezone.now(),
+                attempts=F('attempts') + 1,
+            )
+            if claimed:
+                return GenerationJob.objects.get(id=candidate['id'])
+    
+    def fail_exhausted(self) -> int:
+        """Marque en échec les tâches bloquées ayant épuisé leurs tentatives."""
+        stale_before = timezone.now() - timedelta(seconds=self.stale_after)
+        return GenerationJob.objects.filter(
+            status__in=[GenerationJob.STATUS_PENDING, GenerationJob.STATUS_RUNNING],
+            attempts__gte=self.max_attempts,
+        ).filter(
+            Q(status=GenerationJob.STATUS_PENDING) | Q(started_at__lt=stale_before)
+        ).update(
+            status=GenerationJob.STATUS_FAILED,
+            error='Nombre maximal de tentatives atteint',
+            finished_at=timezone.now(),
+        )
+    
+    # ------------------------------------------------------------------
+    # Exécution
+    # ------------------------------------------------------------------
+    
+    def run(self, job: GenerationJob):
+        """Exécute une tâche réclamée et enregistre son résultat."""
+        started = time.monotonic()
+        try:
+            result = get_handler(job.kind)(job.payload)
+        except Exception as e:
+            logger.error(f"Échec de la tâche {job.id}: {e}")
+            result, error = None, str(e)
+        else:
+            error = '' if result else 'Impossible de générer le cocktail'
+        
+        # Seul le worker propriétaire peut conclure (la tâche a pu être reprise)
+        GenerationJob.objects.filter(id=job.id, worker=self.worker_id).update(
+            status=GenerationJob.STATUS_SUCCEEDED if result else GenerationJob.STATUS_FAILED,
+            result=result,
+            error=error,
+            finished_at=timezone.now(),
+        )
+        logger.info(f"Tâche {job.id} terminée en {time.monotonic() - started:.1f}s ({'ok' if result else 'échec'})")
+    
+    def drain(self) -> int:
+        """Exécute les tâches disponibles jusqu'à vider la file."""
+        processed = 0
+        try:
+            self.fail_exhausted()
+            while True:
+                job = self.claim()
+                if job is None:
+                    return processed
+                self.run(job)
+                processed += 1
+        finally:
+            close_old_connections()
+    
+    def wake(self):
+        """Démarre un worker local si le pool n'est pas saturé."""
+        with self._lock:
+            if self._active >= self.size:
+                return  # Les workers actifs prendront la tâche en vidant la file
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix='generation-job')
+            self._active += 1
+        self._executor.submit(self._drain_and_release)
+    
+    def _drain_and_release(self):
+        try:
+            self.drain()
+        except Exception as e:
+            logger.error(f"Erreur du pool de tâches: {e}")
+        finally:
+            with self._lock:
+                self._active -= 1
+    
+    def ensure_started(self):
+        """
+        Reprend au démarrage du processus les tâches laissées par un redémarrage
+        (JOB_RUNNER=thread) : les tâches en attente aussitôt, celles interrompues
+        en cours d'exécution dès qu'elles deviennent réclamables (JOB_STALE_AFTER).
+        Sans cela, un serveur inactif ne les reprendrait qu'au prochain enqueue.
+        """
+        if getattr(settings, 'JOB_RUNNER', 'thread') != 'thread':
+            return
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        self.wake()
+        timer = threading.Timer(self.stale_after + 1, self.wake)
+        timer.daemon = True
+        timer.start()
+    
+    def serve(self, poll_interval: float = 1.0):
+        """
+        Boucle de la commande run_generation_jobs : maintient jusqu'à size
+        tâches en parallèle en sondant la file.
+        """
+        logger.info(f"Pool de tâches démarré ({self.size} workers, {self.worker_id})")
+        while True:
+            for _ in range(self.size):
+                self.wake()
+            time.sleep(poll_interval)
+
+
+def wait_for_job(job_id, timeout: float) -> Optional[GenerationJob]:
+    """
+    Attend qu'une tâche se termine (long-poll).
+
+    Args:
+        job_id: Identifiant de la tâche
+        timeout: Attente maximale en secondes
+
+    Returns:
+        Tâche dans son dernier état connu, ou None si elle n'existe pas
+    """
+    poll_interval = getattr(settings, 'JOB_POLL_INTERVAL', 0.5)
+    deadline = time.monotonic() + timeout
+    while True:
+        job = GenerationJob.objects.filter(id=job_id).first()
+        if job is None or job.is_finished or time.monotonic() >= deadline:
+            return job
+        time.sleep(poll_interval)
+
+
+# Pool global du processus
+job_pool = JobWorkerPool()
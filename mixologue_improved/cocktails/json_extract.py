@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Extraction du JSON des réponses des modèles
+Les modèles entourent souvent leur JSON de balises ```json, de politesses
+ou de caractères de contrôle. Ce module trouve le premier objet JSON complet
+en une seule passe du décodeur C de la bibliothèque standard, qui gère
+nativement les accolades dans les chaînes et les échappements.
+"""
+
+import json
+import logging
+import re
+import time
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+# Caractères de contrôle invalides en JSON (tabulations et retours à la ligne conservés)
+_CONTROL_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x9f]')
+
+# strict=False : accepte les retours à la ligne bruts dans les chaînes
+_decoder = json.JSONDecoder(strict=False)
+
+# Nombre maximal d'accolades ouvrantes essayées comme début d'objet
+MAX_CANDIDATES = 3
+
+
+class JSONExtractionError(ValueError):
+    """Aucun objet JSON exploitable dans la réponse ; reason précise la cause."""
+    
+    def __init__(self, reason: str, detail: str = ''):
+        super().__init__(f"{reason}: {detail}" if detail else reason)
+        self.reason = reason
+        self.detail = detail
+
+
+def extract_json(text: str, source: str = 'llm') -> Dict[str, Any]:
+    """
+    Extrait le premier objet JSON complet d'une réponse de modèle.
+
+    Le texte qui précède ou suit l'objet (balises de code, commentaires)
+    est ignoré. Le temps d'extraction et, en cas d'échec, sa cause sont
+    journalisés.
+
+    Args:
+        text: Réponse brute du modèle
+        source: Nom du site d'appel, pour les journaux
+
+    Returns:
+        Objet JSON décodé
+
+    Raises:
+        JSONExtractionError: reason vaut 'empty', 'no_object', 'truncated'
+            ou 'invalid'
+    """
+    started = time.perf_counter()
+    try:
+        data = _extract(text or '')
+    except JSONExtractionError as e:
+        elapsed = (time.perf_counter() - started) * 1000
+        logger.warning(f"Extraction JSON échouée ({source}) en {elapsed:.2f} ms: {e}")
+        raise
+    
+    elapsed = (time.perf_counter() - started) * 1000
+    logger.info(f"JSON extrait ({source}) en {elapsed:.2f} ms")
+    return data
+
+
+def _extract(text: str) -> Dict[str, Any]:
+    if not text.strip():
+        raise JSONExtractionError('empty')
+    
+    text = _CONTROL_CHARS.sub('', text)
+    start = text.find('{')
+    if start == -1:
+        raise JSONExtractionError('no_object', 'aucune accolade ouvrante')
+    
+    error = None
+    for _ in range(MAX_CANDIDATES):
+        try:
+            data, _ = _decoder.raw_decode(text, start)
+            return data
+        except json.JSONDecodeError as e:
+            if error is None:
+                error = e
+        # L'accolade trouvée appartenait peut-être à du texte libre : on essaie la suivante
+        start = text.find('{', start + 1)
+        if start == -1:
+            break
+    
+    # La réponse s'arrête en plein objet (num_predict atteint, flux coupé)
+    if error.pos >= len(text.rstrip()) - 1 or error.msg.startswith('Unterminated'):
+        raise JSONExtractionError('truncated', f"{error.msg} (position {error.pos})")
+    raise JSONExtractionError('invalid', f"{error.msg} (position {error.pos})")
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""
+Commande de gestion : reconstruit la matrice des cocktails similaires
+Usage:
+    python manage.py build_recommendations
+À lancer après un import massif : les workers chargent le fichier produit
+(RECOMMENDATION_INDEX_PATH) au lieu de reconstruire la matrice au premier
+appel. Les modifications faites par l'application (ingrédients modifiés,
+suppressions) déclenchent elles-mêmes la reconstruction.
+"""
+
+import time
+from django.core.management.base import BaseCommand, CommandError
+from cocktails.recommendations import ingredient_matrix
+
+
+class Command(BaseCommand):
+    help = "Reconstruit et enregistre la matrice cocktail x ingrédient (RECOMMENDATION_INDEX_PATH)"
+    
+    def handle(self, *args, **options):
+        if ingredient_matrix is None:
+            raise CommandError("NumPy et SciPy sont requis pour la matrice de recommandations")
+        
+        started = time.monotonic()
+        ingredient_matrix.build()
+        ingredient_matrix.save()
+        rows, cols = ingredient_matrix.matrix.shape
+        self.stdout.write(self.style.SUCCESS(
+            f"Matrice enregistrée dans {ingredient_matrix.path}: {rows} cocktails x {cols} ingrédients "
+            f"en {time.monotonic() - started:.1f}s"
+        ))
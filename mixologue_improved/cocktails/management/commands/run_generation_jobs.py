@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+Commande de gestion : exécute les tâches de génération en attente
+Usage:
+    python manage.py run_generation_jobs --workers 4
+    python manage.py run_generation_jobs --once   # vide la file puis s'arrête
+"""
+
+from django.core.management.base import BaseCommand
+from cocktails.jobs import JobWorkerPool
+
+
+class Command(BaseCommand):
+    help = "Exécute les tâches de génération (GenerationJob) avec un pool de workers borné"
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Nombre de tâches simultanées (défaut: JOB_WORKERS)")
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help="Secondes entre deux sondages de la file")
+        parser.add_argument('--once', action='store_true',
+                            help="Vider la file d'attente puis quitter")
+    
+    def handle(self, *args, **options):
+        pool = JobWorkerPool(size=options['workers'])
+        
+        if options['once']:
+            processed = pool.drain()
+            self.stdout.write(self.style.SUCCESS(f"{processed} tâche(s) exécutée(s)"))
+            return
+        
+        self.stdout.write(f"Pool de {pool.size} workers démarré ({pool.worker_id})")
+        try:
+            pool.serve(poll_interval=options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Arrêt du pool de tâches")
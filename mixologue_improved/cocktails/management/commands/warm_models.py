@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Commande de gestion : précharge les modèles Ollama configurés
+Usage:
+    python manage.py warm_models            # charge les modèles absents de /api/ps
+    python manage.py warm_models --force    # recharge tout (réarme keep_alive)
+    python manage.py warm_models --watch    # maintient les modèles résidents
+"""
+
+import time
+from django.core.management.base import BaseCommand, CommandError
+from cocktails.residency import model_residency
+
+
+class Command(BaseCommand):
+    help = "Précharge les modèles Ollama (OLLAMA_RESIDENT_MODELS) avec leur keep_alive"
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help="Recharger aussi les modèles déjà résidents")
+        parser.add_argument('--watch', action='store_true',
+                            help="Vérifier /api/ps en continu et recharger les modèles déchargés")
+        parser.add_argument('--interval', type=float, default=None,
+                            help="Secondes entre deux vérifications (défaut: MODEL_RESIDENCY_INTERVAL)")
+    
+    def handle(self, *args, **options):
+        if not model_residency.models:
+            raise CommandError("Aucun modèle configuré dans OLLAMA_RESIDENT_MODELS")
+        
+        interval = options['interval'] or model_residency.interval
+        force = options['force']
+        try:
+            while True:
+                self.warm_up(force)
+                if not options['watch']:
+                    return
+                force = False
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            self.stdout.write("Arrêt du préchargement")
+    
+    def warm_up(self, force):
+        results = model_residency.warm_up(force=force)
+        if not results:
+            self.stderr.write(self.style.ERROR(f"Ollama injoignable ({model_residency.base_url})"))
+            return
+        
+        for model, duration in results.items():
+            if duration is None:
+                self.stderr.write(self.style.ERROR(f"{model}: échec du chargement"))
+            elif duration == 0:
+                self.stdout.write(f"{model}: déjà résident")
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{model}: chargé en {duration:.1f}s"))
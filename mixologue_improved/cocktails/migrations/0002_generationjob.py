@@ -0,0 +1,77 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:50
+
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cocktails', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cocktail',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='Date et heure de création du cocktail', verbose_name='Date de création'),
+        ),
+        migrations.AlterField(
+            model_name='cocktail',
+            name='description',
+            field=models.TextField(help_text='Histoire et description détaillée du cocktail', verbose_name='Description/Histoire'),
+        ),
+        migrations.AlterField(
+            model_name='cocktail',
+            name='image_prompt',
+            field=models.TextField(blank=True, help_text="Prompt pour générer une image du cocktail avec l'IA", null=True, verbose_name='Prompt image MidJourney/SDXL'),
+        ),
+        migrations.AlterField(
+            model_name='cocktail',
+            name='ingredients',
+            field=models.TextField(help_text='Ingrédients et proportions, séparés par des retours à la ligne', verbose_name='Liste des ingrédients'),
+        ),
+        migrations.AlterField(
+            model_name='cocktail',
+            name='is_favorite',
+            field=models.BooleanField(default=False, help_text='Indique si ce cocktail est marqué comme favori', verbose_name='Cocktail favori'),
+        ),
+        migrations.AlterField(
+            model_name='cocktail',
+            name='musical_ambiance',
+            field=models.CharField(help_text="Suggestion d'ambiance musicale pour accompagner le cocktail", max_length=300, verbose_name='Ambiance musicale'),
+        ),
+        migrations.AlterField(
+            model_name='cocktail',
+            name='name',
+            field=models.CharField(help_text="Nom créatif du cocktail généré par l'IA", max_length=200, verbose_name='Nom du cocktail'),
+        ),
+        migrations.AlterField(
+            model_name='cocktail',
+            name='user_request',
+            field=models.TextField(help_text="Demande initiale de l'utilisateur ayant généré ce cocktail", verbose_name='Demande originale du client'),
+        ),
+        migrations.CreateModel(
+            name='GenerationJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('kind', models.CharField(help_text='Pipeline à exécuter (ex: cocktail_with_media)', max_length=50, verbose_name='Type de tâche')),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('running', 'En cours'), ('succeeded', 'Terminée'), ('failed', 'Échouée')], default='pending', max_length=20, verbose_name='Statut')),
+                ('payload', models.JSONField(default=dict, help_text='Paramètres de la tâche (demande du client...)', verbose_name='Paramètres')),
+                ('result', models.JSONField(blank=True, help_text='Réponse produite par le pipeline', null=True, verbose_name='Résultat')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Erreur')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Tentatives')),
+                ('worker', models.CharField(blank=True, default='', help_text='Identifiant du worker ayant réclamé la tâche', max_length=100, verbose_name='Worker')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Date de création')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name="Début d'exécution")),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name="Fin d'exécution")),
+            ],
+            options={
+                'verbose_name': 'Tâche de génération',
+                'verbose_name_plural': 'Tâches de génération',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='job_status_created_idx')],
+            },
+        ),
+    ]
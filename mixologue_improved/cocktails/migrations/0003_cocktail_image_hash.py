@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cocktails', '0002_generationjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cocktail',
+            name='image_hash',
+            field=models.CharField(blank=True, default='', help_text="SHA-256 de l'image générée, stockée dans MEDIA_ROOT sous cette empreinte", max_length=64, verbose_name="Empreinte de l'image"),
+        ),
+    ]
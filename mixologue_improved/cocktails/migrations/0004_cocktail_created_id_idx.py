@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cocktails', '0003_cocktail_image_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cocktail',
+            index=models.Index(fields=['-created_at', '-id'], name='cocktail_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Index plein texte (FTS5 sous SQLite, tsvector + GIN sous PostgreSQL)
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from cocktails.search import create_search_index
+    create_search_index(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    from cocktails.search import drop_search_index
+    drop_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cocktails', '0004_cocktail_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
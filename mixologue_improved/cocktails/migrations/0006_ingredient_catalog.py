@@ -0,0 +1,50 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cocktails', '0005_cocktail_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Ingredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Nom normalisé')),
+            ],
+            options={
+                'verbose_name': 'Ingrédient',
+                'verbose_name_plural': 'Ingrédients',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CocktailIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.CharField(blank=True, default='', help_text="Quantité telle qu'écrite dans la recette (ex: 4 cl)", max_length=100, verbose_name='Quantité')),
+                ('position', models.PositiveSmallIntegerField(default=0, verbose_name='Rang dans la recette')),
+                ('cocktail', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ingredient_lines', to='cocktails.cocktail')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cocktail_lines', to='cocktails.ingredient')),
+            ],
+            options={
+                'verbose_name': "Ingrédient d'un cocktail",
+                'verbose_name_plural': 'Ingrédients des cocktails',
+                'ordering': ['cocktail', 'position'],
+            },
+        ),
+        migrations.AddField(
+            model_name='cocktail',
+            name='catalog_ingredients',
+            field=models.ManyToManyField(blank=True, help_text='Ingrédients normalisés extraits du champ ingredients', related_name='cocktails', through='cocktails.CocktailIngredient', to='cocktails.ingredient', verbose_name='Ingrédients du catalogue'),
+        ),
+        migrations.AddIndex(
+            model_name='cocktailingredient',
+            index=models.Index(fields=['ingredient', 'cocktail'], name='ingredient_cocktail_idx'),
+        ),
+    ]
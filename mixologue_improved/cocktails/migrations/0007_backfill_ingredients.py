@@ -0,0 +1,41 @@
+# Remplissage du catalogue d'ingrédients à partir des cocktails existants
+
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+
+def backfill_ingredients(apps, schema_editor):
+    from cocktails.ingredients import parse_ingredients
+    Cocktail = apps.get_model('cocktails', 'Cocktail')
+    Ingredient = apps.get_model('cocktails', 'Ingredient')
+    CocktailIngredient = apps.get_model('cocktails', 'CocktailIngredient')
+    
+    catalog = {}
+    lines = []
+    for cocktail_id, ingredients in Cocktail.objects.values_list('id', 'ingredients').iterator(chunk_size=BATCH_SIZE):
+        for position, (name, quantity) in enumerate(parse_ingredients(ingredients)):
+            if name not in catalog:
+                catalog[name] = Ingredient.objects.get_or_create(name=name)[0].id
+            lines.append(CocktailIngredient(cocktail_id=cocktail_id, ingredient_id=catalog[name],
+                                            quantity=quantity, position=position))
+        if len(lines) >= BATCH_SIZE:
+            CocktailIngredient.objects.bulk_create(lines)
+            lines = []
+    CocktailIngredient.objects.bulk_create(lines)
+
+
+def clear_ingredients(apps, schema_editor):
+    apps.get_model('cocktails', 'CocktailIngredient').objects.all().delete()
+    apps.get_model('cocktails', 'Ingredient').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('cocktails', '0006_ingredient_catalog'),
+    ]
+    
+    operations = [
+        migrations.RunPython(backfill_ingredients, clear_ingredients),
+    ]
@@ -0,0 +1,21 @@
+# Réinstallation de l'index plein texte : sous SQLite, l'ajout du champ
+# catalog_ingredients (0006) reconstruit la table des cocktails, ce qui
+# supprime les triggers FTS5 créés par 0005
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from cocktails.search import create_search_index
+    create_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cocktails', '0007_backfill_ingredients'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, migrations.RunPython.noop),
+    ]
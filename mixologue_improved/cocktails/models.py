@@ -1,4 +1,5 @@
 # Imports Django pour la gestion des modèles et du temps
+import uuid
 from django.db import models
 from django.utils import timezone
 
@@ -44,6 +45,14 @@ class Cocktail(models.Model):
         help_text="Prompt pour générer une image du cocktail avec l'IA"
     )
     
+    image_hash = models.CharField(
+        max_length=64, 
+        blank=True, 
+        default='', 
+        verbose_name="Empreinte de l'image",
+        help_text="SHA-256 de l'image générée, stockée dans MEDIA_ROOT sous cette empreinte"
+    )
+    
     # Métadonnées et gestion
     user_request = models.TextField(
         verbose_name="Demande originale du client",
@@ -62,11 +71,24 @@ class Cocktail(models.Model):
         help_text="Indique si ce cocktail est marqué comme favori"
     )
     
+    catalog_ingredients = models.ManyToManyField(
+        'Ingredient', 
+        through='CocktailIngredient', 
+        related_name='cocktails', 
+        blank=True, 
+        verbose_name="Ingrédients du catalogue",
+        help_text="Ingrédients normalisés extraits du champ ingredients"
+    )
+    
     class Meta:
         """Configuration du modèle Cocktail"""
         ordering = ['-created_at']  # Tri par date de création décroissante
         verbose_name = "Cocktail"
         verbose_name_plural = "Cocktails"
+        indexes = [
+            # Pagination par curseur (keyset) de l'API et de l'historique
+            models.Index(fields=['-created_at', '-id'], name='cocktail_created_id_idx'),
+        ]
     
     def __str__(self):
         """Représentation textuelle du cocktail pour l'admin Django"""
@@ -83,3 +105,208 @@ class Cocktail(models.Model):
             list: Liste des ingrédients nettoyés
         """
         return [ingredient.strip() for ingredient in self.ingredients.split('\n') if ingredient.strip()]
+    
+    @property
+    def image_url(self):
+        """URL stable de l'image générée, ou None si le cocktail n'en a pas"""
+        from .image_store import image_url
+        return image_url(self.image_hash)
+    
+    @property
+    def thumbnail_url(self):
+        """URL de la miniature (format négocié selon le navigateur) pour l'historique"""
+        from .image_store import image_url
+        return image_url(self.image_hash, size='thumb')
+
+
+class Ingredient(models.Model):
+    """
+    Ingrédient du catalogue normalisé
+    
+    Le nom est normalisé (minuscules, sans accents ni quantité) : « 4 cl de
+    Gin » et « 50ml gin » désignent le même ingrédient.
+    """
+    
+    name = models.CharField(
+        max_length=100, 
+        unique=True, 
+        verbose_name="Nom normalisé"
+    )
+    
+    class Meta:
+        """Configuration du modèle Ingredient"""
+        ordering = ['name']
+        verbose_name = "Ingrédient"
+        verbose_name_plural = "Ingrédients"
+    
+    def __str__(self):
+        return self.name
+
+
+class CocktailIngredient(models.Model):
+    """
+    Ligne d'ingrédient d'un cocktail (table de liaison avec la quantité)
+    
+    L'index (ingredient, cocktail) sert d'index inversé : les cocktails
+    utilisant un ingrédient sont lus sans parcourir la table des cocktails.
+    """
+    
+    cocktail = models.ForeignKey(
+        Cocktail, 
+        on_delete=models.CASCADE, 
+        related_name='ingredient_lines'
+    )
+    
+    ingredient = models.ForeignKey(
+        Ingredient, 
+        on_delete=models.CASCADE, 
+        related_name='cocktail_lines'
+    )
+    
+    quantity = models.CharField(
+        max_length=100, 
+        blank=True, 
+        default='', 
+        verbose_name="Quantité",
+        help_text="Quantité telle qu'écrite dans la recette (ex: 4 cl)"
+    )
+    
+    position = models.PositiveSmallIntegerField(
+        default=0, 
+        verbose_name="Rang dans la recette"
+    )
+    
+    class Meta:
+        """Configuration du modèle CocktailIngredient"""
+        ordering = ['cocktail', 'position']
+        verbose_name = "Ingrédient d'un cocktail"
+        verbose_name_plural = "Ingrédients des cocktails"
+        indexes = [
+            # Index inversé ingrédient -> cocktails des recherches « avec ce que j'ai »
+            models.Index(fields=['ingredient', 'cocktail'], name='ingredient_cocktail_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.quantity} {self.ingredient}".strip()
+
+
+class GenerationJob(models.Model):
+    """
+    Tâche de génération exécutée en arrière-plan
+    
+    La requête HTTP crée la tâche et rend immédiatement son identifiant ;
+    un pool de workers (thread du serveur ou commande run_generation_jobs)
+    la réclame, exécute le pipeline et enregistre le résultat. L'état étant
+    stocké en base, une tâche interrompue par un redémarrage est reprise.
+    """
+    
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'En attente'),
+        (STATUS_RUNNING, 'En cours'),
+        (STATUS_SUCCEEDED, 'Terminée'),
+        (STATUS_FAILED, 'Échouée'),
+    ]
+    
+    id = models.UUIDField(
+        primary_key=True, 
+        default=uuid.uuid4, 
+        editable=False
+    )
+    
+    kind = models.CharField(
+        max_length=50, 
+        verbose_name="Type de tâche",
+        help_text="Pipeline à exécuter (ex: cocktail_with_media)"
+    )
+    
+    status = models.CharField(
+        max_length=20, 
+        choices=STATUS_CHOICES, 
+        default=STATUS_PENDING, 
+        verbose_name="Statut"
+    )
+    
+    payload = models.JSONField(
+        default=dict, 
+        verbose_name="Paramètres",
+        help_text="Paramètres de la tâche (demande du client...)"
+    )
+    
+    result = models.JSONField(
+        blank=True, 
+        null=True, 
+        verbose_name="Résultat",
+        help_text="Réponse produite par le pipeline"
+    )
+    
+    error = models.TextField(
+        blank=True, 
+        default='', 
+        verbose_name="Erreur"
+    )
+    
+    attempts = models.PositiveSmallIntegerField(
+        default=0, 
+        verbose_name="Tentatives"
+    )
+    
+    worker = models.CharField(
+        max_length=100, 
+        blank=True, 
+        default='', 
+        verbose_name="Worker",
+        help_text="Identifiant du worker ayant réclamé la tâche"
+    )
+    
+    created_at = models.DateTimeField(
+        default=timezone.now, 
+        verbose_name="Date de création"
+    )
+    
+    started_at = models.DateTimeField(
+        blank=True, 
+        null=True, 
+        verbose_name="Début d'exécution"
+    )
+    
+    finished_at = models.DateTimeField(
+        blank=True, 
+        null=True, 
+        verbose_name="Fin d'exécution"
+    )
+    
+    class Meta:
+        """Configuration du modèle GenerationJob"""
+        ordering = ['created_at']
+        verbose_name = "Tâche de génération"
+        verbose_name_plural = "Tâches de génération"
+        indexes = [
+            # Réclamation de la plus ancienne tâche en attente
+            models.Index(fields=['status', 'created_at'], name='job_status_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} {self.id} ({self.status})"
+    
+    @property
+    def is_finished(self):
+        """Indique si la tâche est dans un état final"""
+        return self.status in (self.STATUS_SUCCEEDED, self.STATUS_FAILED)
+    
+    def to_dict(self):
+        """Sérialise la tâche pour l'API de suivi"""
+        return {
+            'job_id': str(self.id),
+            'kind': self.kind,
+            'status': self.status,
+            'result': self.result,
+            'error': self.error or None,
+            'attempts': self.attempts,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
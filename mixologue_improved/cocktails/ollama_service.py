@@ -5,16 +5,178 @@ Ce module gère l'intégration avec Ollama pour créer des recettes de cocktails
 et analyser des images de cocktails.
 """
 
+import asyncio
 import json
 import logging
+import random
+import threading
+import weakref
 import requests
-from typing import Dict, List, Optional, Any
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Any, Tuple
 from django.conf import settings
-from django.core.cache import cache
+from asgiref.sync import sync_to_async
+from .cache_backends import llm_cache
+from .cache_keys import make_cache_key, normalize_ingredients
+from .health import health_monitor
+from .json_extract import JSONExtractionError, extract_json
+from .residency import keep_alive_for
+from .singleflight import single_flight
+from .streaming import IncrementalJSONParser, iter_cached_recipe_events, iter_recipe_events, recipe_event
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
 
+class JitteredRetry(Retry):
+    """
+    Politique de retry urllib3 avec un backoff exponentiel bruité.
+    
+    Le jitter évite que tous les workers relancent leurs requêtes au même
+    instant lorsque Ollama redémarre.
+    """
+    
+    def __init__(self, *args, jitter: float = 0.0, **kwargs):
+        self.jitter = jitter
+        super().__init__(*args, **kwargs)
+    
+    def new(self, **kwargs):
+        kwargs.setdefault('jitter', self.jitter)
+        return super().new(**kwargs)
+    
+    def get_backoff_time(self) -> float:
+        backoff = super().get_backoff_time()
+        if backoff <= 0 or self.jitter <= 0:
+            return backoff
+        return min(self.backoff_max_time, backoff + random.uniform(0, self.jitter))
+    
+    @property
+    def backoff_max_time(self) -> float:
+        # Le nom de l'attribut diffère entre urllib3 1.x et 2.x
+        return getattr(self, 'backoff_max', None) or getattr(Retry, 'DEFAULT_BACKOFF_MAX', 120)
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """
+    Retourne la session HTTP partagée par le processus.
+    
+    La session garde un pool de connexions keep-alive vers Ollama (et les
+    autres services HTTP internes) et applique la politique de retry
+    configurée via les réglages OLLAMA_*. Elle est créée paresseusement,
+    après le fork des workers gunicorn.
+    
+    Returns:
+        Session requests configurée
+    """
+    global _session
+    
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_http_session()
+    return _session
+
+
+def _build_http_session() -> requests.Session:
+    """
+    Construit une session requests avec pool de connexions et retry.
+    
+    OLLAMA_POOL_SIZE est le nombre de connexions gardées ouvertes, pas un
+    plafond : sans OLLAMA_POOL_BLOCK, un appel qui trouve le pool vide ouvre
+    une connexion de plus, fermée ensuite (urllib3 journalise alors
+    « Connection pool is full, discarding connection »). Avec
+    OLLAMA_POOL_BLOCK=True, il attend qu'une connexion se libère.
+    """
+    pool_size = getattr(settings, 'OLLAMA_POOL_SIZE', 10)
+    max_retries = getattr(settings, 'OLLAMA_MAX_RETRIES', 2)
+    
+    retry = JitteredRetry(
+        total=max_retries,
+        connect=max_retries,
+        read=0,  # Ne jamais rejouer une génération déjà partie
+        status=max_retries,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset(['GET', 'POST']),
+        backoff_factor=getattr(settings, 'OLLAMA_RETRY_BACKOFF', 0.5),
+        jitter=getattr(settings, 'OLLAMA_RETRY_JITTER', 0.5),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=getattr(settings, 'OLLAMA_POOL_CONNECTIONS', 4),
+        pool_maxsize=pool_size,
+        max_retries=retry,
+        pool_block=getattr(settings, 'OLLAMA_POOL_BLOCK', False),
+    )
+    
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({
+        'Content-Type': 'application/json',
+        'Connection': 'keep-alive',
+    })
+    return session
+
+
+def get_retry_delay(attempt: int) -> float:
+    """
+    Calcule le délai avant la tentative suivante (backoff exponentiel bruité).
+    
+    Reprend la politique de JitteredRetry pour les clients qui ne passent
+    pas par urllib3 (client asynchrone httpx).
+    
+    Args:
+        attempt: Numéro de la tentative qui vient d'échouer (0 pour la première)
+        
+    Returns:
+        Délai en secondes
+    """
+    backoff = getattr(settings, 'OLLAMA_RETRY_BACKOFF', 0.5) * (2 ** attempt)
+    jitter = getattr(settings, 'OLLAMA_RETRY_JITTER', 0.5)
+    return backoff + random.uniform(0, jitter) if jitter > 0 else backoff
+
+
+# Un client httpx est lié à la boucle d'événements qui l'a créé : sous ASGI
+# la boucle est unique par processus, mais un async_to_sync en crée une
+# par appel. On garde donc un client par boucle.
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_http_client() -> 'httpx.AsyncClient':
+    """
+    Retourne le client HTTP asynchrone partagé par la boucle d'événements courante.
+    
+    Returns:
+        Client httpx avec pool de connexions keep-alive
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    
+    if client is None or client.is_closed:
+        pool_size = getattr(settings, 'OLLAMA_POOL_SIZE', 10)
+        client = httpx.AsyncClient(
+            # Comme pool_block=False côté synchrone : OLLAMA_POOL_SIZE connexions
+            # gardées ouvertes, mais aucune limite sur les appels simultanés
+            limits=httpx.Limits(
+                max_connections=None,
+                max_keepalive_connections=pool_size,
+            ),
+            headers={'Content-Type': 'application/json'},
+        )
+        _async_clients[loop] = client
+    return client
+
+
 class OllamaService:
     """
     Service pour interagir avec Ollama pour la génération de contenu IA.
@@ -24,9 +186,16 @@ class OllamaService:
         self.base_url = getattr(settings, 'OLLAMA_URL', 'http://ollama:11434')
         self.model = getattr(settings, 'OLLAMA_MODEL', 'llama3.2:latest')
         self.prompt_model = getattr(settings, 'OLLAMA_PROMPT_MODEL', 'llama3.2:3b')
+        self.vision_model = getattr(settings, 'OLLAMA_VISION_MODEL', 'llava:latest')
         self.timeout = getattr(settings, 'OLLAMA_TIMEOUT', 60)
         self.temperature = getattr(settings, 'OLLAMA_TEMPERATURE', 0.8)
         self.max_tokens = getattr(settings, 'OLLAMA_MAX_TOKENS', 2000)
+        self.context_timeout = getattr(settings, 'REFINEMENT_CONTEXT_TIMEOUT', 3600)
+    
+    @property
+    def session(self) -> requests.Session:
+        """Session HTTP partagée (pool keep-alive + retry)."""
+        return get_http_session()
     
     def _make_request(self, endpoint: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """
@@ -41,41 +210,50 @@ class OllamaService:
         """
         try:
             url = f"{self.base_url}/api/{endpoint}"
-            response = requests.post(
+            response = self.session.post(
                 url,
                 json=data,
-                timeout=self.timeout,
-                headers={'Content-Type': 'application/json'}
+                timeout=self.timeout
             )
             response.raise_for_status()
+            health_monitor.record_success('ollama')
             return response.json()
         except requests.exceptions.RequestException as e:
             logger.error(f"Erreur lors de la requête Ollama: {e}")
+            if self._is_outage(e):
+                health_monitor.record_failure('ollama', str(e))
             return None
     
-    def generate_cocktail_recipe(self, 
-                               ingredients: List[str], 
-                               style: str = "classique",
-                               difficulty: str = "facile") -> Optional[Dict[str, Any]]:
-        """
-        Génère une recette de cocktail basée sur les ingrédients fournis.
-        
-        Args:
-            ingredients: Liste des ingrédients disponibles
-            style: Style de cocktail souhaité
-            difficulty: Niveau de difficulté
-            
-        Returns:
-            Dictionnaire contenant la recette générée
-        """
-        # Créer une clé de cache unique
-        cache_key = f"cocktail_{hash(str(ingredients))}_{style}_{difficulty}"
-        cached_result = cache.get(cache_key)
-        
-        if cached_result:
-            logger.info("Recette trouvée dans le cache")
-            return cached_result
-        
+    @staticmethod
+    def _is_outage(error: Exception) -> bool:
+        """Indique si l'erreur traduit une panne d'Ollama (connexion, timeout, 5xx)."""
+        if isinstance(error, ValueError):
+            return False  # Réponse reçue mais illisible
+        if HTTPX_AVAILABLE and isinstance(error, httpx.PoolTimeout):
+            return False  # Pool de connexions local saturé, Ollama n'est pas en cause
+        response = getattr(error, 'response', None)
+        if response is not None:
+            return response.status_code >= 500
+        return True
+    
+    # ------------------------------------------------------------------
+    # Recettes
+    # ------------------------------------------------------------------
+    
+    def _recipe_cache_key(self, ingredients: List[str], style: str, difficulty: str) -> str:
+        """Clé de cache d'une recette (indépendante de l'ordre des ingrédients)."""
+        return make_cache_key(
+            'recipe',
+            model=self.model,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            ingredients=normalize_ingredients(ingredients),
+            style=style,
+            difficulty=difficulty,
+        )
+    
+    def _build_recipe_request(self, ingredients: List[str], style: str, difficulty: str) -> Dict[str, Any]:
+        """Construit la requête Ollama pour une recette de cocktail."""
         # Construire le prompt en français
         ingredients_str = ", ".join(ingredients)
         prompt = f"""
@@ -108,57 +286,319 @@ Réponds UNIQUEMENT avec un JSON valide dans ce format exact:
 Ne réponds qu'avec le JSON, rien d'autre.
 """
         
-        data = {
+        return {
             "model": self.model,
             "prompt": prompt,
             "stream": False,
+            "keep_alive": keep_alive_for(self.model),  # Modèle résident, cache KV gardé pour les affinages
             "options": {
                 "temperature": self.temperature,
                 "num_predict": self.max_tokens
             }
         }
-        
-        response = self._make_request("generate", data)
-        
+    
+    def _parse_recipe(self, response: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Extrait la recette JSON de la réponse Ollama."""
         if not response:
             logger.error("Impossible de générer la recette")
             return None
         
         try:
-            # Extraire le contenu de la réponse
-            content = response.get('response', '')
-            
-            # Nettoyer le contenu pour extraire le JSON
-            content = content.strip()
-            if content.startswith('```json'):
-                content = content[7:]
-            if content.endswith('```'):
-                content = content[:-3]
-            
-            # Parser le JSON
-            recipe_data = json.loads(content)
-            
-            # Mettre en cache pour 1 heure
-            cache.set(cache_key, recipe_data, 3600)
+            recipe_data = extract_json(response.get('response', ''), 'recette')
             
             logger.info(f"Recette générée avec succès: {recipe_data.get('nom', 'Sans nom')}")
             return recipe_data
-            
-        except json.JSONDecodeError as e:
+        
+        except JSONExtractionError as e:
             logger.error(f"Erreur lors du parsing JSON: {e}")
             logger.error(f"Contenu reçu: {response.get('response', '')}")
             return None
     
-    def analyze_cocktail_image(self, image_base64: str) -> Optional[Dict[str, Any]]:
+    def generate_cocktail_recipe(self, 
+                               ingredients: List[str], 
+                               style: str = "classique",
+                               difficulty: str = "facile") -> Optional[Dict[str, Any]]:
         """
-        Analyse une image de cocktail pour identifier les ingrédients et suggérer une recette.
+        Génère une recette de cocktail basée sur les ingrédients fournis.
         
         Args:
-            image_base64: Image encodée en base64
+            ingredients: Liste des ingrédients disponibles
+            style: Style de cocktail souhaité
+            difficulty: Niveau de difficulté
             
         Returns:
-            Analyse de l'image avec suggestions
+            Dictionnaire contenant la recette générée
+        """
+        # Créer une clé de cache unique
+        cache_key = self._recipe_cache_key(ingredients, style, difficulty)
+        cached_result = llm_cache.get(cache_key)
+        
+        if cached_result:
+            logger.info("Recette trouvée dans le cache")
+            return cached_result
+        
+        # Une seule génération pour toutes les requêtes identiques simultanées
+        return single_flight.do(
+            cache_key,
+            lambda: self._generate_recipe(cache_key, ingredients, style, difficulty)
+        )
+    
+    def _generate_recipe(self, cache_key: str, ingredients: List[str],
+                         style: str, difficulty: str) -> Optional[Dict[str, Any]]:
+        """Génère une recette auprès d'Ollama et la met en cache."""
+        data = self._build_recipe_request(ingredients, style, difficulty)
+        response = self._make_request("generate", data)
+        recipe_data = self._parse_recipe(response)
+        
+        if recipe_data:
+            # Mettre en cache pour 1 heure
+            llm_cache.set(cache_key, recipe_data, 3600)
+            self._remember_generation(self._generation_id(cache_key), recipe_data, response)
+        
+        return recipe_data
+    
+    def _iter_stream_tokens(self, response: requests.Response) -> Iterator[str]:
+        """Extrait les fragments de texte d'une réponse NDJSON streamée par Ollama."""
+        for line in response.iter_lines(decode_unicode=True):
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if chunk.get('error'):
+                raise ValueError(chunk['error'])
+            yield chunk.get('response', '')
+            if chunk.get('done'):
+                break
+    
+    def stream_cocktail_recipe(self,
+                               ingredients: List[str],
+                               style: str = "classique",
+                               difficulty: str = "facile") -> Iterator[Tuple[str, Any]]:
+        """
+        Génère une recette en streaming et publie ses champs dès qu'ils sont complets.
+        
+        La recette assemblée est mise en cache comme avec generate_cocktail_recipe ;
+        une recette déjà en cache est rejouée immédiatement.
+        
+        Args:
+            ingredients: Liste des ingrédients disponibles
+            style: Style de cocktail souhaité
+            difficulty: Niveau de difficulté
+            
+        Yields:
+            Tuples (événement, données) : 'field', 'item', puis 'recipe' ou 'error'
+        """
+        cache_key = self._recipe_cache_key(ingredients, style, difficulty)
+        cached_result = llm_cache.get(cache_key)
+        
+        if cached_result:
+            logger.info("Recette trouvée dans le cache")
+            yield from iter_cached_recipe_events(cached_result)
+            return
+        
+        data = self._build_recipe_request(ingredients, style, difficulty)
+        data['stream'] = True
+        
+        try:
+            response = self.session.post(
+                f"{self.base_url}/api/generate",
+                json=data,
+                timeout=self.timeout,
+                stream=True
+            )
+            response.raise_for_status()
+            health_monitor.record_success('ollama')
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Erreur lors de la requête Ollama: {e}")
+            if self._is_outage(e):
+                health_monitor.record_failure('ollama', str(e))
+            yield 'error', {'error': 'Service Ollama indisponible', 'code': 'OLLAMA_UNAVAILABLE'}
+            return
+        
+        # Fermer la réponse interrompt la génération côté Ollama dès que le JSON est complet
+        with response:
+            try:
+                for event, payload in iter_recipe_events(self._iter_stream_tokens(response)):
+                    if event == 'recipe':
+                        llm_cache.set(cache_key, payload, 3600)
+                        # Flux interrompu avant la fin : pas de contexte Ollama à réutiliser
+                        self._remember_generation(self._generation_id(cache_key), payload)
+                        logger.info(f"Recette générée avec succès: {payload.get('nom', 'Sans nom')}")
+                    yield event, payload
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logger.error(f"Erreur pendant le streaming Ollama: {e}")
+                yield 'error', {'error': 'Impossible de générer la recette', 'code': 'GENERATION_FAILED'}
+    
+    # ------------------------------------------------------------------
+    # Affinage conversationnel
+    # ------------------------------------------------------------------
+    
+    @staticmethod
+    def _generation_id(cache_key: str) -> str:
+        """Identifiant public d'une génération (empreinte de sa clé de cache)."""
+        return cache_key.rsplit(':', 1)[-1]
+    
+    @staticmethod
+    def _generation_key(generation_id: str) -> str:
+        return f"generation:{generation_id}"
+    
+    def recipe_generation_id(self, ingredients: List[str], style: str = "classique",
+                             difficulty: str = "facile") -> str:
+        """Identifiant de la génération servant une demande de recette."""
+        return self._generation_id(self._recipe_cache_key(ingredients, style, difficulty))
+    
+    def _remember_generation(self, generation_id: str, recipe: Dict[str, Any],
+                             response: Optional[Dict[str, Any]] = None):
         """
+        Conserve une recette et le contexte Ollama qui l'a produite.
+        
+        Le contexte (tokens du prompt et de la réponse) permet aux affinages
+        de n'envoyer que la nouvelle consigne : Ollama réutilise le cache KV
+        du modèle encore chargé au lieu de réévaluer tout le prompt initial.
+        Une génération déjà connue n'est pas écrasée par une version sans
+        contexte (recette streamée ou rejouée depuis le cache).
+        """
+        state = {
+            'recipe': recipe,
+            'context': (response or {}).get('context'),
+            'model': self.model,
+        }
+        key = self._generation_key(generation_id)
+        if state['context']:
+            llm_cache.set(key, state, self.context_timeout)
+        else:
+            llm_cache.add(key, state, self.context_timeout)
+    
+    def get_generation(self, generation_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Retourne une génération affinable (recette, contexte Ollama, modèle).
+        
+        Returns:
+            État de la génération ou None si elle est inconnue ou expirée
+        """
+        if not generation_id:
+            return None
+        return llm_cache.get(self._generation_key(str(generation_id)))
+    
+    def _refinement_cache_key(self, generation_id: str, instruction: str) -> str:
+        """Clé de cache d'un affinage (génération parente + consigne normalisée)."""
+        return make_cache_key('refinement', parent=generation_id, instruction=instruction)
+    
+    def _build_refinement_request(self, generation: Dict[str, Any], instruction: str) -> Dict[str, Any]:
+        """
+        Construit la requête d'affinage d'une recette.
+        
+        Avec le contexte de la génération parente, seule la consigne est
+        envoyée ; sinon (contexte absent ou modèle changé), la recette
+        précédente est rappelée en JSON, sans les instructions de format.
+        """
+        context = generation.get('context') if generation.get('model') == self.model else None
+        
+        if context:
+            prompt = f"""
+Modifie ce cocktail selon la demande suivante: {instruction}
+
+Réponds UNIQUEMENT avec la recette complète modifiée, dans le même format JSON.
+"""
+        else:
+            recipe_json = json.dumps(generation['recipe'], ensure_ascii=False)
+            prompt = f"""
+Tu es un barman expert français. Voici une recette de cocktail au format JSON:
+{recipe_json}
+
+Modifie ce cocktail selon la demande suivante: {instruction}
+
+Réponds UNIQUEMENT avec la recette complète modifiée, dans le même format JSON.
+"""
+        
+        data = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": False,
+            "keep_alive": keep_alive_for(self.model),
+            "options": {
+                "temperature": self.temperature,
+                "num_predict": self.max_tokens
+            }
+        }
+        if context:
+            data["context"] = context
+        return data
+    
+    @staticmethod
+    def _refinement_metrics(data: Dict[str, Any], response: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Mesures Ollama d'un affinage (durées converties de ns en ms)."""
+        response = response or {}
+        return {
+            'context_reused': 'context' in data,
+            'prompt_eval_count': response.get('prompt_eval_count'),
+            'prompt_eval_ms': round(response.get('prompt_eval_duration', 0) / 1e6, 1),
+            'eval_count': response.get('eval_count'),
+            'eval_ms': round(response.get('eval_duration', 0) / 1e6, 1),
+        }
+    
+    def refine_cocktail_recipe(self, generation_id: str, instruction: str) -> Optional[Dict[str, Any]]:
+        """
+        Affine une recette déjà générée ("moins sucré", "version sans alcool").
+        
+        Args:
+            generation_id: Identifiant de la génération à affiner
+            instruction: Consigne de modification
+            
+        Returns:
+            Dictionnaire {recipe, generation_id, parent_id, metrics}, ou None
+            si la génération est inconnue ou si l'affinage échoue. Le nouvel
+            identifiant permet d'enchaîner les affinages.
+        """
+        cache_key = self._refinement_cache_key(generation_id, instruction)
+        cached_result = llm_cache.get(cache_key)
+        
+        if cached_result:
+            logger.info("Affinage trouvé dans le cache")
+            return cached_result
+        
+        return single_flight.do(
+            cache_key,
+            lambda: self._refine_recipe(cache_key, generation_id, instruction)
+        )
+    
+    def _refine_recipe(self, cache_key: str, generation_id: str, instruction: str) -> Optional[Dict[str, Any]]:
+        """Affine une recette auprès d'Ollama et met le résultat en cache."""
+        generation = self.get_generation(generation_id)
+        if not generation:
+            return None
+        
+        data = self._build_refinement_request(generation, instruction)
+        response = self._make_request("generate", data)
+        recipe_data = self._parse_recipe(response)
+        if not recipe_data:
+            return None
+        
+        result = self._refinement_result(cache_key, generation_id, recipe_data, data, response)
+        llm_cache.set(cache_key, result, 3600)
+        self._remember_generation(result['generation_id'], recipe_data, response)
+        return result
+    
+    def _refinement_result(self, cache_key: str, generation_id: str, recipe: Dict[str, Any],
+                           data: Dict[str, Any], response: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        metrics = self._refinement_metrics(data, response)
+        logger.info(
+            f"Recette affinée: {recipe.get('nom', 'Sans nom')} "
+            f"(contexte réutilisé: {metrics['context_reused']}, "
+            f"{metrics['prompt_eval_count']} tokens de prompt en {metrics['prompt_eval_ms']} ms)"
+        )
+        return {
+            'recipe': recipe,
+            'generation_id': self._generation_id(cache_key),
+            'parent_id': generation_id,
+            'metrics': metrics,
+        }
+    
+    # ------------------------------------------------------------------
+    # Analyse d'image
+    # ------------------------------------------------------------------
+    
+    def _build_image_analysis_request(self, image_base64: str) -> Dict[str, Any]:
+        """Construit la requête Ollama pour l'analyse d'une image."""
         prompt = """
 Analyse cette image de cocktail et réponds UNIQUEMENT avec un JSON valide:
 
@@ -182,8 +622,9 @@ Analyse cette image de cocktail et réponds UNIQUEMENT avec un JSON valide:
 Ne réponds qu'avec le JSON, rien d'autre.
 """
         
-        data = {
+        return {
             "model": self.vision_model,
+            "keep_alive": keep_alive_for(self.vision_model),
             "prompt": prompt,
             "images": [image_base64],
             "stream": False,
@@ -192,47 +633,45 @@ Ne réponds qu'avec le JSON, rien d'autre.
                 "num_predict": 1000
             }
         }
-        
-        response = self._make_request("generate", data)
-        
+    
+    def _parse_image_analysis(self, response: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Extrait l'analyse JSON de la réponse Ollama."""
         if not response:
             logger.error("Impossible d'analyser l'image")
             return None
         
         try:
-            content = response.get('response', '').strip()
-            
-            # Nettoyer le contenu
-            if content.startswith('```json'):
-                content = content[7:]
-            if content.endswith('```'):
-                content = content[:-3]
-            
-            analysis_data = json.loads(content)
+            analysis_data = extract_json(response.get('response', ''), 'analyse_image')
             logger.info("Image analysée avec succès")
             return analysis_data
-            
-        except json.JSONDecodeError as e:
+        
+        except JSONExtractionError as e:
             logger.error(f"Erreur lors du parsing de l'analyse d'image: {e}")
             return None
     
-    def get_cocktail_suggestions(self, mood: str, occasion: str) -> Optional[List[Dict[str, Any]]]:
+    def analyze_cocktail_image(self, image_base64: str) -> Optional[Dict[str, Any]]:
         """
-        Suggère des cocktails basés sur l'humeur et l'occasion.
+        Analyse une image de cocktail pour identifier les ingrédients et suggérer une recette.
         
         Args:
-            mood: Humeur (joyeux, détendu, énergique, etc.)
-            occasion: Occasion (apéritif, soirée, dîner, etc.)
+            image_base64: Image encodée en base64
             
         Returns:
-            Liste de suggestions de cocktails
+            Analyse de l'image avec suggestions
         """
-        cache_key = f"suggestions_{mood}_{occasion}"
-        cached_result = cache.get(cache_key)
-        
-        if cached_result:
-            return cached_result
-        
+        data = self._build_image_analysis_request(image_base64)
+        return self._parse_image_analysis(self._make_request("generate", data))
+    
+    # ------------------------------------------------------------------
+    # Suggestions
+    # ------------------------------------------------------------------
+    
+    def _suggestions_cache_key(self, mood: str, occasion: str) -> str:
+        """Clé de cache des suggestions."""
+        return make_cache_key('suggestions', model=self.model, mood=mood, occasion=occasion)
+    
+    def _build_suggestions_request(self, mood: str, occasion: str) -> Dict[str, Any]:
+        """Construit la requête Ollama pour des suggestions de cocktails."""
         prompt = f"""
 Tu es un barman expert. Suggère 3 cocktails parfaits pour quelqu'un qui se sent {mood} 
 lors d'une occasion: {occasion}.
@@ -254,62 +693,75 @@ Réponds UNIQUEMENT avec un JSON valide:
 Ne réponds qu'avec le JSON, rien d'autre.
 """
         
-        data = {
+        return {
             "model": self.model,
             "prompt": prompt,
             "stream": False,
+            "keep_alive": keep_alive_for(self.model),
             "options": {
                 "temperature": 0.9,  # Plus créatif pour les suggestions
                 "num_predict": 1500
             }
         }
-        
-        response = self._make_request("generate", data)
-        
+    
+    def _parse_suggestions(self, response: Optional[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """Extrait la liste de suggestions de la réponse Ollama."""
         if not response:
             return None
         
         try:
-            content = response.get('response', '').strip()
-            
-            if content.startswith('```json'):
-                content = content[7:]
-            if content.endswith('```'):
-                content = content[:-3]
-            
-            suggestions_data = json.loads(content)
-            suggestions = suggestions_data.get('suggestions', [])
-            
-            # Mettre en cache pour 30 minutes
-            cache.set(cache_key, suggestions, 1800)
-            
-            return suggestions
-            
-        except json.JSONDecodeError as e:
+            suggestions_data = extract_json(response.get('response', ''), 'suggestions')
+            return suggestions_data.get('suggestions', [])
+        
+        except JSONExtractionError as e:
             logger.error(f"Erreur lors du parsing des suggestions: {e}")
             return None
     
-    def generate_image_prompt(self, cocktail_name: str, ingredients: List[str], 
-                            style: str = "classique", glass_type: str = "coupe", 
-                            garnish: str = "") -> Optional[str]:
+    def get_cocktail_suggestions(self, mood: str, occasion: str) -> Optional[List[Dict[str, Any]]]:
         """
-        Génère un prompt créatif pour Stable Diffusion basé sur les détails du cocktail.
+        Suggère des cocktails basés sur l'humeur et l'occasion.
         
         Args:
-            cocktail_name: Nom du cocktail
-            ingredients: Liste des ingrédients
-            style: Style du cocktail
-            glass_type: Type de verre
-            garnish: Garniture
+            mood: Humeur (joyeux, détendu, énergique, etc.)
+            occasion: Occasion (apéritif, soirée, dîner, etc.)
             
         Returns:
-            Prompt optimisé pour Stable Diffusion ou None en cas d'erreur
+            Liste de suggestions de cocktails
         """
-        try:
-            # Construire le prompt pour Ollama
-            ingredients_text = ", ".join(ingredients)
-            
-            prompt = f"""
+        cache_key = self._suggestions_cache_key(mood, occasion)
+        cached_result = llm_cache.get(cache_key)
+        
+        if cached_result:
+            return cached_result
+        
+        # Une seule génération pour toutes les requêtes identiques simultanées
+        return single_flight.do(
+            cache_key,
+            lambda: self._generate_suggestions(cache_key, mood, occasion)
+        )
+    
+    def _generate_suggestions(self, cache_key: str, mood: str, occasion: str) -> Optional[List[Dict[str, Any]]]:
+        """Génère des suggestions auprès d'Ollama et les met en cache."""
+        data = self._build_suggestions_request(mood, occasion)
+        suggestions = self._parse_suggestions(self._make_request("generate", data))
+        
+        if suggestions:
+            # Mettre en cache pour 30 minutes
+            llm_cache.set(cache_key, suggestions, 1800)
+        
+        return suggestions
+    
+    # ------------------------------------------------------------------
+    # Prompts d'image
+    # ------------------------------------------------------------------
+    
+    def _build_image_prompt_request(self, cocktail_name: str, ingredients: List[str],
+                                    style: str, glass_type: str, garnish: str) -> Dict[str, Any]:
+        """Construit la requête Ollama pour un prompt Stable Diffusion."""
+        # Construire le prompt pour Ollama
+        ingredients_text = ", ".join(ingredients)
+        
+        prompt = f"""
 Créez un prompt détaillé et artistique en anglais pour générer une image de cocktail avec Stable Diffusion.
 
 Détails du cocktail :
@@ -329,27 +781,74 @@ Le prompt doit :
 
 Répondez uniquement avec le prompt, sans explication.
 """
-            
-            data = {
-                "model": self.prompt_model,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "temperature": 0.9,  # Plus créatif pour les prompts
-                    "top_p": 0.9,
-                    "max_tokens": 300
-                }
+        
+        return {
+            "model": self.prompt_model,
+            "keep_alive": keep_alive_for(self.prompt_model),
+            "prompt": prompt,
+            "stream": False,
+            "options": {
+                "temperature": 0.9,  # Plus créatif pour les prompts
+                "top_p": 0.9,
+                "max_tokens": 300
             }
+        }
+    
+    @staticmethod
+    def _parse_image_prompt(response: Optional[Dict[str, Any]]) -> Optional[str]:
+        """Extrait le prompt Stable Diffusion de la réponse Ollama."""
+        if response and "response" in response:
+            return response["response"].strip()
+        return None
+    
+    def _image_prompt_cache_key(self, cocktail_name: str, ingredients: List[str],
+                                style: str, glass_type: str, garnish: str) -> str:
+        """Clé de cache du prompt d'image (mode reproductible)."""
+        return make_cache_key(
+            'image_prompt',
+            model=self.prompt_model,
+            cocktail_name=cocktail_name,
+            ingredients=normalize_ingredients(ingredients),
+            style=style,
+            glass_type=glass_type,
+            garnish=garnish,
+        )
+    
+    def generate_image_prompt(self, cocktail_name: str, ingredients: List[str], 
+                            style: str = "classique", glass_type: str = "coupe", 
+                            garnish: str = "", reproducible: bool = False) -> Optional[str]:
+        """
+        Génère un prompt créatif pour Stable Diffusion basé sur les détails du cocktail.
+        
+        Args:
+            cocktail_name: Nom du cocktail
+            ingredients: Liste des ingrédients
+            style: Style du cocktail
+            glass_type: Type de verre
+            garnish: Garniture
+            reproducible: Réutiliser le prompt déjà généré pour ces détails, afin
+                          qu'une même demande aboutisse à la même image
             
-            response = self._make_request("/api/generate", data)
-            if response and "response" in response:
-                return response["response"].strip()
-                
-            return None
-            
+        Returns:
+            Prompt optimisé pour Stable Diffusion ou None en cas d'erreur
+        """
+        cache_key = self._image_prompt_cache_key(cocktail_name, ingredients, style, glass_type, garnish)
+        if reproducible:
+            cached_prompt = llm_cache.get(cache_key)
+            if cached_prompt:
+                return cached_prompt
+        
+        try:
+            data = self._build_image_prompt_request(cocktail_name, ingredients, style, glass_type, garnish)
+            prompt = self._parse_image_prompt(self._make_request("generate", data))
+        
         except Exception as e:
             logger.error(f"Erreur lors de la génération du prompt d'image: {e}")
             return None
+        
+        if prompt and reproducible:
+            llm_cache.set(cache_key, prompt, getattr(settings, 'IMAGE_CACHE_TIMEOUT', 2592000))
+        return prompt
     
     def is_available(self) -> bool:
         """
@@ -359,11 +858,241 @@ Répondez uniquement avec le prompt, sans explication.
             True si Ollama est accessible, False sinon
         """
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=5)
             return response.status_code == 200
         except requests.exceptions.RequestException:
             return False
 
 
-# Instance globale du service
-ollama_service = OllamaService()
\ No newline at end of file
+class AsyncOllamaService(OllamaService):
+    """
+    Variante asyncio d'OllamaService pour les vues servies sous ASGI.
+    
+    Les prompts, le parsing et les clés de cache sont hérités du service
+    synchrone ; seules les entrées/sorties deviennent non bloquantes. Sans
+    httpx, les requêtes sont déléguées au client synchrone dans un thread.
+    """
+    
+    async def _make_request(self, endpoint: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Effectue une requête non bloquante vers l'API Ollama.
+        
+        Applique la même politique de retry que la session synchrone :
+        erreurs de connexion et réponses 5xx, jamais après un timeout de lecture.
+        
+        Args:
+            endpoint: Point de terminaison de l'API
+            data: Données à envoyer
+            
+        Returns:
+            Réponse de l'API ou None en cas d'erreur
+        """
+        if not HTTPX_AVAILABLE:
+            return await sync_to_async(super()._make_request)(endpoint, data)
+        
+        url = f"{self.base_url}/api/{endpoint}"
+        max_retries = getattr(settings, 'OLLAMA_MAX_RETRIES', 2)
+        
+        for attempt in range(max_retries + 1):
+            try:
+                response = await get_async_http_client().post(url, json=data, timeout=self.timeout)
+                if response.status_code >= 500 and attempt < max_retries:
+                    await asyncio.sleep(get_retry_delay(attempt))
+                    continue
+                response.raise_for_status()
+                await health_monitor.arecord_success('ollama')
+                return response.json()
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                if attempt < max_retries:
+                    await asyncio.sleep(get_retry_delay(attempt))
+                    continue
+                logger.error(f"Erreur lors de la requête Ollama: {e}")
+                await health_monitor.arecord_failure('ollama', str(e))
+                return None
+            except (httpx.HTTPError, ValueError) as e:
+                logger.error(f"Erreur lors de la requête Ollama: {e}")
+                if self._is_outage(e):
+                    await health_monitor.arecord_failure('ollama', str(e))
+                return None
+        return None
+    
+    async def generate_cocktail_recipe(self,
+                                       ingredients: List[str],
+                                       style: str = "classique",
+                                       difficulty: str = "facile") -> Optional[Dict[str, Any]]:
+        """Version asynchrone de OllamaService.generate_cocktail_recipe."""
+        cache_key = self._recipe_cache_key(ingredients, style, difficulty)
+        cached_result = await llm_cache.aget(cache_key)
+        
+        if cached_result:
+            logger.info("Recette trouvée dans le cache")
+            return cached_result
+        
+        return await single_flight.ado(
+            cache_key,
+            lambda: self._generate_recipe(cache_key, ingredients, style, difficulty)
+        )
+    
+    async def _generate_recipe(self, cache_key: str, ingredients: List[str],
+                               style: str, difficulty: str) -> Optional[Dict[str, Any]]:
+        """Version asynchrone de OllamaService._generate_recipe."""
+        data = self._build_recipe_request(ingredients, style, difficulty)
+        response = await self._make_request("generate", data)
+        recipe_data = self._parse_recipe(response)
+        
+        if recipe_data:
+            await llm_cache.aset(cache_key, recipe_data, 3600)
+            await sync_to_async(self._remember_generation)(self._generation_id(cache_key), recipe_data, response)
+        
+        return recipe_data
+    
+    async def stream_cocktail_recipe(self,
+                                     ingredients: List[str],
+                                     style: str = "classique",
+                                     difficulty: str = "facile") -> AsyncIterator[Tuple[str, Any]]:
+        """Version asynchrone de OllamaService.stream_cocktail_recipe."""
+        cache_key = self._recipe_cache_key(ingredients, style, difficulty)
+        cached_result = await llm_cache.aget(cache_key)
+        
+        if cached_result:
+            logger.info("Recette trouvée dans le cache")
+            for event in iter_cached_recipe_events(cached_result):
+                yield event
+            return
+        
+        data = self._build_recipe_request(ingredients, style, difficulty)
+        data['stream'] = True
+        parser = IncrementalJSONParser()
+        
+        try:
+            async with get_async_http_client().stream(
+                'POST', f"{self.base_url}/api/generate", json=data, timeout=self.timeout
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get('error'):
+                        raise ValueError(chunk['error'])
+                    for event in parser.feed(chunk.get('response', '')):
+                        yield recipe_event(event)
+                    if parser.complete or chunk.get('done'):
+                        break
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"Erreur pendant le streaming Ollama: {e}")
+            yield 'error', {'error': 'Impossible de générer la recette', 'code': 'GENERATION_FAILED'}
+            return
+        
+        recipe = parser.result()
+        if recipe is None:
+            yield 'error', {'error': 'Réponse JSON incomplète ou invalide', 'code': 'GENERATION_FAILED'}
+            return
+        
+        await llm_cache.aset(cache_key, recipe, 3600)
+        await sync_to_async(self._remember_generation)(self._generation_id(cache_key), recipe)
+        logger.info(f"Recette générée avec succès: {recipe.get('nom', 'Sans nom')}")
+        yield 'recipe', recipe
+    
+    async def get_generation(self, generation_id: str) -> Optional[Dict[str, Any]]:
+        """Version asynchrone de OllamaService.get_generation."""
+        if not generation_id:
+            return None
+        return await llm_cache.aget(self._generation_key(str(generation_id)))
+    
+    async def refine_cocktail_recipe(self, generation_id: str, instruction: str) -> Optional[Dict[str, Any]]:
+        """Version asynchrone de OllamaService.refine_cocktail_recipe."""
+        cache_key = self._refinement_cache_key(generation_id, instruction)
+        cached_result = await llm_cache.aget(cache_key)
+        
+        if cached_result:
+            logger.info("Affinage trouvé dans le cache")
+            return cached_result
+        
+        return await single_flight.ado(
+            cache_key,
+            lambda: self._refine_recipe(cache_key, generation_id, instruction)
+        )
+    
+    async def _refine_recipe(self, cache_key: str, generation_id: str, instruction: str) -> Optional[Dict[str, Any]]:
+        """Version asynchrone de OllamaService._refine_recipe."""
+        generation = await self.get_generation(generation_id)
+        if not generation:
+            return None
+        
+        data = self._build_refinement_request(generation, instruction)
+        response = await self._make_request("generate", data)
+        recipe_data = self._parse_recipe(response)
+        if not recipe_data:
+            return None
+        
+        result = self._refinement_result(cache_key, generation_id, recipe_data, data, response)
+        await llm_cache.aset(cache_key, result, 3600)
+        await sync_to_async(self._remember_generation)(result['generation_id'], recipe_data, response)
+        return result
+    
+    async def analyze_cocktail_image(self, image_base64: str) -> Optional[Dict[str, Any]]:
+        """Version asynchrone de OllamaService.analyze_cocktail_image."""
+        data = self._build_image_analysis_request(image_base64)
+        return self._parse_image_analysis(await self._make_request("generate", data))
+    
+    async def get_cocktail_suggestions(self, mood: str, occasion: str) -> Optional[List[Dict[str, Any]]]:
+        """Version asynchrone de OllamaService.get_cocktail_suggestions."""
+        cache_key = self._suggestions_cache_key(mood, occasion)
+        cached_result = await llm_cache.aget(cache_key)
+        
+        if cached_result:
+            return cached_result
+        
+        return await single_flight.ado(
+            cache_key,
+            lambda: self._generate_suggestions(cache_key, mood, occasion)
+        )
+    
+    async def _generate_suggestions(self, cache_key: str, mood: str, occasion: str) -> Optional[List[Dict[str, Any]]]:
+        """Version asynchrone de OllamaService._generate_suggestions."""
+        data = self._build_suggestions_request(mood, occasion)
+        suggestions = self._parse_suggestions(await self._make_request("generate", data))
+        
+        if suggestions:
+            await llm_cache.aset(cache_key, suggestions, 1800)
+        
+        return suggestions
+    
+    async def generate_image_prompt(self, cocktail_name: str, ingredients: List[str],
+                                    style: str = "classique", glass_type: str = "coupe",
+                                    garnish: str = "", reproducible: bool = False) -> Optional[str]:
+        """Version asynchrone de OllamaService.generate_image_prompt."""
+        cache_key = self._image_prompt_cache_key(cocktail_name, ingredients, style, glass_type, garnish)
+        if reproducible:
+            cached_prompt = await llm_cache.aget(cache_key)
+            if cached_prompt:
+                return cached_prompt
+        
+        try:
+            data = self._build_image_prompt_request(cocktail_name, ingredients, style, glass_type, garnish)
+            prompt = self._parse_image_prompt(await self._make_request("generate", data))
+        
+        except Exception as e:
+            logger.error(f"Erreur lors de la génération du prompt d'image: {e}")
+            return None
+        
+        if prompt and reproducible:
+            await llm_cache.aset(cache_key, prompt, getattr(settings, 'IMAGE_CACHE_TIMEOUT', 2592000))
+        return prompt
+    
+    async def is_available(self) -> bool:
+        """Version asynchrone de OllamaService.is_available."""
+        if not HTTPX_AVAILABLE:
+            return await sync_to_async(super().is_available)()
+        
+        try:
+            response = await get_async_http_client().get(f"{self.base_url}/api/tags", timeout=5)
+            return response.status_code == 200
+        except httpx.HTTPError:
+            return False
+
+
+# Instances globales du service
+ollama_service = OllamaService()
+async_ollama_service = AsyncOllamaService()
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Pagination
+- Par curseur (keyset) sur (created_at, id) pour l'API : au lieu d'un OFFSET
+  dont le coût croît avec le numéro de page, chaque page reprend strictement
+  après la dernière ligne servie et lit exactement limit + 1 lignes, quelle
+  que soit la taille de la table.
+- Par numéro de page pour l'historique, avec un total mis en cache et
+  recalculé en arrière-plan plutôt qu'un COUNT(*) à chaque page vue.
+"""
+
+import base64
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidCursor(ValueError):
+    """Curseur illisible ou falsifié."""
+
+
+def encode_cursor(created_at: datetime, pk: int) -> str:
+    """Encode la position d'une ligne en curseur opaque (base64 URL)."""
+    payload = json.dumps([created_at.isoformat(), pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Décode un curseur produit par encode_cursor.
+
+    Raises:
+        InvalidCursor: Si le curseur n'est pas valide
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, pk = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise InvalidCursor(f"Curseur invalide: {cursor}") from e
+
+
+def keyset_page(queryset: QuerySet, cursor: Optional[str], limit: int) -> Tuple[List[Any], Optional[str]]:
+    """
+    Retourne une page du queryset, du plus récent au plus ancien.
+
+    Args:
+        queryset: Queryset d'objets ayant created_at et id (projection .only() possible)
+        cursor: Curseur de la page précédente, None pour la première page
+        limit: Nombre maximal d'objets
+
+    Returns:
+        Tuple (objets de la page, curseur de la page suivante ou None)
+
+    Raises:
+        InvalidCursor: Si le curseur n'est pas valide
+    """
+    queryset = queryset.order_by('-created_at', '-id')
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    
+    # Une ligne de plus indique s'il existe une page suivante, sans COUNT(*)
+    rows = list(queryset[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
+
+
+# ----------------------------------------------------------------------
+# Total mis en cache
+# ----------------------------------------------------------------------
+
+def estimate_count(queryset: QuerySet) -> Optional[int]:
+    """
+    Estimation du nombre de lignes d'une table par les statistiques de PostgreSQL.
+
+    Returns:
+        Estimation, ou None si la base n'en fournit pas ou si le queryset est filtré
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql' or queryset.query.where:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [queryset.model._meta.db_table])
+        row = cursor.fetchone()
+    # -1 : table jamais analysée
+    return int(row[0]) if row and row[0] >= 0 else None
+
+
+def _store_count(key: str, version: Optional[int], count: int):
+    cache.set(key, {'count': count, 'version': version, 'computed_at': time.time()}, None)
+
+
+def _refresh_count(queryset: QuerySet, key: str, version: int):
+    try:
+        _store_count(key, version, queryset.count())
+    except Exception as e:
+        logger.error(f"Échec du recalcul du total {key}: {e}")
+    finally:
+        cache.delete(f"{key}:refresh")
+        # Connexions ouvertes par ce thread
+        connections.close_all()
+
+
+def cached_count(queryset: QuerySet, key: str, version: int) -> int:
+    """
+    Nombre de lignes d'un queryset, servi depuis le cache partagé.
+
+    Le premier appel compte (ou estime, pour une grande table PostgreSQL) et
+    met le total en cache. Ensuite, un total calculé pour une version
+    antérieure des données ou plus vieux que COUNT_CACHE_MAX_AGE est encore
+    servi, pendant qu'un seul thread (tous workers confondus) le recalcule.
+
+    Args:
+        queryset: Lignes à compter
+        key: Clé de cache du total
+        version: Version courante des données (voir versions.data_version)
+
+    Returns:
+        Total exact ou légèrement en retard sur les dernières écritures
+    """
+    entry = cache.get(key)
+    if entry is None:
+        estimate = estimate_count(queryset)
+        if estimate is not None and estimate >= getattr(settings, 'COUNT_ESTIMATE_THRESHOLD', 100000):
+            # Estimation servie tout de suite, total exact calculé en arrière-plan
+            _store_count(key, None, estimate)
+            entry = {'count': estimate, 'version': None, 'computed_at': 0}
+        else:
+            count = queryset.count()
+            _store_count(key, version, count)
+            return count
+    
+    stale = (entry['version'] != version
+             or time.time() - entry['computed_at'] > getattr(settings, 'COUNT_CACHE_MAX_AGE', 300))
+    if stale and cache.add(f"{key}:refresh", True, 60):
+        threading.Thread(target=_refresh_count, args=(queryset, key, version),
+                         name='count-refresh', daemon=True).start()
+    return entry['count']
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator dont le total vient de cached_count (pas de COUNT(*) par page vue)."""
+    
+    def __init__(self, object_list, per_page, count_key: str, version: int, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+        self.version = version
+    
+    @cached_property
+    def count(self):
+        return cached_count(self.object_list, self.count_key, self.version)
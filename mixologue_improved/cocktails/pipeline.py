@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Exécuteur de pipelines en graphe de dépendances
+Chaque étape déclare les valeurs dont elle a besoin ; elle démarre dès que
+celles-ci sont disponibles, en parallèle des autres étapes prêtes. Une
+étape peut publier une valeur intermédiaire avant d'avoir fini (ex: le nom
+et les ingrédients d'une recette encore en cours de génération), ce qui
+débloque plus tôt les étapes qui en dépendent.
+
+Chaque exécution a ses propres threads (autant que d'étapes) : les étapes
+d'une requête n'attendent jamais derrière celles d'une autre.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class StageContext:
+    """
+    Contexte passé à une étape : lecture des valeurs disponibles et
+    publication de valeurs intermédiaires.
+    """
+    
+    def __init__(self, run: 'PipelineRun'):
+        self._run = run
+    
+    def __getitem__(self, key: str) -> Any:
+        return self._run.values[key]
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._run.values.get(key, default)
+    
+    def publish(self, key: str, value: Any):
+        """Rend une valeur disponible aux étapes qui l'attendent."""
+        self._run.publish(key, value)
+
+
+class Stage:
+    """Étape du pipeline : fonction(contexte) dont le résultat est publié sous son nom."""
+    
+    def __init__(self, name: str, func: Callable[[StageContext], Any], requires: Iterable[str]):
+        self.name = name
+        self.func = func
+        self.requires = tuple(requires)
+
+
+class PipelineRun:
+    """
+    Exécution d'un pipeline : valeurs publiées, durées et erreurs par étape.
+
+    Une fois execute() terminé (y compris sur timeout), values, timings et
+    errors ne sont plus modifiés : les étapes encore en cours finissent
+    sans rien publier.
+    """
+    
+    def __init__(self, stages: List[Stage], values: Dict[str, Any]):
+        self.stages = stages
+        self.values = dict(values)
+        self.timings: Dict[str, Dict[str, float]] = {}
+        self.errors: Dict[str, str] = {}
+        self.started = time.monotonic()
+        self._pending = list(stages)
+        self._running = 0
+        self._closed = False
+        self._condition = threading.Condition()
+    
+    def publish(self, key: str, value: Any):
+        with self._condition:
+            if not self._closed and key not in self.values:
+                self.values[key] = value
+                self._condition.notify_all()
+    
+    def _elapsed_ms(self) -> float:
+        return round((time.monotonic() - self.started) * 1000, 1)
+    
+    def _execute(self, stage: Stage):
+        context = StageContext(self)
+        start_ms = self._elapsed_ms()
+        try:
+            result = stage.func(context)
+        except Exception as e:
+            logger.error(f"Échec de l'étape {stage.name}: {e}")
+            with self._condition:
+                if not self._closed:
+                    self.errors[stage.name] = str(e)
+        else:
+            if result is not None:
+                self.publish(stage.name, result)
+        finally:
+            # Connexions base de données ouvertes par ce thread
+            connections.close_all()
+            end_ms = self._elapsed_ms()
+            with self._condition:
+                if not self._closed:
+                    self.timings[stage.name] = {
+                        'start_ms': start_ms,
+                        'duration_ms': round(end_ms - start_ms, 1),
+                    }
+                self._running -= 1
+                self._condition.notify_all()
+    
+    def execute(self, timeout: Optional[float] = None) -> 'PipelineRun':
+        """
+        Lance les étapes dès que leurs dépendances sont publiées et attend la fin.
+
+        Une étape dont une dépendance ne sera jamais publiée (étape en échec
+        ou sans résultat) est ignorée.
+        """
+        # Un thread par étape au plus : toutes les étapes prêtes démarrent aussitôt
+        executor = ThreadPoolExecutor(max_workers=max(1, len(self.stages)),
+                                      thread_name_prefix='pipeline-stage')
+        deadline = None if timeout is None else time.monotonic() + timeout
+        
+        try:
+            with self._condition:
+                while True:
+                    ready = [stage for stage in self._pending
+                             if all(key in self.values for key in stage.requires)]
+                    for stage in ready:
+                        self._pending.remove(stage)
+                        self._running += 1
+                        executor.submit(self._execute, stage)
+                    
+                    if self._running == 0 and not ready:
+                        break
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        logger.warning(f"Pipeline interrompu après {timeout}s")
+                        break
+                    self._condition.wait(remaining)
+                
+                # Instantané : les étapes encore en cours n'écrivent plus rien
+                self._closed = True
+                self.values = dict(self.values)
+                self.timings = dict(self.timings)
+                self.errors = dict(self.errors)
+        finally:
+            # Sur timeout, les étapes en cours terminent dans leurs threads
+            executor.shutdown(wait=False)
+        
+        for stage in self._pending:
+            logger.info(f"Étape {stage.name} ignorée (dépendances manquantes)")
+        self.timings['total'] = {'start_ms': 0.0, 'duration_ms': self._elapsed_ms()}
+        return self
+
+
+class Pipeline:
+    """
+    Définition d'un pipeline : ensemble d'étapes et de leurs dépendances.
+
+    Exemple:
+        pipeline = Pipeline()
+        pipeline.stage('recipe', generate_recipe, requires=['user_request'])
+        pipeline.stage('save', save, requires=['recipe'])
+        run = pipeline.run(user_request="un spritz")
+    """
+    
+    def __init__(self):
+        self.stages: List[Stage] = []
+    
+    def stage(self, name: str, func: Callable[[StageContext], Any], requires: Iterable[str] = ()):
+        """Ajoute une étape ; son résultat (si non None) est publié sous name."""
+        self.stages.append(Stage(name, func, requires))
+        return self
+    
+    def run(self, timeout: Optional[float] = None, **inputs: Any) -> PipelineRun:
+        """
+        Exécute le pipeline.
+
+        Args:
+            timeout: Durée maximale d'attente en secondes
+            **inputs: Valeurs initiales disponibles pour les étapes
+
+        Returns:
+            Exécution terminée (values, timings, errors)
+        """
+        return PipelineRun(self.stages, inputs).execute(timeout)
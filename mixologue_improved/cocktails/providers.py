@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+Registre des fournisseurs de génération de cocktails
+Ce module remplace la chaîne codée en dur Ollama -> OpenAI -> démo par un
+registre qui mesure le taux de succès et la latence p95 de chaque fournisseur
+et ordonne les tentatives en conséquence.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderStats:
+    """
+    Statistiques glissantes d'un fournisseur (N derniers appels).
+    """
+    
+    def __init__(self, window: int):
+        self.calls = deque(maxlen=window)
+        self.last_failure = None
+        self._lock = threading.Lock()
+    
+    def record(self, success: bool, latency: float):
+        """Enregistre le résultat et la durée (secondes) d'un appel."""
+        with self._lock:
+            self.calls.append((success, latency))
+            if not success:
+                self.last_failure = time.time()
+    
+    @property
+    def samples(self) -> int:
+        return len(self.calls)
+    
+    @property
+    def success_rate(self) -> Optional[float]:
+        with self._lock:
+            if not self.calls:
+                return None
+            return sum(1 for success, _ in self.calls if success) / len(self.calls)
+    
+    @property
+    def p95_latency(self) -> Optional[float]:
+        """Latence p95 en secondes, échecs compris (un timeout coûte aussi)."""
+        with self._lock:
+            latencies = sorted(latency for _, latency in self.calls)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+
+
+class Provider:
+    """
+    Fournisseur de génération enregistré dans le registre.
+    """
+    
+    def __init__(self, name: str, generate: Callable, enabled: Callable[[], bool],
+                 fallback: bool, window: int):
+        self.name = name
+        self.generate = generate
+        self.agenerate = None
+        self.enabled = enabled
+        self.fallback = fallback
+        self.stats = ProviderStats(window)
+
+
+class ProviderRegistry:
+    """
+    Registre de fournisseurs ordonnés par coût attendu.
+
+    Le coût attendu d'un fournisseur est sa latence p95 divisée par son taux
+    de succès (temps moyen pour obtenir une réponse utilisable). Un
+    fournisseur dont le taux d'erreur dépasse PROVIDER_MAX_ERROR_RATE est
+    ignoré, sauf une tentative de réhabilitation toutes les
+    PROVIDER_PROBATION_INTERVAL secondes. Les fournisseurs de secours
+    (fallback) sont toujours tentés en dernier.
+    """
+    
+    def __init__(self):
+        self.providers: Dict[str, Provider] = {}
+        self.window = getattr(settings, 'PROVIDER_STATS_WINDOW', 50)
+        self.min_samples = getattr(settings, 'PROVIDER_MIN_SAMPLES', 5)
+        self.max_error_rate = getattr(settings, 'PROVIDER_MAX_ERROR_RATE', 0.5)
+        self.probation_interval = getattr(settings, 'PROVIDER_PROBATION_INTERVAL', 60)
+    
+    def register(self, name: str, generate: Callable[[str], Dict[str, Any]],
+                 enabled: Optional[Callable[[], bool]] = None, fallback: bool = False):
+        """
+        Enregistre un fournisseur.
+
+        Args:
+            name: Nom du fournisseur
+            generate: Fonction (user_request, on_field=None) -> données du cocktail
+                (lève en cas d'échec) ; les fournisseurs qui streament appellent
+                on_field(champ, valeur) dès qu'un champ est connu
+            enabled: Fonction indiquant si le fournisseur est utilisable (clé API, disjoncteur...)
+            fallback: Fournisseur de dernier recours, jamais ignoré ni réordonné
+        """
+        self.providers[name] = Provider(name, generate, enabled or (lambda: True), fallback, self.window)
+    
+    def register_async(self, name: str, agenerate: Callable):
+        """Associe une variante asynchrone à un fournisseur déjà enregistré."""
+        self.providers[name].agenerate = agenerate
+    
+    def _expected_cost(self, provider: Provider) -> float:
+        stats = provider.stats
+        if stats.samples < self.min_samples:
+            return 0.0  # Pas assez de mesures : on explore en priorité
+        return stats.p95_latency / max(stats.success_rate, 0.05)
+    
+    def _is_degraded(self, provider: Provider) -> bool:
+        stats = provider.stats
+        if provider.fallback or stats.samples < self.min_samples:
+            return False
+        return 1 - stats.success_rate > self.max_error_rate
+    
+    def _on_probation(self, provider: Provider) -> bool:
+        last_failure = provider.stats.last_failure or 0
+        return time.time() - last_failure >= self.probation_interval
+    
+    def ordered(self) -> List[Provider]:
+        """
+        Retourne les fournisseurs à tenter, dans l'ordre.
+
+        Returns:
+            Fournisseurs actifs triés par coût attendu, secours en dernier
+        """
+        candidates = []
+        for index, provider in enumerate(self.providers.values()):
+            if not provider.enabled():
+                continue
+            if self._is_degraded(provider) and not self._on_probation(provider):
+                continue
+            candidates.append((provider.fallback, self._expected_cost(provider), index, provider))
+        
+        candidates.sort(key=lambda candidate: candidate[:3])
+        return [candidate[3] for candidate in candidates]
+    
+    def ranking(self) -> List[Dict[str, Any]]:
+        """
+        Classement courant des fournisseurs (pour inspection).
+
+        Returns:
+            Liste de dictionnaires dans l'ordre de tentative, fournisseurs
+            ignorés à la fin
+        """
+        order = {provider.name: rank for rank, provider in enumerate(self.ordered(), 1)}
+        ranking = []
+        for provider in self.providers.values():
+            stats = provider.stats
+            success_rate = stats.success_rate
+            p95 = stats.p95_latency
+            ranking.append({
+                'name': provider.name,
+                'rank': order.get(provider.name),
+                'enabled': provider.enabled(),
+                'skipped': provider.name not in order,
+                'fallback': provider.fallback,
+                'samples': stats.samples,
+                'success_rate': round(success_rate, 3) if success_rate is not None else None,
+                'p95_latency_ms': round(p95 * 1000, 1) if p95 is not None else None,
+            })
+        ranking.sort(key=lambda entry: (entry['rank'] is None, entry['rank'] or 0))
+        return ranking
+    
+    def generate(self, user_request: str, **options) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Génère un cocktail avec le premier fournisseur qui réussit.
+
+        Args:
+            user_request: Demande du client
+            **options: Options transmises au fournisseur (ex: on_field)
+
+        Returns:
+            Tuple (données du cocktail, nom du fournisseur) ou (None, None)
+        """
+        for provider in self.ordered():
+            started = time.monotonic()
+            try:
+                cocktail_data = provider.generate(user_request, **options)
+            except Exception as e:
+                logger.warning(f"Échec du fournisseur {provider.name}: {e}")
+                cocktail_data = None
+            success = bool(cocktail_data)
+            provider.stats.record(success, time.monotonic() - started)
+            if success:
+                logger.info(f"Cocktail généré avec {provider.name}")
+                return cocktail_data, provider.name
+        return None, None
+    
+    async def agenerate(self, user_request: str, **options) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Version asynchrone de generate (variante async du fournisseur si disponible)."""
+        # enabled() peut consulter le disjoncteur (cache SQLite) : hors de la boucle
+        providers = await sync_to_async(self.ordered, thread_sensitive=False)()
+        for provider in providers:
+            started = time.monotonic()
+            try:
+                if provider.agenerate is not None:
+                    cocktail_data = await provider.agenerate(user_request, **options)
+                elif provider.fallback:
+                    # Secours local, sans entrées/sorties
+                    cocktail_data = provider.generate(user_request, **options)
+                else:
+                    cocktail_data = await sync_to_async(provider.generate, thread_sensitive=False)(user_request, **options)
+            except Exception as e:
+                logger.warning(f"Échec du fournisseur {provider.name}: {e}")
+                cocktail_data = None
+            success = bool(cocktail_data)
+            provider.stats.record(success, time.monotonic() - started)
+            if success:
+                logger.info(f"Cocktail généré avec {provider.name}")
+                return cocktail_data, provider.name
+        return None, None
@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""
+Recommandations de cocktails similaires
+Chaque cocktail est une ligne d'une matrice creuse cocktail x ingrédient
+(poids TF-IDF, lignes normalisées) construite à partir du catalogue
+d'ingrédients. La similarité cosinus avec tous les cocktails se calcule en
+une multiplication matricielle limitée aux colonnes des ingrédients du
+cocktail demandé, puis un argpartition garde les meilleurs.
+
+La matrice est enregistrée sur disque (RECOMMENDATION_INDEX_PATH) pour que
+chaque worker la charge au lieu de la reconstruire ; les cocktails créés
+ensuite sont ajoutés de façon incrémentale dans une petite matrice delta,
+fusionnée dans la matrice principale tous les RECOMMENDATION_MERGE_ROWS.
+Une modification d'ingrédients ou une suppression incrémente la version
+des ingrédients (versions.py) : la matrice, et le fichier qui porte cette
+version, sont alors reconstruits au premier usage.
+
+Sans NumPy/SciPy, le même cosinus (sur ingrédients non pondérés) est
+calculé en SQL par l'index inversé ingrédient -> cocktails.
+"""
+
+import logging
+import math
+import os
+import threading
+from typing import List, Optional, Tuple
+from django.conf import settings
+from django.db.models import Count, Q
+from .versions import ingredients_version
+
+try:
+    import numpy as np
+    from scipy import sparse
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT_VERSION = 2
+# Candidats examinés par le repli SQL avant le tri par cosinus
+SQL_FALLBACK_CANDIDATES = 200
+
+
+def _idf(document_frequency, document_count):
+    # Même lissage que l'index de similarité des demandes
+    return np.log((document_count + 1) / (document_frequency + 1)) + 1
+
+
+def _with_columns(matrix, n_cols):
+    """Copie d'une matrice CSC élargie à n_cols colonnes (sans modifier l'original)."""
+    extra = np.full(n_cols - matrix.shape[1], matrix.indptr[-1], dtype=matrix.indptr.dtype)
+    return sparse.csc_matrix((matrix.data, matrix.indices, np.concatenate([matrix.indptr, extra])),
+                             shape=(matrix.shape[0], n_cols))
+
+
+def _normalized_rows(rows, cols, data, shape):
+    """Matrice CSC aux lignes de norme 1 (le cosinus devient un produit scalaire)."""
+    matrix = sparse.csr_matrix((data, (rows, cols)), shape=shape)
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    # float32 : deux fois moins de mémoire et de bande passante qu'en float64
+    return (sparse.diags(1.0 / norms) @ matrix).astype(np.float32).tocsc()
+
+
+class IngredientMatrix:
+    """
+    Matrice cocktail x ingrédient et recherche des plus proches voisins.
+
+    Les colonnes sont les identifiants d'Ingredient, les lignes les cocktails
+    par identifiant croissant (tableau cocktail_ids, sans dictionnaire d'un
+    million d'entrées). La matrice est stockée en CSC pour lire directement
+    les colonnes des ingrédients du cocktail demandé ; elle n'est jamais
+    modifiée en place, les recherches en cours gardent une version cohérente.
+    """
+    
+    def __init__(self):
+        self.path = getattr(settings, 'RECOMMENDATION_INDEX_PATH', os.path.join(settings.BASE_DIR, 'recommendations.npz'))
+        self.merge_rows = getattr(settings, 'RECOMMENDATION_MERGE_ROWS', 1000)
+        self.matrix = None
+        self.cocktail_ids = None
+        self.idf = None
+        self.delta = None
+        self.delta_ids = None
+        self._pending: List[Tuple[int, List[int]]] = []
+        self.last_id = None
+        self.data_version = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+    
+    # ------------------------------------------------------------------
+    # Construction et persistance
+    # ------------------------------------------------------------------
+    
+    def build(self):
+        """Construit la matrice à partir de toute la table CocktailIngredient."""
+        from .models import CocktailIngredient
+        
+        # Lue avant les données : une écriture pendant la construction force une reconstruction
+        version = ingredients_version()
+        pairs = CocktailIngredient.objects.order_by('cocktail_id').values_list('cocktail_id', 'ingredient_id')
+        flat = np.fromiter((value for pair in pairs.iterator(chunk_size=10000) for value in pair), dtype=np.int64)
+        cocktail_column, ingredient_column = flat[0::2], flat[1::2]
+        
+        cocktail_ids, rows = np.unique(cocktail_column, return_inverse=True)
+        n_cols = int(ingredient_column.max()) + 1 if len(ingredient_column) else 1
+        idf = _idf(np.bincount(ingredient_column, minlength=n_cols), len(cocktail_ids))
+        matrix = _normalized_rows(rows, ingredient_column, idf[ingredient_column], (len(cocktail_ids), n_cols))
+        
+        with self._lock:
+            self.matrix, self.cocktail_ids, self.idf = matrix, cocktail_ids, idf
+            self.delta, self.delta_ids, self._pending = None, None, []
+            self.last_id = int(cocktail_ids[-1]) if len(cocktail_ids) else 0
+            self.data_version = version
+        logger.info(f"Matrice de recommandations construite: {matrix.shape[0]} cocktails, {matrix.nnz} lignes d'ingrédients")
+    
+    def save(self):
+        """Enregistre la matrice principale (écriture atomique)."""
+        with self._lock:
+            matrix, cocktail_ids, idf, last_id = self.matrix, self.cocktail_ids, self.idf, self.last_id
+            version = self.data_version
+        if matrix is None:
+            return
+        
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary, 'wb') as output:
+            np.savez(
+                output,
+                version=INDEX_FORMAT_VERSION,
+                data=matrix.data, indices=matrix.indices, indptr=matrix.indptr, shape=matrix.shape,
+                cocktail_ids=cocktail_ids, idf=idf,
+                last_id=int(cocktail_ids[-1]) if len(cocktail_ids) else 0,
+                data_version=version,
+            )
+        os.replace(temporary, self.path)
+        logger.info(f"Matrice de recommandations enregistrée: {self.path} (dernier cocktail {last_id})")
+    
+    def load(self) -> bool:
+        """
+        Charge la matrice enregistrée par un autre processus.
+
+        Returns:
+            True si le fichier existait et a été chargé
+        """
+        try:
+            with np.load(self.path) as stored:
+                if int(stored['version']) != INDEX_FORMAT_VERSION:
+                    return False
+                matrix = sparse.csc_matrix((stored['data'], stored['indices'], stored['indptr']),
+                                           shape=tuple(stored['shape']))
+                cocktail_ids, idf, last_id = stored['cocktail_ids'], stored['idf'], int(stored['last_id'])
+                version = int(stored['data_version'])
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.warning(f"Matrice de recommandations illisible ({self.path}): {e}")
+            return False
+        
+        with self._lock:
+            self.matrix, self.cocktail_ids, self.idf = matrix, cocktail_ids, idf
+            self.delta, self.delta_ids, self._pending = None, None, []
+            self.last_id = last_id
+            self.data_version = version
+        logger.info(f"Matrice de recommandations chargée: {matrix.shape[0]} cocktails")
+        return True
+    
+    # ------------------------------------------------------------------
+    # Mise à jour incrémentale
+    # ------------------------------------------------------------------
+    
+    def refresh(self):
+        """
+        Charge la matrice au premier usage ou après une modification
+        d'ingrédients, puis ajoute les cocktails créés depuis.
+        """
+        from .models import CocktailIngredient
+        
+        version = ingredients_version()
+        if self.matrix is None or self.data_version != version:
+            with self._load_lock:
+                if self.matrix is None or self.data_version != version:
+                    # Fichier déjà reconstruit par un autre worker pour cette version ?
+                    if not (self.load() and self.data_version == version):
+                        self.build()
+                        self.save()
+        
+        rows = (CocktailIngredient.objects
+                .filter(cocktail_id__gt=self.last_id)
+                .order_by('cocktail_id')
+                .values_list('cocktail_id', 'ingredient_id'))
+        added = {}
+        for cocktail_id, ingredient_id in rows:
+            added.setdefault(cocktail_id, []).append(ingredient_id)
+        if not added:
+            return
+        
+        with self._lock:
+            self._pending.extend(item for item in added.items() if item[0] > self.last_id)
+            self.last_id = max(self.last_id, max(added))
+            self._build_delta()
+            merge = len(self._pending) >= self.merge_rows
+            if merge:
+                self._merge_delta()
+        if merge:
+            self.save()
+    
+    def _idf_for(self, columns):
+        # Ingrédient apparu après la construction : idf maximal (le plus rare)
+        default = _idf(0, len(self.cocktail_ids) + len(self._pending))
+        columns = np.asarray(columns, dtype=np.int64)
+        known = columns < len(self.idf)
+        return np.where(known, self.idf[np.minimum(columns, len(self.idf) - 1)], default)
+    
+    def _build_delta(self):
+        """Matrice des cocktails ajoutés depuis la dernière fusion (quelques centaines de lignes)."""
+        if not self._pending:
+            self.delta, self.delta_ids = None, None
+            return
+        rows = np.repeat(np.arange(len(self._pending)), [len(columns) for _, columns in self._pending])
+        cols = np.fromiter((column for _, columns in self._pending for column in columns), dtype=np.int64)
+        n_cols = max(self.matrix.shape[1], int(cols.max()) + 1)
+        self.delta = _normalized_rows(rows, cols, self._idf_for(cols), (len(self._pending), n_cols))
+        self.delta_ids = np.array([cocktail_id for cocktail_id, _ in self._pending], dtype=np.int64)
+    
+    def _merge_delta(self):
+        n_cols = max(self.matrix.shape[1], self.delta.shape[1])
+        self.matrix = sparse.vstack([_with_columns(self.matrix, n_cols), _with_columns(self.delta, n_cols)], format='csc')
+        self.cocktail_ids = np.concatenate([self.cocktail_ids, self.delta_ids])
+        self.delta, self.delta_ids, self._pending = None, None, []
+    
+    # ------------------------------------------------------------------
+    # Recherche
+    # ------------------------------------------------------------------
+    
+    @staticmethod
+    def _scores(matrix, ids, columns, weights):
+        """
+        Similarités non nulles avec le vecteur (columns, weights).
+
+        Returns:
+            Tuple (identifiants des cocktails, similarités)
+        """
+        inside = columns < matrix.shape[1]
+        sub = matrix[:, columns[inside]]
+        if sub.nnz * 32 < matrix.shape[0]:
+            # Ingrédients rares : seules les lignes qui les contiennent sont agrégées
+            rows, inverse = np.unique(sub.indices, return_inverse=True)
+            scores = np.bincount(inverse, weights=sub.data * np.repeat(weights[inside], np.diff(sub.indptr)))
+        else:
+            # Ingrédients courants : produit matrice-vecteur sur toutes les lignes
+            dense = sub @ weights[inside]
+            rows = np.flatnonzero(dense)
+            scores = dense[rows]
+        return ids[rows], scores
+    
+    def similar(self, cocktail_id: int, ingredient_ids: List[int], limit: int) -> List[Tuple[int, float]]:
+        """
+        Cocktails les plus proches d'un cocktail.
+
+        Args:
+            cocktail_id: Cocktail de référence (exclu des résultats)
+            ingredient_ids: Ingrédients du cocktail de référence
+            limit: Nombre maximal de résultats
+
+        Returns:
+            Liste (id, similarité cosinus) par similarité décroissante
+        """
+        self.refresh()
+        if not ingredient_ids:
+            return []
+        
+        with self._lock:
+            columns = np.unique(np.asarray(ingredient_ids, dtype=np.int64))
+            weights = self._idf_for(columns)
+            matrices = [(self.matrix, self.cocktail_ids), (self.delta, self.delta_ids)]
+        weights = (weights / np.linalg.norm(weights)).astype(np.float32)
+        
+        parts = [self._scores(matrix, ids, columns, weights) for matrix, ids in matrices if matrix is not None]
+        if len(parts) == 1:
+            ids, scores = parts[0]
+        else:
+            ids = np.concatenate([part[0] for part in parts])
+            scores = np.concatenate([part[1] for part in parts])
+        
+        # Les meilleurs sans trier tous les candidats (un de plus : le cocktail lui-même)
+        top = limit + 1
+        if len(scores) > top:
+            best = np.argpartition(scores, len(scores) - top)[len(scores) - top:]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.lexsort((-ids[best], -scores[best]))]
+        return [(int(ids[index]), min(float(scores[index]), 1.0)) for index in best
+                if ids[index] != cocktail_id][:limit]
+
+
+def _sql_similar(cocktail_id: int, ingredient_ids: List[int], limit: int) -> List[Tuple[int, float]]:
+    """Repli sans NumPy/SciPy : cosinus sur ingrédients non pondérés, calculé en SQL."""
+    from .models import CocktailIngredient
+    
+    if not ingredient_ids:
+        return []
+    candidates = (
+        CocktailIngredient.objects
+        .filter(cocktail_id__in=CocktailIngredient.objects.filter(ingredient_id__in=ingredient_ids).values('cocktail_id'))
+        .exclude(cocktail_id=cocktail_id)
+        .values('cocktail_id')
+        .annotate(
+            total=Count('ingredient_id', distinct=True),
+            shared=Count('ingredient_id', filter=Q(ingredient_id__in=ingredient_ids), distinct=True),
+        )
+        .order_by('-shared', 'total', '-cocktail_id')[:SQL_FALLBACK_CANDIDATES]
+    )
+    scored = [(row['cocktail_id'], row['shared'] / math.sqrt(row['total'] * len(ingredient_ids)))
+              for row in candidates]
+    scored.sort(key=lambda item: (-item[1], -item[0]))
+    return scored[:limit]
+
+
+def similar_cocktails(cocktail_id: int, limit: int) -> List[Tuple[int, float]]:
+    """
+    Cocktails aux ingrédients les plus proches.
+
+    Args:
+        cocktail_id: Cocktail de référence
+        limit: Nombre maximal de résultats
+
+    Returns:
+        Liste (id, similarité cosinus entre 0 et 1) par similarité décroissante
+    """
+    from .models import CocktailIngredient
+    
+    ingredient_ids = list(CocktailIngredient.objects.filter(cocktail_id=cocktail_id).values_list('ingredient_id', flat=True))
+    if not NUMPY_AVAILABLE:
+        return _sql_similar(cocktail_id, ingredient_ids, limit)
+    return ingredient_matrix.similar(cocktail_id, ingredient_ids, limit)
+
+
+# Matrice globale du processus (construite ou chargée au premier usage)
+ingredient_matrix: Optional[IngredientMatrix] = IngredientMatrix() if NUMPY_AVAILABLE else None
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Résidence des modèles Ollama en mémoire
+Le premier appel à un modèle déchargé paie tout son temps de chargement.
+Ce module précharge les modèles configurés (OLLAMA_RESIDENT_MODELS), fixe
+leur keep_alive et lit /api/ps pour savoir lesquels sont chargés ; un thread
+d'arrière-plan (ou la commande warm_models --watch) recharge ceux qu'Ollama
+a déchargés avant qu'une requête client ne tombe dessus.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional, Union
+from django.conf import settings
+from django.core.cache import cache
+from .versions import OLLAMA_MODELS, bump_version
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_model_name(model: str) -> str:
+    """Nom de modèle tel que rapporté par Ollama (tag :latest implicite)."""
+    model = model.strip()
+    return model if ':' in model.rsplit('/', 1)[-1] else f"{model}:latest"
+
+
+def keep_alive_for(model: str) -> Union[str, int]:
+    """
+    Durée de maintien en mémoire à transmettre avec chaque appel au modèle.
+
+    Ollama réarme le délai de déchargement à chaque requête avec la valeur
+    reçue (ou celle du serveur, 5 minutes par défaut) : tous les appels d'un
+    modèle résident doivent donc envoyer la même valeur.
+
+    Args:
+        model: Nom du modèle
+
+    Returns:
+        Durée au format Ollama ("30m", "2h") ou nombre de secondes (-1 pour illimité)
+    """
+    resident = {normalize_model_name(name): value
+                for name, value in getattr(settings, 'OLLAMA_RESIDENT_MODELS', {}).items()}
+    value = str(resident.get(normalize_model_name(model), getattr(settings, 'OLLAMA_KEEP_ALIVE', '30m')))
+    # Ollama n'accepte une durée sans unité que sous forme numérique
+    return int(value) if value.lstrip('-').isdigit() else value
+
+
+class ModelResidencyManager:
+    """
+    Maintient les modèles configurés chargés dans Ollama.
+
+    Comme pour le moniteur de santé, un thread démon par processus vérifie
+    périodiquement /api/ps ; un verrou de cache garantit qu'un seul worker
+    recharge les modèles à chaque intervalle.
+    """
+    
+    def __init__(self):
+        self.base_url = getattr(settings, 'OLLAMA_URL', 'http://ollama:11434')
+        self.interval = getattr(settings, 'MODEL_RESIDENCY_INTERVAL', 60)
+        self.load_timeout = getattr(settings, 'MODEL_WARMUP_TIMEOUT', 300)
+        self._thread = None
+        self._lock = threading.Lock()
+    
+    @property
+    def models(self) -> Dict[str, str]:
+        """Modèles à garder résidents -> keep_alive."""
+        return {normalize_model_name(name): value
+                for name, value in getattr(settings, 'OLLAMA_RESIDENT_MODELS', {}).items()}
+    
+    @staticmethod
+    def _session():
+        from .ollama_service import get_http_session
+        return get_http_session()
+    
+    # ------------------------------------------------------------------
+    # État
+    # ------------------------------------------------------------------
+    
+    def running_models(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Modèles actuellement chargés selon /api/ps.
+
+        Returns:
+            Dictionnaire nom -> entrée /api/ps, ou None si Ollama ne répond pas
+        """
+        try:
+            response = self._session().get(f"{self.base_url}/api/ps", timeout=5)
+            response.raise_for_status()
+            return {normalize_model_name(entry.get('name') or entry.get('model', '')): entry
+                    for entry in response.json().get('models', [])}
+        except Exception as e:
+            logger.warning(f"Impossible de lire les modèles chargés: {e}")
+            return None
+    
+    def report(self) -> Dict[str, Any]:
+        """
+        Résidence des modèles configurés et des autres modèles chargés.
+
+        Returns:
+            Dictionnaire {available, models: [...], other_loaded: [...]}
+        """
+        running = self.running_models()
+        if running is None:
+            return {'available': False, 'models': [], 'other_loaded': []}
+        
+        models = []
+        for name, keep_alive in self.models.items():
+            entry = running.get(name) or {}
+            models.append({
+                'model': name,
+                'keep_alive': keep_alive,
+                'resident': name in running,
+                'expires_at': entry.get('expires_at'),
+                'size_vram': entry.get('size_vram'),
+            })
+        return {
+            'available': True,
+            'models': models,
+            'other_loaded': sorted(set(running) - set(self.models)),
+        }
+    
+    # ------------------------------------------------------------------
+    # Chargement
+    # ------------------------------------------------------------------
+    
+    def load(self, model: str) -> Optional[float]:
+        """
+        Charge un modèle avec son keep_alive (requête sans prompt).
+
+        Args:
+            model: Nom du modèle
+
+        Returns:
+            Durée du chargement en secondes, ou None en cas d'échec
+        """
+        started = time.monotonic()
+        try:
+            response = self._session().post(
+                f"{self.base_url}/api/generate",
+                json={'model': model, 'keep_alive': keep_alive_for(model)},
+                timeout=self.load_timeout
+            )
+            response.raise_for_status()
+        except Exception as e:
+            logger.error(f"Échec du chargement du modèle {model}: {e}")
+            return None
+        
+        duration = time.monotonic() - started
+        # La résidence publiée par la liste des modèles a changé
+        bump_version(OLLAMA_MODELS)
+        logger.info(f"Modèle {model} chargé en {duration:.1f}s (keep_alive {keep_alive_for(model)})")
+        return duration
+    
+    def warm_up(self, force: bool = False) -> Dict[str, Optional[float]]:
+        """
+        Charge les modèles configurés qui ne sont pas résidents.
+
+        Args:
+            force: Recharger aussi les modèles déjà résidents (réarme leur keep_alive)
+
+        Returns:
+            Dictionnaire modèle -> durée de chargement (0 si déjà résident, None si échec)
+        """
+        running = self.running_models()
+        if running is None:
+            return {}
+        
+        results = {}
+        for model in self.models:
+            if model in running and not force:
+                results[model] = 0.0
+            else:
+                results[model] = self.load(model)
+        return results
+    
+    def _run(self):
+        while True:
+            try:
+                # Un seul worker recharge les modèles par intervalle
+                if cache.add('residency:warm_lock', True, self.interval):
+                    self.warm_up()
+            except Exception as e:
+                logger.error(f"Erreur du gestionnaire de résidence: {e}")
+            time.sleep(self.interval)
+    
+    def ensure_started(self):
+        """Démarre le thread de préchargement du processus courant s'il ne tourne pas."""
+        if not getattr(settings, 'MODEL_WARMUP_ON_STARTUP', False) or not self.models:
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='model-residency', daemon=True)
+                self._thread.start()
+
+
+# Instance globale du gestionnaire
+model_residency = ModelResidencyManager()
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+Index plein texte des cocktails
+Les recherches par icontains parcourent toute la table. Ce module maintient
+un index plein texte sur le nom, la description, les ingrédients et la
+demande du client :
+- SQLite : table virtuelle FTS5 (contenu externe) tenue à jour par des
+  triggers, classement bm25 ;
+- PostgreSQL : colonne tsvector générée et index GIN, classement ts_rank_cd.
+
+La synchronisation est faite par la base elle-même : create, bulk_create,
+update() et delete() de querysets sont tous couverts, sans signal Django.
+Sous SQLite, une migration qui reconstruit la table des cocktails (ajout
+d'un champ non nullable, modification d'un champ...) supprime les
+triggers : elle doit être suivie d'un appel à create_search_index.
+Sans index (autre base, SQLite sans FTS5), la recherche revient aux scans
+icontains.
+"""
+
+import logging
+import re
+from typing import List, Optional, Tuple
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger(__name__)
+
+COCKTAIL_TABLE = 'cocktails_cocktail'
+FTS_TABLE = 'cocktails_cocktail_fts'
+SEARCH_COLUMNS = ('name', 'description', 'ingredients', 'user_request')
+# Poids des colonnes (même ordre que SEARCH_COLUMNS) : le nom compte le plus
+BM25_WEIGHTS = (10.0, 2.0, 5.0, 1.0)
+TS_WEIGHTS = ('A', 'C', 'B', 'D')
+# Configuration sans racinisation : les textes mélangent français et anglais
+TS_CONFIG = 'simple'
+MAX_TERMS = 10
+
+
+def _sqlite_install_sql() -> List[str]:
+    columns = ', '.join(SEARCH_COLUMNS)
+    new_values = ', '.join(f'new.{column}' for column in SEARCH_COLUMNS)
+    old_values = ', '.join(f'old.{column}' for column in SEARCH_COLUMNS)
+    delete_old = (f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) "
+                  f"VALUES ('delete', old.id, {old_values});")
+    insert_new = f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5({columns}, "
+        f"content='{COCKTAIL_TABLE}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {COCKTAIL_TABLE} BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {COCKTAIL_TABLE} BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {columns} ON {COCKTAIL_TABLE} "
+        f"BEGIN {delete_old} {insert_new} END",
+        # Indexe les lignes existantes
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+    ]
+
+
+def _sqlite_uninstall_sql() -> List[str]:
+    return [f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}" for suffix in ('ai', 'ad', 'au')] + [
+        f"DROP TABLE IF EXISTS {FTS_TABLE}",
+    ]
+
+
+def _postgresql_install_sql() -> List[str]:
+    vector = ' || '.join(
+        f"setweight(to_tsvector('{TS_CONFIG}', coalesce({column}, '')), '{weight}')"
+        for column, weight in zip(SEARCH_COLUMNS, TS_WEIGHTS)
+    )
+    return [
+        f"ALTER TABLE {COCKTAIL_TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({vector}) STORED",
+        f"CREATE INDEX IF NOT EXISTS cocktail_search_gin ON {COCKTAIL_TABLE} USING GIN (search_vector)",
+    ]
+
+
+def _postgresql_uninstall_sql() -> List[str]:
+    return [
+        "DROP INDEX IF EXISTS cocktail_search_gin",
+        f"ALTER TABLE {COCKTAIL_TABLE} DROP COLUMN IF EXISTS search_vector",
+    ]
+
+
+def create_search_index(connection):
+    """
+    Crée l'index plein texte adapté à la base (appelé par la migration).
+
+    Args:
+        connection: Connexion Django de la base à équiper
+    """
+    if connection.vendor == 'sqlite':
+        statements = _sqlite_install_sql()
+    elif connection.vendor == 'postgresql':
+        statements = _postgresql_install_sql()
+    else:
+        logger.warning(f"Pas d'index plein texte pour la base {connection.vendor}")
+        return
+    
+    with connection.cursor() as cursor:
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        except Exception as e:
+            if connection.vendor != 'sqlite':
+                raise
+            # SQLite compilé sans FTS5 : la recherche utilisera icontains
+            logger.warning(f"Index FTS5 indisponible: {e}")
+
+
+def drop_search_index(connection):
+    """Supprime l'index plein texte (migration inverse)."""
+    if connection.vendor == 'sqlite':
+        statements = _sqlite_uninstall_sql()
+    elif connection.vendor == 'postgresql':
+        statements = _postgresql_uninstall_sql()
+    else:
+        return
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def search_backend(using: str = DEFAULT_DB_ALIAS) -> Optional[str]:
+    """
+    Index plein texte utilisable sur cette base.
+
+    Returns:
+        'sqlite', 'postgresql' ou None (recherche par icontains)
+    """
+    connection = connections[using]
+    if connection.vendor == 'sqlite':
+        return 'sqlite' if FTS_TABLE in connection.introspection.table_names() else None
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    return None
+
+
+def search_terms(text: str) -> List[str]:
+    """Mots d'une recherche libre (la syntaxe des moteurs n'est pas exposée)."""
+    return re.findall(r'[^\W_]+', (text or '').lower())[:MAX_TERMS]
+
+
+def _match_query(backend: str, terms: List[str]) -> str:
+    # Tous les mots doivent apparaître ; le dernier peut être incomplet
+    if backend == 'sqlite':
+        return ' '.join(f'"{term}"*' for term in terms)
+    return ' & '.join(f'{term}:*' for term in terms)
+
+
+def search_cocktails(text: str, limit: int, using: str = DEFAULT_DB_ALIAS) -> List[Tuple[int, Optional[float]]]:
+    """
+    Recherche classée des cocktails.
+
+    Args:
+        text: Recherche libre ("gin citron vert")
+        limit: Nombre maximal de résultats
+        using: Alias de la base
+
+    Returns:
+        Liste (id, score) du plus pertinent au moins pertinent ; le score est
+        None quand la base n'a pas d'index (résultats du plus récent au plus ancien)
+    """
+    terms = search_terms(text)
+    if not terms:
+        return []
+    
+    backend = search_backend(using)
+    if backend is None:
+        from .models import Cocktail
+        ids = Cocktail.objects.using(using).filter(search_filter(terms)).order_by('-created_at', '-id')
+        return [(pk, None) for pk in ids.values_list('id', flat=True)[:limit]]
+    
+    if backend == 'sqlite':
+        weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+        sql = (f"SELECT rowid, -bm25({FTS_TABLE}, {weights}) AS rank FROM {FTS_TABLE} "
+               f"WHERE {FTS_TABLE} MATCH %s ORDER BY rank DESC, rowid DESC LIMIT %s")
+    else:
+        sql = (f"SELECT id, ts_rank_cd(search_vector, query) AS rank "
+               f"FROM {COCKTAIL_TABLE}, to_tsquery('{TS_CONFIG}', %s) query "
+               f"WHERE search_vector @@ query ORDER BY rank DESC, id DESC LIMIT %s")
+    
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, [_match_query(backend, terms), limit])
+        return [(pk, float(rank)) for pk, rank in cursor.fetchall()]
+
+
+def search_filter(terms: List[str], using: str = DEFAULT_DB_ALIAS) -> Q:
+    """
+    Filtre des cocktails correspondant à tous les mots, pour un queryset.
+
+    Utilise l'index plein texte (sous-requête sur les id) quand il existe,
+    sinon un icontains par mot sur les colonnes indexées.
+    """
+    backend = search_backend(using)
+    if backend == 'sqlite':
+        return Q(id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+                               [_match_query(backend, terms)]))
+    if backend == 'postgresql':
+        return Q(id__in=RawSQL(f"SELECT id FROM {COCKTAIL_TABLE} WHERE search_vector @@ to_tsquery('{TS_CONFIG}', %s)",
+                               [_match_query(backend, terms)]))
+    
+    condition = Q()
+    for term in terms:
+        term_condition = Q()
+        for column in SEARCH_COLUMNS:
+            term_condition |= Q(**{f'{column}__icontains': term})
+        condition &= term_condition
+    return condition
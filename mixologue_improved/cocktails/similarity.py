@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Index de similarité des demandes clients
+Ce module repère les demandes quasi identiques à une demande déjà servie
+("un cocktail fruité au gin pas trop sucré") grâce à une similarité cosinus
+TF-IDF sur les n-grammes de caractères, afin de resservir le cocktail
+enregistré au lieu de relancer une génération.
+"""
+
+import logging
+import math
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Optional, Set, Tuple
+from django.conf import settings
+from .cache_keys import normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+def char_ngrams(text: str, n: int = 3) -> Counter:
+    """
+    Compte les n-grammes de caractères d'un texte normalisé.
+
+    Args:
+        text: Texte libre
+        n: Taille des n-grammes
+
+    Returns:
+        Compteur n-gramme -> occurrences
+    """
+    padded = f" {normalize_text(text)} "
+    return Counter(padded[i:i + n] for i in range(max(1, len(padded) - n + 1)))
+
+
+class RequestSimilarityIndex:
+    """
+    Index TF-IDF en mémoire des demandes (Cocktail.user_request).
+
+    L'index est chargé au premier usage avec les SIMILARITY_INDEX_MAX_DOCS
+    demandes les plus récentes, puis complété de façon incrémentale : à
+    chaque recherche, les cocktails créés depuis (par ce worker ou un autre)
+    sont ajoutés. Un index inversé limite le calcul du cosinus aux demandes
+    qui partagent des n-grammes avec la requête.
+    """
+    
+    def __init__(self):
+        self.ngram_size = getattr(settings, 'SIMILARITY_NGRAM_SIZE', 3)
+        self.max_docs = getattr(settings, 'SIMILARITY_INDEX_MAX_DOCS', 5000)
+        self.max_candidates = getattr(settings, 'SIMILARITY_MAX_CANDIDATES', 50)
+        self.docs: Dict[int, Counter] = {}
+        self.postings: Dict[str, Set[int]] = defaultdict(set)
+        self.last_id = None
+        self._lock = threading.Lock()
+    
+    # ------------------------------------------------------------------
+    # Mise à jour
+    # ------------------------------------------------------------------
+    
+    def add(self, cocktail_id: int, user_request: str):
+        """Ajoute (ou remplace) la demande d'un cocktail dans l'index."""
+        grams = char_ngrams(user_request, self.ngram_size)
+        with self._lock:
+            self._remove(cocktail_id)
+            self.docs[cocktail_id] = grams
+            for gram in grams:
+                self.postings[gram].add(cocktail_id)
+            self._trim()
+    
+    def remove(self, cocktail_id: int):
+        """Retire un cocktail de l'index (suppression)."""
+        with self._lock:
+            self._remove(cocktail_id)
+    
+    def _remove(self, cocktail_id: int):
+        grams = self.docs.pop(cocktail_id, None)
+        for gram in grams or ():
+            ids = self.postings.get(gram)
+            if ids is not None:
+                ids.discard(cocktail_id)
+                if not ids:
+                    del self.postings[gram]
+    
+    def _trim(self):
+        """Oublie les demandes les plus anciennes au-delà de max_docs."""
+        while len(self.docs) > self.max_docs:
+            self._remove(min(self.docs))
+    
+    def refresh(self):
+        """Charge l'index ou ajoute les cocktails créés depuis le dernier passage."""
+        from .models import Cocktail
+        
+        queryset = Cocktail.objects.order_by('-id').values_list('id', 'user_request')
+        if self.last_id is not None:
+            queryset = queryset.filter(id__gt=self.last_id)
+        rows = list(queryset[:self.max_docs])
+        
+        if self.last_id is None:
+            logger.info(f"Index de similarité chargé: {len(rows)} demandes")
+        for cocktail_id, user_request in reversed(rows):
+            self.add(cocktail_id, user_request)
+        with self._lock:
+            if rows:
+                self.last_id = max(self.last_id or 0, rows[0][0])
+            elif self.last_id is None:
+                self.last_id = 0
+    
+    # ------------------------------------------------------------------
+    # Recherche
+    # ------------------------------------------------------------------
+    
+    def _idf(self, gram: str, doc_count: int) -> float:
+        return math.log((doc_count + 1) / (len(self.postings.get(gram, ())) + 1)) + 1
+    
+    def _weights(self, grams: Counter, doc_count: int) -> Dict[str, float]:
+        return {gram: count * self._idf(gram, doc_count) for gram, count in grams.items()}
+    
+    def find_similar(self, user_request: str) -> Tuple[Optional[int], Optional[float]]:
+        """
+        Cherche la demande passée la plus proche.
+
+        Args:
+            user_request: Demande du client
+
+        Returns:
+            Tuple (id du cocktail, similarité cosinus entre 0 et 1) ou
+            (None, None) si aucune demande ne partage de n-gramme
+        """
+        self.refresh()  # Demandes enregistrées depuis, y compris par les autres workers
+        query = char_ngrams(user_request, self.ngram_size)
+        
+        with self._lock:
+            doc_count = len(self.docs)
+            shared = Counter()
+            for gram in query:
+                for cocktail_id in self.postings.get(gram, ()):
+                    shared[cocktail_id] += 1
+            if not shared:
+                return None, None
+            
+            query_weights = self._weights(query, doc_count)
+            query_norm = math.sqrt(sum(weight * weight for weight in query_weights.values()))
+            
+            best_id, best_score = None, 0.0
+            for cocktail_id, _ in shared.most_common(self.max_candidates):
+                doc_weights = self._weights(self.docs[cocktail_id], doc_count)
+                doc_norm = math.sqrt(sum(weight * weight for weight in doc_weights.values()))
+                dot = sum(weight * doc_weights.get(gram, 0.0) for gram, weight in query_weights.items())
+                score = dot / (query_norm * doc_norm) if query_norm and doc_norm else 0.0
+                # À score égal, le cocktail le plus récent l'emporte
+                if (score, cocktail_id) > (best_score, best_id or 0):
+                    best_id, best_score = cocktail_id, score
+        
+        return best_id, min(best_score, 1.0)
+
+
+def get_similarity_threshold(data: Dict) -> Optional[float]:
+    """
+    Seuil de réutilisation applicable à une requête.
+
+    Le champ similarity_threshold du corps de la requête prime sur le réglage
+    SIMILAR_REQUEST_THRESHOLD ; sans l'un ni l'autre, la réutilisation est
+    désactivée.
+
+    Args:
+        data: Corps JSON de la requête
+
+    Returns:
+        Seuil entre 0 et 1, ou None si la réutilisation est désactivée
+    """
+    threshold = data.get('similarity_threshold', getattr(settings, 'SIMILAR_REQUEST_THRESHOLD', None))
+    if threshold is None or threshold == '':
+        return None
+    try:
+        threshold = float(threshold)
+    except (TypeError, ValueError):
+        return None
+    return threshold if 0 < threshold <= 1 else None
+
+
+# Index global du processus
+request_index = RequestSimilarityIndex()
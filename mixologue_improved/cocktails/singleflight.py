@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Coalescence des générations identiques (single-flight)
+Lorsque plusieurs requêtes identiques manquent le cache au même moment, une
+seule génération est lancée ; les autres appelants attendent son résultat.
+Dans un processus, l'attente passe par un Event (threads) ou un Future
+(asyncio) ; entre workers, par un verrou posé dans le cache Django.
+La coalescence entre workers suppose un cache par défaut partagé par les
+processus (CACHES['default']) : avec un cache local (LocMem), chaque
+worker ne coalesce que ses propres appels.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+import weakref
+from typing import Any, Awaitable, Callable, Optional
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """Génération en cours dans le processus."""
+    
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+
+
+class SingleFlight:
+    """
+    Coalesce les appels concurrents partageant une même clé de cache.
+
+    Le calcul (compute) doit lui-même écrire son résultat sous la clé de
+    cache : c'est là que les workers qui n'ont pas obtenu le verrou le lisent.
+    """
+    
+    def __init__(self):
+        self.lock_timeout = getattr(settings, 'SINGLE_FLIGHT_LOCK_TIMEOUT', 90)
+        self.poll_interval = getattr(settings, 'SINGLE_FLIGHT_POLL_INTERVAL', 0.25)
+        self._calls = {}
+        self._calls_lock = threading.Lock()
+        self._async_calls = weakref.WeakKeyDictionary()
+    
+    def _lock_key(self, key: str) -> str:
+        return f"singleflight:{key}"
+    
+    def do(self, key: str, compute: Callable[[], Any]) -> Any:
+        """
+        Exécute compute une seule fois pour toutes les requêtes concurrentes sur key.
+
+        Args:
+            key: Clé de cache du résultat
+            compute: Fonction qui génère le résultat et le met en cache
+
+        Returns:
+            Résultat de la génération (éventuellement calculée par un autre appelant)
+        """
+        with self._calls_lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        
+        if not leader:
+            logger.info(f"Génération déjà en cours, attente du résultat: {key}")
+            call.event.wait(self.lock_timeout)
+            return call.result
+        
+        try:
+            call.result = self._do_across_workers(key, compute)
+            return call.result
+        finally:
+            with self._calls_lock:
+                self._calls.pop(key, None)
+            call.event.set()
+    
+    def _do_across_workers(self, key: str, compute: Callable[[], Any]) -> Any:
+        lock_key = self._lock_key(key)
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_timeout
+        
+        while True:
+            if cache.add(lock_key, token, self.lock_timeout):
+                try:
+                    return compute()
+                finally:
+                    if cache.get(lock_key) == token:
+                        cache.delete(lock_key)
+            
+            # Un autre worker génère : attendre que le résultat arrive en cache.
+            # Si le verrou disparaît sans résultat (échec ou expiration), on retente de le prendre.
+            while cache.get(lock_key) is not None:
+                result = cache.get(key)
+                if result:
+                    return result
+                if time.monotonic() >= deadline:
+                    logger.warning(f"Attente du single-flight expirée: {key}")
+                    return compute()
+                time.sleep(self.poll_interval)
+            
+            result = cache.get(key)
+            if result:
+                return result
+    
+    async def ado(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Version asynchrone de do, pour les vues servies sous ASGI.
+
+        Args:
+            key: Clé de cache du résultat
+            compute: Coroutine (sans argument) qui génère et met en cache le résultat
+
+        Returns:
+            Résultat de la génération
+        """
+        loop = asyncio.get_running_loop()
+        calls = self._async_calls.setdefault(loop, {})
+        future: Optional[asyncio.Future] = calls.get(key)
+        
+        if future is not None:
+            logger.info(f"Génération déjà en cours, attente du résultat: {key}")
+            return await asyncio.shield(future)
+        
+        future = calls[key] = loop.create_future()
+        try:
+            result = await self._ado_across_workers(key, compute)
+            future.set_result(result)
+            return result
+        except BaseException:
+            future.set_result(None)
+            raise
+        finally:
+            calls.pop(key, None)
+    
+    async def _ado_across_workers(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        lock_key = self._lock_key(key)
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_timeout
+        
+        while True:
+            if await cache.aadd(lock_key, token, self.lock_timeout):
+                try:
+                    return await compute()
+                finally:
+                    if await cache.aget(lock_key) == token:
+                        await cache.adelete(lock_key)
+            
+            while await cache.aget(lock_key) is not None:
+                result = await cache.aget(key)
+                if result:
+                    return result
+                if time.monotonic() >= deadline:
+                    logger.warning(f"Attente du single-flight expirée: {key}")
+                    return await compute()
+                await asyncio.sleep(self.poll_interval)
+            
+            result = await cache.aget(key)
+            if result:
+                return result
+
+
+# Instance globale partagée par les services
+single_flight = SingleFlight()
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+Parsing incrémental des réponses JSON streamées par Ollama
+Ce module permet de publier les champs d'une recette (Server-Sent Events)
+dès qu'ils sont complets, sans attendre la fin de la génération.
+"""
+
+import json
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from .json_extract import JSONExtractionError, extract_json
+
+_WHITESPACE = ' \t\r\n'
+
+
+def format_sse(event: str, data: Any) -> str:
+    """
+    Formate un message Server-Sent Events.
+
+    Args:
+        event: Nom de l'événement
+        data: Données sérialisables en JSON
+
+    Returns:
+        Message SSE terminé par une ligne vide
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class IncrementalJSONParser:
+    """
+    Parseur incrémental du premier objet JSON d'un flux de texte.
+
+    Chaque appel à feed() renvoie les événements devenus disponibles :
+    - ('field', nom, valeur) lorsqu'une valeur de premier niveau est complète
+    - ('item', nom, (index, valeur)) pour chaque élément complet d'un tableau
+      de premier niveau, avant même la fermeture du tableau
+
+    Le texte précédant la première accolade (balises ```json, politesses du
+    modèle) est ignoré ; les accolades dans les chaînes sont gérées.
+    """
+    
+    def __init__(self):
+        self.buffer = ''
+        self.pos = 0
+        self.root_start = None
+        self.root_end = None
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        
+        # État du niveau 1 (clés/valeurs de l'objet racine)
+        self.expect_key = True
+        self.key = None
+        self.key_start = None
+        self.value_start = None
+        self.value_is_array = False
+        
+        # État du niveau 2 (éléments d'un tableau de premier niveau)
+        self.item_start = None
+        self.item_index = 0
+        
+        self.fields: Dict[str, Any] = {}
+    
+    @property
+    def complete(self) -> bool:
+        """Indique si l'objet racine est entièrement reçu."""
+        return self.root_end is not None
+    
+    def result(self) -> Optional[Dict[str, Any]]:
+        """
+        Retourne l'objet racine parsé.
+
+        Returns:
+            Dictionnaire complet ou None si l'objet est incomplet/invalide
+        """
+        if not self.complete:
+            return None
+        try:
+            return extract_json(self.buffer[self.root_start:self.root_end + 1], 'flux')
+        except JSONExtractionError:
+            return None
+    
+    def feed(self, chunk: str) -> List[Tuple[str, str, Any]]:
+        """
+        Ajoute un morceau de texte et retourne les événements complétés.
+
+        Args:
+            chunk: Nouveau fragment de la réponse du modèle
+
+        Returns:
+            Liste d'événements (type, champ, valeur)
+        """
+        self.buffer += chunk
+        events = []
+        
+        if self.complete:
+            return events
+        
+        buffer = self.buffer
+        for i in range(self.pos, len(buffer)):
+            char = buffer[i]
+            
+            if self.root_start is None:
+                if char == '{':
+                    self.root_start = i
+                    self.depth = 1
+                continue
+            
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == '\\':
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+                    self._on_string_end(i, events)
+                continue
+            
+            if char == '"':
+                self.in_string = True
+                self._on_value_start(i)
+                if self.depth == 1 and self.expect_key:
+                    self.key_start = i
+            elif char in '{[':
+                self._on_value_start(i)
+                self.depth += 1
+                if self.depth == 2 and char == '[':
+                    self.value_is_array = True
+            elif char in '}]':
+                self.depth -= 1
+                if self.depth == 2 and self.item_start is not None:
+                    # Fin d'un élément conteneur dans un tableau de premier niveau
+                    self._emit_item(i + 1, events)
+                elif self.depth == 1:
+                    if self.value_is_array and self.item_start is not None:
+                        # Dernier élément scalaire juste avant ']'
+                        self._emit_item(i, events)
+                    self._emit_field(i + 1, events)
+                elif self.depth == 0:
+                    # Dernière valeur scalaire juste avant '}'
+                    if self.value_start is not None:
+                        self._emit_field(i, events)
+                    self.root_end = i
+                    self.pos = i + 1
+                    return events
+            elif char == ',':
+                if self.depth == 1 and self.value_start is not None:
+                    self._emit_field(i, events)
+                elif self.depth == 2 and self.value_is_array and self.item_start is not None:
+                    self._emit_item(i, events)
+            elif char == ':' and self.depth == 1:
+                self.expect_key = False
+            elif char not in _WHITESPACE:
+                self._on_value_start(i)
+        
+        self.pos = len(buffer)
+        return events
+    
+    def _on_value_start(self, index: int):
+        """Mémorise le début d'une valeur de niveau 1 ou d'un élément de niveau 2."""
+        if self.depth == 1 and not self.expect_key and self.value_start is None:
+            self.value_start = index
+        elif self.depth == 2 and self.value_is_array and self.item_start is None:
+            self.item_start = index
+    
+    def _on_string_end(self, index: int, events: List):
+        """Traite la fin d'une chaîne : clé, valeur ou élément de tableau."""
+        if self.depth == 1:
+            if self.expect_key and self.key_start is not None:
+                self.key = json.loads(self.buffer[self.key_start:index + 1], strict=False)
+                self.key_start = None
+            elif self.value_start is not None:
+                self._emit_field(index + 1, events)
+        elif self.depth == 2 and self.value_is_array and self.item_start is not None:
+            self._emit_item(index + 1, events)
+    
+    def _emit_field(self, end: int, events: List):
+        """Publie la valeur de premier niveau terminée à la position end."""
+        raw = self.buffer[self.value_start:end].strip()
+        self.value_start = None
+        if self.key is not None and raw:
+            try:
+                value = json.loads(raw, strict=False)
+            except json.JSONDecodeError:
+                value = None
+            if value is not None or raw == 'null':
+                self.fields[self.key] = value
+                events.append(('field', self.key, value))
+        self.key = None
+        self.expect_key = True
+        self.value_is_array = False
+        self.item_index = 0
+    
+    def _emit_item(self, end: int, events: List):
+        """Publie l'élément de tableau terminé à la position end."""
+        raw = self.buffer[self.item_start:end].strip()
+        self.item_start = None
+        if self.key is None or not raw:
+            return
+        try:
+            value = json.loads(raw, strict=False)
+        except json.JSONDecodeError:
+            return
+        events.append(('item', self.key, (self.item_index, value)))
+        self.item_index += 1
+
+
+def iter_recipe_events(chunks: Iterator[str]) -> Iterator[Tuple[str, Any]]:
+    """
+    Transforme un flux de fragments de texte en événements de recette.
+
+    Args:
+        chunks: Fragments de texte renvoyés par le modèle
+
+    Yields:
+        Tuples (événement, données) prêts pour format_sse ; le dernier
+        événement est 'recipe' (objet complet) ou 'error'
+    """
+    parser = IncrementalJSONParser()
+    
+    for chunk in chunks:
+        for event in parser.feed(chunk):
+            yield recipe_event(event)
+        if parser.complete:
+            break
+    
+    recipe = parser.result()
+    if recipe is None:
+        yield 'error', {'error': 'Réponse JSON incomplète ou invalide', 'code': 'GENERATION_FAILED'}
+    else:
+        yield 'recipe', recipe
+
+
+def iter_cached_recipe_events(recipe: Dict[str, Any]) -> Iterator[Tuple[str, Any]]:
+    """
+    Rejoue une recette déjà connue (cache) sous forme d'événements.
+
+    Args:
+        recipe: Recette complète
+
+    Yields:
+        Les mêmes événements qu'une génération streamée, puis 'recipe'
+    """
+    for name, value in recipe.items():
+        if isinstance(value, list):
+            for index, item in enumerate(value):
+                yield recipe_event(('item', name, (index, item)))
+        yield recipe_event(('field', name, value))
+    yield 'recipe', recipe
+
+
+def recipe_event(event: Tuple[str, str, Any]) -> Tuple[str, Any]:
+    """Convertit un événement du parseur en couple (nom SSE, données)."""
+    kind, name, value = event
+    if kind == 'item':
+        index, item = value
+        return 'item', {'field': name, 'index': index, 'value': item}
+    return 'field', {'field': name, 'value': value}
@@ -1,3 +1,661 @@
-from django.test import TestCase
+# -*- coding: utf-8 -*-
+"""
+Tests du code déterministe : extraction et parsing incrémental du JSON,
+ingrédients, clés de cache, pagination par curseur et disjoncteur.
+Lancement : python manage.py test cocktails
+"""
 
-# Create your tests here.
+import json
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import bulk
+from .cache_backends import llm_cache
+from .cache_keys import make_cache_key, normalize_ingredients
+from .health import BREAKER_CLOSED, BREAKER_HALF_OPEN, BREAKER_OPEN, DependencyMonitor, health_monitor
+from .ingredients import index_cocktail_ingredients, parse_ingredient, parse_ingredients
+from .json_extract import JSONExtractionError, extract_json
+from .models import Cocktail, CocktailIngredient
+from .ollama_service import HTTPX_AVAILABLE, async_ollama_service
+from .pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_page
+from .recommendations import NUMPY_AVAILABLE, IngredientMatrix, _sql_similar, similar_cocktails
+from .search import search_backend, search_cocktails, search_filter, search_terms
+from .streaming import IncrementalJSONParser
+from .views import iter_batch_results
+
+if HTTPX_AVAILABLE:
+    import httpx
+
+# Cache en mémoire : les tests ne touchent pas au fichier SQLite partagé
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'default'},
+    'llm': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'llm'},
+}
+
+
+class ExtractJSONTests(SimpleTestCase):
+    """Extraction du JSON des réponses de modèles."""
+    
+    def test_ignores_surrounding_text(self):
+        text = 'Voici la recette :\n```json\n{"nom": "Mojito", "ingredients": ["rhum"]}\n```\nBonne dégustation !'
+        self.assertEqual(extract_json(text), {'nom': 'Mojito', 'ingredients': ['rhum']})
+    
+    def test_braces_inside_strings(self):
+        self.assertEqual(extract_json('{"nom": "Le {bizarre}", "note": "}"}'),
+                         {'nom': 'Le {bizarre}', 'note': '}'})
+    
+    def test_skips_braces_in_free_text(self):
+        self.assertEqual(extract_json('Format {nom} :\n{"nom": "Negroni"}'), {'nom': 'Negroni'})
+    
+    def test_control_characters_removed(self):
+        self.assertEqual(extract_json('{"nom": "Gin\x00 Fizz"}'), {'nom': 'Gin Fizz'})
+    
+    def test_truncated_response(self):
+        with self.assertRaises(JSONExtractionError) as context:
+            extract_json('{"nom": "Mojito", "descr')
+        self.assertEqual(context.exception.reason, 'truncated')
+    
+    def test_invalid_response(self):
+        with self.assertRaises(JSONExtractionError) as context:
+            extract_json('{"nom": "x",, "y": 1} suite')
+        self.assertEqual(context.exception.reason, 'invalid')
+    
+    def test_empty_and_missing_object(self):
+        for text, reason in (('', 'empty'), ('   ', 'empty'), ('pas de json', 'no_object')):
+            with self.subTest(text=text):
+                with self.assertRaises(JSONExtractionError) as context:
+                    extract_json(text)
+                self.assertEqual(context.exception.reason, reason)
+
+
+class IncrementalJSONParserTests(SimpleTestCase):
+    """Parsing incrémental des recettes streamées."""
+    
+    TEXT = ('```json\n{"nom": "Le {bizarre}", "ingredients": [{"nom": "gin"}, "citron \\"vert\\""], '
+            '"n": 2}\n``` merci')
+    
+    def feed_by_char(self, parser, text):
+        events = []
+        for char in text:
+            events.extend(parser.feed(char))
+        return events
+    
+    def test_events_as_fields_complete(self):
+        parser = IncrementalJSONParser()
+        events = self.feed_by_char(parser, self.TEXT)
+        self.assertEqual(events, [
+            ('field', 'nom', 'Le {bizarre}'),
+            ('item', 'ingredients', (0, {'nom': 'gin'})),
+            ('item', 'ingredients', (1, 'citron "vert"')),
+            ('field', 'ingredients', [{'nom': 'gin'}, 'citron "vert"']),
+            ('field', 'n', 2),
+        ])
+        self.assertTrue(parser.complete)
+        self.assertEqual(parser.result(), {'nom': 'Le {bizarre}', 'ingredients': [{'nom': 'gin'}, 'citron "vert"'], 'n': 2})
+    
+    def test_chunking_does_not_change_events(self):
+        expected = self.feed_by_char(IncrementalJSONParser(), self.TEXT)
+        parser = IncrementalJSONParser()
+        events = []
+        for start in range(0, len(self.TEXT), 7):
+            events.extend(parser.feed(self.TEXT[start:start + 7]))
+        self.assertEqual(events, expected)
+    
+    def test_incomplete_stream(self):
+        parser = IncrementalJSONParser()
+        events = parser.feed('{"a": 1, "b": [1, 2')
+        self.assertEqual(events, [('field', 'a', 1), ('item', 'b', (0, 1))])
+        self.assertFalse(parser.complete)
+        self.assertIsNone(parser.result())
+    
+    def test_text_after_object_ignored(self):
+        parser = IncrementalJSONParser()
+        parser.feed('{"a": 1}')
+        self.assertEqual(parser.feed(' {"b": 2}'), [])
+        self.assertEqual(parser.result(), {'a': 1})
+
+
+class ParseIngredientTests(SimpleTestCase):
+    """Découpage des lignes de recette en nom normalisé et quantité."""
+    
+    def test_quantities_and_units(self):
+        cases = {
+            '4 cl de Gin': ('gin', '4 cl'),
+            "- 2 traits d'Angostura": ('angostura', '2 traits'),
+            '½ oz Lime juice (fresh)': ('lime juice', '1/2 oz'),
+            '1-2 feuilles de menthe': ('menthe', '1-2 feuilles'),
+            '3 cuillères à soupe de sucre': ('sucre', '3 cuilleres a soupe'),
+        }
+        for line, expected in cases.items():
+            with self.subTest(line=line):
+                self.assertEqual(parse_ingredient(line), expected)
+    
+    def test_without_quantity(self):
+        self.assertEqual(parse_ingredient('Zeste de citron vert'), ('zeste de citron vert', ''))
+    
+    def test_parse_ingredients_deduplicates(self):
+        self.assertEqual(parse_ingredients('Gin\n4 cl gin\n\nTonic'), [('gin', ''), ('tonic', '')])
+        self.assertEqual(parse_ingredients(['4 cl Gin', 'Tonic']), [('gin', '4 cl'), ('tonic', '')])
+
+
+class MakeCacheKeyTests(SimpleTestCase):
+    """Clés de cache canoniques."""
+    
+    def test_ingredient_order_and_accents(self):
+        first = make_cache_key('recipe', ingredients=normalize_ingredients(['Citron', 'Crème de menthe', 'gin']))
+        second = make_cache_key('recipe', ingredients=normalize_ingredients(['GIN', 'creme  de menthe', 'citron', 'Gin']))
+        self.assertEqual(first, second)
+    
+    def test_text_normalized(self):
+        self.assertEqual(make_cache_key('suggestions', mood='Détendu ', occasion='Apéritif'),
+                         make_cache_key('suggestions', occasion='aperitif', mood='detendu'))
+    
+    def test_parameters_distinguish_keys(self):
+        self.assertNotEqual(make_cache_key('recipe', style='classique'), make_cache_key('recipe', style='tiki'))
+        self.assertNotEqual(make_cache_key('recipe', style='classique'), make_cache_key('prompt', style='classique'))
+    
+    def test_key_format(self):
+        self.assertRegex(make_cache_key('recipe', style='classique'), r'^recipe:v\d+:[0-9a-f]{32}$')
+
+
+class KeysetPaginationTests(TestCase):
+    """Pagination par curseur sur (created_at, id)."""
+    
+    @classmethod
+    def setUpTestData(cls):
+        Cocktail.objects.bulk_create([
+            Cocktail(name=f'Cocktail {index}', description='d', ingredients='gin', musical_ambiance='', user_request='')
+            for index in range(7)
+        ])
+        # Deux cocktails à la même date : l'id départage
+        now = timezone.now()
+        for index, cocktail in enumerate(Cocktail.objects.order_by('id')):
+            cocktail.created_at = now - timedelta(minutes=index // 2)
+            cocktail.save(update_fields=['created_at'])
+    
+    def test_pages_cover_all_rows_once(self):
+        expected = list(Cocktail.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        seen, cursor = [], None
+        while True:
+            rows, cursor = keyset_page(Cocktail.objects.all(), cursor, 3)
+            seen.extend(row.id for row in rows)
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+    
+    def test_last_page_has_no_cursor(self):
+        rows, cursor = keyset_page(Cocktail.objects.all(), None, 7)
+        self.assertEqual(len(rows), 7)
+        self.assertIsNone(cursor)
+    
+    def test_cursor_round_trip(self):
+        created_at = timezone.now()
+        self.assertEqual(decode_cursor(encode_cursor(created_at, 42)), (created_at, 42))
+    
+    def test_invalid_cursor(self):
+        for cursor in ('nimportequoi', encode_cursor(timezone.now(), 1)[:-3] + '!!!'):
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(InvalidCursor):
+                    keyset_page(Cocktail.objects.all(), cursor, 3)
+
+
+@override_settings(CACHES=TEST_CACHES, HEALTH_MONITOR_ENABLED=False,
+                   CIRCUIT_BREAKER_THRESHOLD=3, CIRCUIT_BREAKER_COOLDOWN=30)
+class CircuitBreakerTests(SimpleTestCase):
+    """Transitions du disjoncteur des dépendances."""
+    
+    def setUp(self):
+        cache.clear()
+        self.monitor = DependencyMonitor()
+        # Horloge simulée (le cache en mémoire l'utilise aussi pour les expirations)
+        self.now = 1000.0
+        patcher = mock.patch('time.time', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def open_breaker(self):
+        for _ in range(3):
+            self.monitor.record_failure('ollama', 'Connection refused')
+    
+    def test_opens_after_threshold(self):
+        self.monitor.record_failure('ollama', 'Connection refused')
+        self.monitor.record_failure('ollama', 'Connection refused')
+        self.assertEqual(self.monitor.get_state('ollama')['breaker'], BREAKER_CLOSED)
+        self.assertTrue(self.monitor.allow_request('ollama'))
+        
+        self.monitor.record_failure('ollama', 'Connection refused')
+        self.assertEqual(self.monitor.get_state('ollama')['breaker'], BREAKER_OPEN)
+        self.assertFalse(self.monitor.allow_request('ollama'))
+        self.assertEqual(self.monitor.retry_after('ollama'), 30)
+    
+    def test_success_resets_failures(self):
+        self.monitor.record_failure('ollama', 'Connection refused')
+        self.monitor.record_failure('ollama', 'Connection refused')
+        self.monitor.record_success('ollama')
+        self.monitor.record_failure('ollama', 'Connection refused')
+        self.assertEqual(self.monitor.get_state('ollama')['breaker'], BREAKER_CLOSED)
+    
+    def test_half_open_admits_single_trial(self):
+        self.open_breaker()
+        self.now += 31
+        self.assertTrue(self.monitor.allow_request('ollama'))
+        self.assertEqual(self.monitor.get_state('ollama')['breaker'], BREAKER_HALF_OPEN)
+        self.assertFalse(self.monitor.allow_request('ollama'))
+        self.assertFalse(self.monitor.allow_request('ollama'))
+        self.assertGreaterEqual(self.monitor.retry_after('ollama'), 1)
+    
+    def test_trial_success_closes(self):
+        self.open_breaker()
+        self.now += 31
+        self.assertTrue(self.monitor.allow_request('ollama'))
+        self.monitor.record_success('ollama')
+        self.assertEqual(self.monitor.get_state('ollama')['breaker'], BREAKER_CLOSED)
+        self.assertTrue(self.monitor.allow_request('ollama'))
+        self.assertTrue(self.monitor.allow_request('ollama'))
+    
+    def test_trial_failure_reopens(self):
+        self.open_breaker()
+        self.now += 31
+        self.assertTrue(self.monitor.allow_request('ollama'))
+        self.monitor.record_failure('ollama', 'Connection refused')
+        self.assertEqual(self.monitor.get_state('ollama')['breaker'], BREAKER_OPEN)
+        self.assertFalse(self.monitor.allow_request('ollama'))
+        # Nouvel essai après un nouveau délai complet
+        self.now += 31
+        self.assertTrue(self.monitor.allow_request('ollama'))
+
+
+@skipUnless(HTTPX_AVAILABLE, "httpx requis pour le client Ollama asynchrone")
+@override_settings(CACHES=TEST_CACHES, HEALTH_MONITOR_ENABLED=False, OLLAMA_MAX_RETRIES=0)
+class AsyncOllamaBreakerTests(SimpleTestCase):
+    """Seules les pannes d'Ollama ouvrent le disjoncteur, pas la saturation locale."""
+    
+    def setUp(self):
+        cache.clear()
+    
+    def request_failing_with(self, error, calls=5):
+        client = mock.Mock()
+        client.post = mock.AsyncMock(side_effect=error)
+        with mock.patch('cocktails.ollama_service.get_async_http_client', return_value=client):
+            for _ in range(calls):
+                self.assertIsNone(async_to_sync(async_ollama_service._make_request)('generate', {}))
+    
+    def test_pool_exhaustion_keeps_breaker_closed(self):
+        self.request_failing_with(httpx.PoolTimeout('Pool de connexions saturé'))
+        self.assertEqual(health_monitor.get_state('ollama')['breaker'], BREAKER_CLOSED)
+        self.assertTrue(health_monitor.allow_request('ollama'))
+    
+    def test_connection_errors_open_breaker(self):
+        self.request_failing_with(httpx.ConnectError('Connection refused'))
+        self.assertEqual(health_monitor.get_state('ollama')['breaker'], BREAKER_OPEN)
+        self.assertFalse(health_monitor.allow_request('ollama'))
+
+
+@override_settings(CACHES=TEST_CACHES, HEALTH_MONITOR_ENABLED=False)
+class BatchGenerationTests(TestCase):
+    """Génération par lot : déduplication contre le cache et enregistrement."""
+    
+    def setUp(self):
+        cache.clear()
+        llm_cache.clear()
+        patcher = mock.patch('cocktails.views.provider_registry.generate', side_effect=self.fake_generate)
+        self.generate = patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    @staticmethod
+    def fake_generate(user_request):
+        return {
+            'name': user_request.title(),
+            'description': 'd',
+            'ingredients': 'gin',
+            'musical_ambiance': 'jazz',
+        }, 'demo'
+    
+    def post_batch(self, body):
+        return self.client.post(reverse('cocktails:api_generate_batch'), json.dumps(body), content_type='application/json')
+    
+    def run_batch(self, user_requests):
+        response = self.post_batch({'requests': user_requests})
+        self.assertEqual(response.status_code, 200)
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(lines[-1]['status'], 'done')
+        return lines[-1]
+    
+    def test_duplicates_generated_once(self):
+        done = self.run_batch(['mojito', 'Mojito ', 'negroni'])
+        self.assertEqual(self.generate.call_count, 2)
+        self.assertEqual(Cocktail.objects.count(), 2)
+        self.assertEqual(done['ids'][0], done['ids'][1])
+    
+    def test_resubmission_reuses_saved_rows(self):
+        first = self.run_batch(['mojito', 'negroni'])
+        second = self.run_batch(['negroni', 'mojito'])
+        self.assertEqual(self.generate.call_count, 2)
+        self.assertEqual(Cocktail.objects.count(), 2)
+        self.assertEqual(second['ids'], first['ids'][::-1])
+        self.assertEqual((second['generated'], second['cached']), (0, 2))
+    
+    def test_deleted_row_saved_again(self):
+        first = self.run_batch(['mojito'])
+        Cocktail.objects.filter(id=first['ids'][0]).delete()
+        second = self.run_batch(['mojito'])
+        self.assertEqual(self.generate.call_count, 1)
+        self.assertTrue(Cocktail.objects.filter(id=second['ids'][0]).exists())
+    
+    def test_invalid_bodies_rejected(self):
+        for body in ({'requests': [{'user_request': 5}]}, {'requests': [5]}, ['mojito'], {'requests': ['  ']}):
+            with self.subTest(body=body):
+                self.assertEqual(self.post_batch(body).status_code, 400)
+        self.assertFalse(self.generate.called)
+    
+    def test_aborted_stream_saves_completed_results(self):
+        stream = iter_batch_results(['mojito', 'negroni'])
+        next(stream)
+        stream.close()
+        self.assertTrue(Cocktail.objects.filter(name='Mojito').exists() or Cocktail.objects.filter(name='Negroni').exists())
+
+
+@override_settings(CACHES=TEST_CACHES, HEALTH_MONITOR_ENABLED=False)
+class BulkCocktailTests(TestCase):
+    """Modifications groupées : UPDATE/DELETE conditionnels et endpoints unitaires."""
+    
+    def setUp(self):
+        cache.clear()
+        self.cocktails = Cocktail.objects.bulk_create([
+            Cocktail(name=f'Cocktail {index}', description='d', ingredients='4 cl gin\ntonic',
+                     musical_ambiance='', user_request='', is_favorite=index == 0)
+            for index in range(3)
+        ])
+        self.ids = [cocktail.id for cocktail in self.cocktails]
+        index_cocktail_ingredients(self.cocktails)
+    
+    def post_bulk(self, action, ids):
+        return self.client.post(reverse('cocktails:api_bulk_cocktails'),
+                                json.dumps({'action': action, 'ids': ids}), content_type='application/json')
+    
+    def favorite_ids(self):
+        return set(Cocktail.objects.filter(is_favorite=True).values_list('id', flat=True))
+    
+    def test_favorite_counts_changed_rows_only(self):
+        response = self.post_bulk('favorite', self.ids + [999999])
+        self.assertEqual(response.json(), {'success': True, 'action': 'favorite', 'requested': 4, 'affected': 2})
+        self.assertEqual(self.favorite_ids(), set(self.ids))
+        # Déjà favoris : l'UPDATE conditionnel ne touche aucune ligne
+        self.assertEqual(self.post_bulk('favorite', self.ids).json()['affected'], 0)
+    
+    def test_unfavorite(self):
+        self.assertEqual(self.post_bulk('unfavorite', self.ids).json()['affected'], 1)
+        self.assertEqual(self.favorite_ids(), set())
+    
+    def test_delete_ignores_unknown_ids(self):
+        self.assertTrue(CocktailIngredient.objects.filter(cocktail_id=self.ids[0]).exists())
+        response = self.post_bulk('delete', [self.ids[0], self.ids[1], 999999, self.ids[0]])
+        self.assertEqual(response.json()['requested'], 3)
+        self.assertEqual(response.json()['affected'], 2)
+        self.assertEqual(list(Cocktail.objects.values_list('id', flat=True)), [self.ids[2]])
+        self.assertFalse(CocktailIngredient.objects.filter(cocktail_id__in=self.ids[:2]).exists())
+    
+    def test_unknown_ids_only(self):
+        for action in bulk.ACTIONS:
+            with self.subTest(action=action):
+                self.assertEqual(self.post_bulk(action, [999998, 999999]).json()['affected'], 0)
+        self.assertEqual(Cocktail.objects.count(), 3)
+    
+    def test_invalid_requests_rejected(self):
+        with mock.patch('cocktails.views.BULK_MAX_IDS', 2):
+            self.assertEqual(self.post_bulk('delete', self.ids).status_code, 400)
+        for action, ids in (('archive', self.ids), ('delete', []), ('delete', ['1']), ('delete', [True]), ('delete', 3)):
+            with self.subTest(action=action, ids=ids):
+                self.assertEqual(self.post_bulk(action, ids).status_code, 400)
+        self.assertEqual(Cocktail.objects.count(), 3)
+    
+    def test_toggle_favorite_uses_single_update(self):
+        url = reverse('cocktails:api_toggle_favorite', args=[self.ids[1]])
+        with mock.patch('cocktails.views.bulk.toggle_favorite', wraps=bulk.toggle_favorite) as toggle:
+            self.assertTrue(self.client.post(url).json()['is_favorite'])
+            self.assertFalse(self.client.post(url).json()['is_favorite'])
+        self.assertEqual(toggle.call_count, 2)
+        missing = reverse('cocktails:api_toggle_favorite', args=[999999])
+        self.assertEqual(self.client.post(missing).status_code, 404)
+    
+    def test_delete_cocktail_uses_bulk_path(self):
+        url = reverse('cocktails:api_delete_cocktail', args=[self.ids[1]])
+        with mock.patch('cocktails.views.bulk.delete_cocktails', wraps=bulk.delete_cocktails) as delete:
+            self.assertEqual(self.client.delete(url).status_code, 200)
+            self.assertEqual(self.client.delete(url).status_code, 404)
+        delete.assert_called_with([self.ids[1]])
+        self.assertFalse(Cocktail.objects.filter(id=self.ids[1]).exists())
+
+
+@override_settings(CACHES=TEST_CACHES, HEALTH_MONITOR_ENABLED=False)
+class ConditionalGetTests(TestCase):
+    """ETag des lectures : 304 tant qu'aucune écriture, nouvel ETag ensuite."""
+    
+    def setUp(self):
+        cache.clear()
+        llm_cache.clear()
+        self.cocktails = Cocktail.objects.bulk_create([
+            Cocktail(name=f'Cocktail {index}', description='d', ingredients='gin',
+                     musical_ambiance='', user_request='')
+            for index in range(2)
+        ])
+        self.list_url = reverse('cocktails:api_cocktails')
+    
+    def detail_url(self, cocktail):
+        return reverse('cocktails:detail', args=[cocktail.id])
+    
+    def assert_not_modified(self, url, etag):
+        # Vérifié sur la version en cache, sans requête SQL
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+    
+    def assert_modified(self, url, etag):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        return response['ETag']
+    
+    def test_list_etag_changes_on_create(self):
+        etag = self.client.get(self.list_url)['ETag']
+        self.assert_not_modified(self.list_url, etag)
+        with mock.patch('cocktails.views.provider_registry.generate', return_value=(
+                {'name': 'Mojito', 'description': 'd', 'ingredients': 'rhum', 'musical_ambiance': ''}, 'demo')):
+            response = self.client.post(reverse('cocktails:api_generate_batch'),
+                                        json.dumps({'requests': ['mojito']}), content_type='application/json')
+            b''.join(response.streaming_content)
+        etag = self.assert_modified(self.list_url, etag)
+        self.assert_not_modified(self.list_url, etag)
+    
+    def test_favorite_changes_list_and_detail_etags(self):
+        cocktail, other = self.cocktails
+        list_etag = self.client.get(self.list_url)['ETag']
+        detail_etag = self.client.get(self.detail_url(cocktail))['ETag']
+        other_etag = self.client.get(self.detail_url(other))['ETag']
+        self.assert_not_modified(self.detail_url(cocktail), detail_etag)
+        
+        self.client.post(reverse('cocktails:api_toggle_favorite', args=[cocktail.id]))
+        self.assert_modified(self.list_url, list_etag)
+        detail_etag = self.assert_modified(self.detail_url(cocktail), detail_etag)
+        self.assert_not_modified(self.detail_url(cocktail), detail_etag)
+        # Les autres cocktails gardent leur version
+        self.assert_not_modified(self.detail_url(other), other_etag)
+    
+    def test_delete_changes_list_and_detail_etags(self):
+        cocktail = self.cocktails[0]
+        list_etag = self.client.get(self.list_url)['ETag']
+        detail_etag = self.client.get(self.detail_url(cocktail))['ETag']
+        
+        self.client.delete(reverse('cocktails:api_delete_cocktail', args=[cocktail.id]))
+        self.assert_modified(self.list_url, list_etag)
+        response = self.client.get(self.detail_url(cocktail), HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual(response.status_code, 404)
+    
+    def test_reads_create_no_versions(self):
+        for cocktail in self.cocktails:
+            self.client.get(self.detail_url(cocktail))
+        self.client.get(reverse('cocktails:detail', args=[999999]))
+        self.assertEqual(cache.get_many([f'version:cocktail:{cocktail.id}' for cocktail in self.cocktails]), {})
+
+
+class SearchTests(TestCase):
+    """Recherche plein texte : synchronisation par triggers, classement, repli icontains."""
+    
+    def setUp(self):
+        def create(name, description, ingredients):
+            return Cocktail.objects.create(name=name, description=description, ingredients=ingredients,
+                                           musical_ambiance='', user_request='')
+        self.in_name = create('Gin Basil Smash', 'Frais et herbacé', '6 cl gin\nbasilic')
+        self.in_ingredients = create('Southside', 'Citronné', '6 cl gin\nmenthe')
+        self.in_description = create('Tom Collins', 'Un classique à base de gin', 'citron\nsucre')
+        self.unrelated = create('Crème de Mojito', 'Rafraîchissant', 'rhum\nmenthe')
+    
+    def search_ids(self, text, limit=10):
+        return [pk for pk, _ in search_cocktails(text, limit)]
+    
+    def test_sqlite_index_installed(self):
+        self.assertEqual(search_backend(), 'sqlite')
+    
+    def test_ranking_follows_column_weights(self):
+        ranked = search_cocktails('gin', 10)
+        self.assertEqual([pk for pk, _ in ranked],
+                         [self.in_name.id, self.in_ingredients.id, self.in_description.id])
+        scores = [score for _, score in ranked]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+    
+    def test_all_terms_prefix_and_accents(self):
+        self.assertEqual(self.search_ids('gin menth'), [self.in_ingredients.id])
+        self.assertEqual(self.search_ids('creme mojito'), [self.unrelated.id])
+        self.assertEqual(self.search_ids('"gin" OR *'), self.search_ids('gin or'))
+    
+    def test_update_resyncs_index(self):
+        Cocktail.objects.filter(id=self.unrelated.id).update(name='Gin Mule')
+        self.assertIn(self.unrelated.id, self.search_ids('gin'))
+        self.assertEqual(self.search_ids('mojito'), [])
+        self.in_name.description = 'Aux fruits rouges'
+        self.in_name.save()
+        self.assertEqual(self.search_ids('rouges'), [self.in_name.id])
+    
+    def test_delete_removes_from_index(self):
+        self.in_name.delete()
+        Cocktail.objects.filter(id=self.in_ingredients.id).delete()
+        self.assertEqual(self.search_ids('gin'), [self.in_description.id])
+    
+    def test_search_filter_matches_index(self):
+        terms = search_terms('gin')
+        self.assertEqual(set(Cocktail.objects.filter(search_filter(terms)).values_list('id', flat=True)),
+                         {self.in_name.id, self.in_ingredients.id, self.in_description.id})
+    
+    def test_icontains_fallback(self):
+        with mock.patch('cocktails.search.search_backend', return_value=None):
+            ranked = search_cocktails('gin', 10)
+            self.assertEqual({pk for pk, _ in ranked}, {self.in_name.id, self.in_ingredients.id, self.in_description.id})
+            self.assertTrue(all(score is None for _, score in ranked))
+            fallback = Cocktail.objects.filter(search_filter(search_terms('gin menthe')))
+            self.assertEqual(list(fallback.values_list('id', flat=True)), [self.in_ingredients.id])
+    
+    def test_endpoint_returns_ranked_results(self):
+        response = self.client.get(reverse('cocktails:api_search_cocktails'), {'q': 'gin', 'fields': 'id,name'})
+        self.assertEqual([item['id'] for item in response.json()],
+                         [self.in_name.id, self.in_ingredients.id, self.in_description.id])
+        self.assertEqual(self.client.get(reverse('cocktails:api_search_cocktails')).status_code, 400)
+
+
+@override_settings(CACHES=TEST_CACHES, HEALTH_MONITOR_ENABLED=False)
+class RecommendationTests(TestCase):
+    """Cocktails similaires : matrice creuse, ajouts incrémentaux, reconstruction et repli SQL."""
+    
+    RECIPES = {
+        'reference': 'gin\ntonic\ncitron',
+        'close': 'gin\ntonic',
+        'distant': 'gin\nvermouth',
+        'unrelated': 'rhum\nmenthe',
+    }
+    
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'recommendations.npz')
+        self.ids = {name: self.create(ingredients).id for name, ingredients in self.RECIPES.items()}
+    
+    def create(self, ingredients):
+        cocktail = Cocktail.objects.create(name='c', description='d', ingredients=ingredients,
+                                           musical_ambiance='', user_request='')
+        index_cocktail_ingredients([cocktail])
+        return cocktail
+    
+    def ingredient_ids(self, cocktail_id):
+        return list(CocktailIngredient.objects.filter(cocktail_id=cocktail_id).values_list('ingredient_id', flat=True))
+    
+    def new_matrix(self, merge_rows=1000):
+        with override_settings(RECOMMENDATION_INDEX_PATH=self.path, RECOMMENDATION_MERGE_ROWS=merge_rows):
+            return IngredientMatrix()
+    
+    def similar_ids(self, matrix, name='reference'):
+        cocktail_id = self.ids[name]
+        return [pk for pk, _ in matrix.similar(cocktail_id, self.ingredient_ids(cocktail_id), 10)]
+    
+    def test_sql_fallback_unweighted_cosine(self):
+        reference = self.ids['reference']
+        scored = _sql_similar(reference, self.ingredient_ids(reference), 10)
+        self.assertEqual([pk for pk, _ in scored], [self.ids['close'], self.ids['distant']])
+        self.assertAlmostEqual(scored[0][1], 2 / (2 * 3) ** 0.5)
+        self.assertAlmostEqual(scored[1][1], 1 / (2 * 3) ** 0.5)
+        with mock.patch('cocktails.recommendations.NUMPY_AVAILABLE', False):
+            self.assertEqual(similar_cocktails(reference, 10), scored)
+    
+    @skipUnless(NUMPY_AVAILABLE, "NumPy/SciPy requis pour la matrice")
+    def test_similar_ranks_and_excludes_reference(self):
+        matrix = self.new_matrix()
+        ranked = matrix.similar(self.ids['reference'], self.ingredient_ids(self.ids['reference']), 10)
+        self.assertEqual([pk for pk, _ in ranked], [self.ids['close'], self.ids['distant']])
+        self.assertTrue(1 >= ranked[0][1] > ranked[1][1] > 0)
+        self.assertEqual(len(matrix.similar(self.ids['reference'], self.ingredient_ids(self.ids['reference']), 1)), 1)
+        self.assertTrue(os.path.exists(self.path))
+    
+    @skipUnless(NUMPY_AVAILABLE, "NumPy/SciPy requis pour la matrice")
+    def test_new_cocktails_added_then_merged(self):
+        matrix = self.new_matrix(merge_rows=2)
+        self.similar_ids(matrix)
+        with mock.patch.object(matrix, 'build', wraps=matrix.build) as build:
+            twin = self.create(self.RECIPES['reference']).id
+            # Ajout incrémental (matrice delta), même recette : similarité maximale
+            self.assertEqual(self.similar_ids(matrix)[0], twin)
+            self.assertEqual(matrix.delta.shape[0], 1)
+            self.create('rhum\ncitron')
+            self.assertEqual(self.similar_ids(matrix)[0], twin)
+            build.assert_not_called()
+        # Fusion après RECOMMENDATION_MERGE_ROWS ajouts, fichier réécrit
+        self.assertIsNone(matrix.delta)
+        self.assertEqual(len(matrix.cocktail_ids), 6)
+        reloaded = self.new_matrix()
+        self.assertTrue(reloaded.load())
+        self.assertEqual(list(reloaded.cocktail_ids), list(matrix.cocktail_ids))
+    
+    @skipUnless(NUMPY_AVAILABLE, "NumPy/SciPy requis pour la matrice")
+    def test_rebuilt_after_ingredients_changed(self):
+        matrix = self.new_matrix()
+        self.similar_ids(matrix)
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk.delete_cocktails([self.ids['close']])
+        with mock.patch.object(matrix, 'build', wraps=matrix.build) as build:
+            self.assertEqual(self.similar_ids(matrix), [self.ids['distant']])
+            build.assert_called_once()
+    
+    @skipUnless(NUMPY_AVAILABLE, "NumPy/SciPy requis pour la matrice")
+    def test_worker_loads_matching_file(self):
+        self.similar_ids(self.new_matrix())
+        other = self.new_matrix()
+        with mock.patch.object(other, 'build') as build:
+            self.assertEqual(self.similar_ids(other), [self.ids['close'], self.ids['distant']])
+            build.assert_not_called()
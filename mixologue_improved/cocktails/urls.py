@@ -1,6 +1,16 @@
+from django.conf import settings
 from django.urls import path, include
 from . import views
 
+# Sous ASGI, les vues de génération passent en version asyncio
+if getattr(settings, 'ASYNC_VIEWS', False):
+    from . import views_async
+    generate_cocktail_view = views_async.generate_cocktail
+    job_wait_view = views_async.api_job_wait
+else:
+    generate_cocktail_view = views.generate_cocktail
+    job_wait_view = views.api_job_wait
+
 app_name = 'cocktails'
 
 urlpatterns = [
@@ -9,9 +19,20 @@ urlpatterns = [
     path('cocktail/<int:cocktail_id>/', views.cocktail_detail, name='detail'),
     
     # API endpoints traditionnels
-    path('api/generate-cocktail/', views.generate_cocktail, name='api_generate'),
+    path('api/generate-cocktail/', generate_cocktail_view, name='api_generate'),
+    path('api/generate-cocktail/batch/', views.generate_cocktail_batch, name='api_generate_batch'),
     path('api/generate-cocktail-with-media/', views.generate_cocktail_with_media, name='api_generate_with_media'),
     path('api/cocktails/', views.api_cocktails, name='api_cocktails'),
+    path('api/cocktails/search/', views.api_search_cocktails, name='api_search_cocktails'),
+    path('api/cocktails/bulk/', views.api_bulk_cocktails, name='api_bulk_cocktails'),
+    path('api/cocktails/pantry/', views.api_pantry_cocktails, name='api_pantry_cocktails'),
+    path('api/jobs/', views.api_create_job, name='api_create_job'),
+    path('api/jobs/<uuid:job_id>/', views.api_job_status, name='api_job_status'),
+    path('api/jobs/<uuid:job_id>/wait/', job_wait_view, name='api_job_wait'),
+    path('images/<str:digest>.png', views.cocktail_image, name='image'),
+    path('api/providers/', views.api_providers, name='api_providers'),
+    path('api/cache/stats/', views.api_cache_stats, name='api_cache_stats'),
+    path('api/cocktail/<int:cocktail_id>/similar/', views.api_similar_cocktails, name='api_similar_cocktails'),
     path('api/cocktail/<int:cocktail_id>/favorite/', views.toggle_favorite, name='api_toggle_favorite'),
     path('api/cocktail/<int:cocktail_id>/delete/', views.delete_cocktail, name='api_delete_cocktail'),
     
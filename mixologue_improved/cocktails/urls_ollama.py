@@ -4,9 +4,16 @@ URLs pour les fonctionnalités Ollama de l'application cocktails
 Ce module définit les routes pour l'intégration IA locale.
 """
 
+from django.conf import settings
 from django.urls import path
 from . import views_ollama
 
+# Sous ASGI, les vues de génération passent en version asyncio
+if getattr(settings, 'ASYNC_VIEWS', False):
+    from . import views_async as generation_views
+else:
+    generation_views = views_ollama
+
 # Namespace pour les URLs Ollama
 app_name = 'ollama'
 
@@ -18,17 +25,27 @@ urlpatterns = [
     
     # Génération de recettes de cocktails
     path('generate-cocktail/', 
-         views_ollama.GenerateCocktailView.as_view(), 
+         generation_views.GenerateCocktailView.as_view(), 
          name='generate_cocktail'),
     
+    # Génération de recettes en streaming (Server-Sent Events)
+    path('generate-cocktail/stream/', 
+         generation_views.StreamCocktailView.as_view(), 
+         name='generate_cocktail_stream'),
+    
+    # Affinage d'une recette générée (réutilise le contexte Ollama)
+    path('refine-cocktail/', 
+         generation_views.RefineCocktailView.as_view(), 
+         name='refine_cocktail'),
+    
     # Génération d'images de cocktails
     path('generate-image/', 
-         views_ollama.GenerateCocktailImageView.as_view(), 
+         generation_views.GenerateCocktailImageView.as_view(), 
          name='generate_image'),
     
     # Suggestions de cocktails basées sur l'humeur/occasion
     path('suggestions/', 
-         views_ollama.CocktailSuggestionsView.as_view(), 
+         generation_views.CocktailSuggestionsView.as_view(), 
          name='suggestions'),
     
     # Liste des modèles Ollama disponibles
@@ -51,6 +68,17 @@ Exemples d'utilisation des APIs:
        "difficulty": "facile"
    }
 
+   Version streamée (Server-Sent Events, champs publiés dès qu'ils sont complets):
+   POST /api/ollama/generate-cocktail/stream/  (même corps JSON)
+   GET  /api/ollama/generate-cocktail/stream/?ingredients=vodka,lime&style=moderne
+
+   Affiner la recette obtenue (generation_id renvoyé avec la recette):
+   POST /api/ollama/refine-cocktail/
+   {
+       "generation_id": "3f2a...",
+       "instruction": "moins sucré"
+   }
+
 3. Générer une image de cocktail:
    POST /api/ollama/generate-image/
    Content-Type: application/json
@@ -69,6 +97,6 @@ Exemples d'utilisation des APIs:
        "occasion": "soirée"
    }
 
-5. Lister les modèles disponibles:
+5. Lister les modèles disponibles (et ceux chargés en mémoire, clé "residency"):
    GET /api/ollama/models/
 """
\ No newline at end of file
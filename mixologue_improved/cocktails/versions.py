@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Versions des données
+Chaque écriture sur les cocktails (création, favori, suppression, image)
+incrémente un compteur stocké dans le cache partagé. Les pages mises en
+cache incluent cette version dans leur clé : une écriture rend
+immédiatement obsolètes toutes les copies, sans avoir à les retrouver pour
+les supprimer.
+
+Les mêmes versions servent d'ETag aux lectures HTTP : une version de
+collection (liste des cocktails) et une version par cocktail (page de
+détail), si bien qu'un If-None-Match est vérifié sans lire la base.
+"""
+
+import time
+from typing import Iterable, Optional
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.views.decorators.cache import cache_control
+
+COCKTAILS = 'cocktails'
+# Version commune des cocktails jamais modifiés depuis la dernière perte du cache
+COCKTAIL_EPOCH = 'cocktail_epoch'
+OLLAMA_MODELS = 'ollama_models'
+# Lignes d'ingrédients de cocktails existants (matrice des recommandations)
+INGREDIENTS = 'cocktail_ingredients'
+
+# Lectures HTTP versionnées : réutilisables par le navigateur et un proxy,
+# toujours revalidées par ETag une fois max-age / s-maxage écoulés
+http_cache = cache_control(
+    public=True,
+    max_age=getattr(settings, 'HTTP_CACHE_MAX_AGE', 0),
+    s_maxage=getattr(settings, 'HTTP_CACHE_SHARED_MAX_AGE', 0),
+    must_revalidate=True,
+)
+
+
+def _version_key(name: str) -> str:
+    return f"version:{name}"
+
+
+def _initial_version() -> int:
+    # Compteur perdu (cache vidé) : on repart au-dessus de toute valeur déjà servie
+    return time.time_ns() // 1000
+
+
+def get_version(name: str) -> int:
+    """Version courante d'un ensemble de données."""
+    version = cache.get(_version_key(name))
+    if version is None:
+        cache.add(_version_key(name), _initial_version(), None)
+        version = cache.get(_version_key(name))
+    return version
+
+
+def bump_version(name: str) -> int:
+    """Incrémente la version d'un ensemble de données après une écriture."""
+    try:
+        return cache.incr(_version_key(name))
+    except ValueError:
+        cache.add(_version_key(name), _initial_version(), None)
+        return cache.get(_version_key(name))
+
+
+def data_version() -> int:
+    """Version de l'ensemble des cocktails."""
+    return get_version(COCKTAILS)
+
+
+def cocktail_version(cocktail_id: int) -> int:
+    """
+    Version d'un cocktail (page de détail).
+
+    Lecture seule : un cocktail jamais modifié (ou un identifiant inexistant)
+    partage la version commune, aucune entrée n'est créée par une lecture.
+    """
+    version = cache.get(_version_key(f"cocktail:{cocktail_id}"))
+    return version if version is not None else get_version(COCKTAIL_EPOCH)
+
+
+def cocktails_changed(ids: Optional[Iterable[int]] = None):
+    """
+    À appeler après toute écriture sur les cocktails.
+
+    Args:
+        ids: Cocktails modifiés ou supprimés (inutile pour une création :
+            la version commune n'a jamais été servie pour le nouvel id)
+    """
+    bump_version(COCKTAILS)
+    if ids:
+        # Postérieure à la version commune et à toute version déjà écrite
+        version = _initial_version()
+        cache.set_many({_version_key(f"cocktail:{cocktail_id}"): version for cocktail_id in ids}, None)
+
+
+def ingredients_version() -> int:
+    """Version des lignes d'ingrédients des cocktails existants."""
+    return get_version(INGREDIENTS)
+
+
+def ingredients_changed():
+    """
+    À appeler quand les ingrédients d'un cocktail existant changent ou qu'un
+    cocktail est supprimé (une création est ajoutée de façon incrémentale).
+
+    La version n'est incrémentée qu'après validation de la transaction en
+    cours : un worker qui la voit changer relit des données à jour.
+    """
+    transaction.on_commit(lambda: bump_version(INGREDIENTS))
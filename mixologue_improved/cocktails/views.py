@@ -1,12 +1,32 @@
 # Imports Django pour les vues, réponses HTTP et décorateurs
 from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse
+from django.http import FileResponse, Http404, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
-from django.core.paginator import Paginator
+from django.views.decorators.http import condition, require_http_methods
+from django.conf import settings
+from django.urls import reverse
 import json
 import os
-from .models import Cocktail
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .models import Cocktail, GenerationJob
+from . import bulk
+from .cache_backends import llm_cache
+from .cache_keys import make_cache_key
+from .health import health_monitor
+from .image_store import IMAGE_CACHE_CONTROL, open_image
+from .image_variants import PIL_AVAILABLE, VARIANT_FORMATS, negotiate_format, variant_renderer
+from .ingredients import index_cocktail_ingredients, pantry_matches, parse_pantry
+from .json_extract import JSONExtractionError, extract_json
+from .jobs import job_pool, wait_for_job
+from .providers import ProviderRegistry
+from .pagination import CachedCountPaginator, InvalidCursor, keyset_page
+from .pipeline import Pipeline
+from .recommendations import similar_cocktails
+from .residency import keep_alive_for
+from .search import search_cocktails
+from .similarity import get_similarity_threshold, request_index
+from .streaming import IncrementalJSONParser
+from .versions import cocktail_version, cocktails_changed, data_version, http_cache
 
 # Import des bibliothèques IA avec gestion d'erreur gracieuse
 # Permet à l'application de fonctionner même si certaines dépendances manquent
@@ -34,6 +54,104 @@ except ImportError:
     print("Requests non disponible - certaines fonctionnalités limitées")
 
 
+# Champs sérialisés d'un cocktail -> colonnes à charger
+COCKTAIL_FIELDS = {
+    'id': ('id',),
+    'name': ('name',),
+    'description': ('description',),
+    'ingredients': ('ingredients',),
+    'musical_ambiance': ('musical_ambiance',),
+    'image_prompt': ('image_prompt',),
+    'image_url': ('image_hash',),
+    'thumbnail_url': ('image_hash',),
+    'user_request': ('user_request',),
+    'is_favorite': ('is_favorite',),
+    'created_at': ('created_at',),
+}
+
+HISTORY_CACHE_TIMEOUT = getattr(settings, 'HISTORY_CACHE_TIMEOUT', 3600)  # Fragments de l'historique
+API_COCKTAILS_DEFAULT_LIMIT = 20
+API_COCKTAILS_MAX_LIMIT = 100
+SEARCH_MAX_LIMIT = 50
+SIMILAR_DEFAULT_LIMIT = 10
+
+
+def cocktail_to_dict(cocktail, fields=None):
+    """
+    Sérialise un cocktail pour les réponses de l'API
+    
+    Avec fields, seuls ces champs sont sérialisés (le cocktail peut alors
+    avoir été chargé avec .only(cocktail_columns(fields))).
+    """
+    data = {
+        'id': lambda: cocktail.id,
+        'name': lambda: cocktail.name,
+        'description': lambda: cocktail.description,
+        'ingredients': lambda: cocktail.ingredients,
+        'musical_ambiance': lambda: cocktail.musical_ambiance,
+        'image_prompt': lambda: cocktail.image_prompt,
+        'image_url': lambda: cocktail.image_url,
+        'thumbnail_url': lambda: cocktail.thumbnail_url,
+        'user_request': lambda: cocktail.user_request,
+        'is_favorite': lambda: cocktail.is_favorite,
+        'created_at': lambda: cocktail.created_at.isoformat(),
+    }
+    return {name: data[name]() for name in (fields or COCKTAIL_FIELDS)}
+
+
+def parse_fields_param(value):
+    """
+    Lit le paramètre fields=id,name,... d'une requête
+    
+    Returns:
+        Liste des champs demandés (None pour tous)
+    
+    Raises:
+        ValueError: Si un champ est inconnu
+    """
+    if not value:
+        return None
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in COCKTAIL_FIELDS]
+    if unknown:
+        raise ValueError(f"Champs inconnus: {', '.join(unknown)}")
+    return fields
+
+
+def cocktail_columns(fields):
+    """Colonnes à charger pour sérialiser ces champs (clé de pagination comprise)"""
+    columns = {'id', 'created_at'}
+    for name in fields or COCKTAIL_FIELDS:
+        columns.update(COCKTAIL_FIELDS[name])
+    return sorted(columns)
+
+
+def find_similar_cocktail(user_request, threshold):
+    """
+    Cherche un cocktail déjà servi pour une demande quasi identique
+    
+    Returns:
+        Tuple (cocktail ou None si sous le seuil, meilleure similarité ou None)
+    """
+    cocktail_id, score = request_index.find_similar(user_request)
+    if cocktail_id is None or score < threshold:
+        return None, score
+    
+    cocktail = Cocktail.objects.filter(id=cocktail_id).first()
+    if cocktail is None:
+        # Supprimé par un autre worker depuis son indexation
+        request_index.remove(cocktail_id)
+    return cocktail, score
+
+
+def similarity_payload(cocktail, score, reused):
+    """Réponse de génération enrichie du score de similarité (pour régler le seuil)"""
+    payload = cocktail_to_dict(cocktail)
+    payload['similarity_score'] = round(score, 3) if score is not None else None
+    payload['reused'] = reused
+    return payload
+
+
 def index(request):
     """
     Vue pour la page d'accueil de l'application
@@ -47,17 +165,37 @@ def cocktail_history(request):
     Vue pour l'historique des cocktails générés
     
     Affiche tous les cocktails avec pagination pour améliorer les performances.
-    Utilise Django Paginator pour diviser les résultats en pages de 12 éléments.
+    Les pages de 12 éléments sont rendues une fois par version des données
+    (fragment mis en cache) et le total vient du cache : une page déjà
+    rendue ne touche pas la base.
     """
-    cocktails = Cocktail.objects.all()
-    paginator = Paginator(cocktails, 12)  # 12 cocktails par page pour un affichage optimal
+    version = data_version()
+    cocktails = Cocktail.objects.order_by('-created_at', '-id')
+    # 12 cocktails par page pour un affichage optimal
+    paginator = CachedCountPaginator(cocktails, 12, count_key='history:count', version=version)
     
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     
-    return render(request, 'cocktails/history.html', {'page_obj': page_obj})
+    return render(request, 'cocktails/history.html', {
+        'page_obj': page_obj,
+        'data_version': version,
+        'history_cache_timeout': HISTORY_CACHE_TIMEOUT,
+    })
 
 
+def cocktail_etag(request, cocktail_id):
+    """ETag de la page de détail : version du cocktail, lue dans le cache."""
+    return f"cocktail-{cocktail_id}-{cocktail_version(cocktail_id)}"
+
+
+def cocktails_etag(request):
+    """ETag de la liste des cocktails : version de la collection."""
+    return f"cocktails-{data_version()}"
+
+
+@http_cache
+@condition(etag_func=cocktail_etag)
 def cocktail_detail(request, cocktail_id):
     """
     Vue pour afficher les détails d'un cocktail spécifique
@@ -67,6 +205,7 @@ def cocktail_detail(request, cocktail_id):
     
     Returns:
         Rendu de la page de détail ou erreur 404 si non trouvé
+        (304 sans lecture de la base si la version du navigateur est à jour)
     """
     cocktail = get_object_or_404(Cocktail, id=cocktail_id)
     return render(request, 'cocktails/detail.html', {'cocktail': cocktail})
@@ -87,31 +226,18 @@ def generate_cocktail(request):
             print("Error: Empty user_request")
             return JsonResponse({'error': 'Aucune demande fournie'}, status=400)
         
-        # Génération du cocktail avec IA (Ollama prioritaire)
-        cocktail_data = None
-        
-        # Essayer d'abord avec Ollama (local, plus rapide et créatif)
-        if OLLAMA_AVAILABLE:
-            try:
-                cocktail_data = generate_cocktail_with_ollama(user_request)
-                print("Cocktail généré avec Ollama")
-            except Exception as e:
-                print(f"Erreur Ollama: {e}")
-                cocktail_data = None
-        
-        # Fallback vers OpenAI si Ollama échoue
-        if not cocktail_data and OPENAI_AVAILABLE and openai.api_key:
-            try:
-                cocktail_data = generate_cocktail_with_openai(user_request)
-                print("Cocktail généré avec OpenAI")
-            except Exception as e:
-                print(f"Erreur OpenAI: {e}")
-                cocktail_data = None
+        # Demande quasi identique déjà servie : on renvoie le cocktail enregistré (opt-in)
+        threshold = get_similarity_threshold(data)
+        score = None
+        if threshold is not None:
+            similar, score = find_similar_cocktail(user_request, threshold)
+            if similar:
+                print(f"Cocktail {similar.id} réutilisé (similarité {score:.3f})")
+                return JsonResponse(similarity_payload(similar, score, reused=True))
         
-        # Fallback final vers le mode démo
-        if not cocktail_data:
-            cocktail_data = generate_demo_cocktail(user_request)
-            print("Cocktail généré en mode démo")
+        # Génération du cocktail : fournisseurs ordonnés par latence et taux de succès
+        cocktail_data, provider = provider_registry.generate(user_request)
+        print(f"Cocktail généré avec {provider}")
         
         # Sauvegarder en base de données
         cocktail = Cocktail.objects.create(
@@ -122,25 +248,28 @@ def generate_cocktail(request):
             image_prompt=cocktail_data.get('image_prompt', ''),
             user_request=user_request
         )
+        request_index.add(cocktail.id, user_request)
+        index_cocktail_ingredients([cocktail])
+        cocktails_changed()
         
-        return JsonResponse({
-            'id': cocktail.id,
-            'name': cocktail.name,
-            'description': cocktail.description,
-            'ingredients': cocktail.ingredients,
-            'musical_ambiance': cocktail.musical_ambiance,
-            'image_prompt': cocktail.image_prompt,
-            'user_request': cocktail.user_request,
-            'is_favorite': cocktail.is_favorite,
-            'created_at': cocktail.created_at.isoformat()
-        })
-        
+        if threshold is not None:
+            return JsonResponse(similarity_payload(cocktail, score, reused=False))
+        return JsonResponse(cocktail_to_dict(cocktail))
+    
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
 
-def generate_cocktail_with_ollama(user_request):
-    """Génère un cocktail avec Ollama (Llama 3.1)"""
+OLLAMA_COCKTAIL_MODEL = 'llama3.1:latest'
+OLLAMA_COCKTAIL_OPTIONS = {
+    'temperature': 0.8,
+    'top_p': 0.9,
+    'num_predict': 800
+}
+
+
+def build_ollama_cocktail_messages(user_request):
+    """Construit les messages de chat envoyés à Ollama pour une demande client"""
     # Prompt amélioré pour Ollama
     prompt = f"""Tu es un mixologue expert reconnu mondialement, créateur de cocktails innovants. Un client te demande : "{user_request}"
 
@@ -161,78 +290,80 @@ Réponds UNIQUEMENT avec un JSON valide au format suivant :
 
 Sois créatif, précis dans les dosages, et assure-toi que le cocktail soit réalisable et délicieux."""
     
+    return [
+        {
+            'role': 'system',
+            'content': 'Tu es un mixologue expert et créatif. Tu réponds toujours avec du JSON valide uniquement.'
+        },
+        {
+            'role': 'user',
+            'content': prompt
+        }
+    ]
+
+
+def parse_ollama_cocktail(ai_response):
+    """Extrait et valide le cocktail JSON renvoyé par Ollama"""
     try:
-        response = ollama.chat(
-            model='llama3.1:latest',
-            messages=[
-                {
-                    'role': 'system',
-                    'content': 'Tu es un mixologue expert et créatif. Tu réponds toujours avec du JSON valide uniquement.'
-                },
-                {
-                    'role': 'user',
-                    'content': prompt
-                }
-            ],
-            options={
-                'temperature': 0.8,
-                'top_p': 0.9,
-                'num_predict': 800
-            }
-        )
-        
-        ai_response = response['message']['content'].strip()
-        
-        # Nettoyer la réponse pour extraire le JSON
-        if '```json' in ai_response:
-            ai_response = ai_response.split('```json')[1].split('```')[0].strip()
-        elif '```' in ai_response:
-            ai_response = ai_response.split('```')[1].strip()
-        
-        # Chercher le JSON dans la réponse
-        import re
-        # Trouver le premier { et le dernier } correspondant
-        start_idx = ai_response.find('{')
-        if start_idx != -1:
-            brace_count = 0
-            end_idx = start_idx
-            for i, char in enumerate(ai_response[start_idx:], start_idx):
-                if char == '{':
-                    brace_count += 1
-                elif char == '}':
-                    brace_count -= 1
-                    if brace_count == 0:
-                        end_idx = i
-                        break
-            if brace_count == 0:
-                ai_response = ai_response[start_idx:end_idx + 1]
-        
-        # Nettoyer les caractères de contrôle invalides
-        import re
-        ai_response = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', ai_response)
-        
-        # Parser le JSON
-        cocktail_data = json.loads(ai_response)
-        
-        # Validation des champs requis
-        required_fields = ['name', 'description', 'ingredients', 'musical_ambiance', 'image_prompt']
-        for field in required_fields:
-            if field not in cocktail_data or not cocktail_data[field]:
-                raise ValueError(f"Champ manquant: {field}")
-        
-        return cocktail_data
-        
-    except json.JSONDecodeError as e:
+        cocktail_data = extract_json(ai_response, 'ollama_chat')
+    except JSONExtractionError as e:
         print(f"Erreur JSON Ollama: {e}")
         print(f"Réponse brute: {ai_response}")
         raise Exception("Réponse JSON invalide d'Ollama")
+    
+    # Validation des champs requis
+    required_fields = ['name', 'description', 'ingredients', 'musical_ambiance', 'image_prompt']
+    for field in required_fields:
+        if field not in cocktail_data or not cocktail_data[field]:
+            raise ValueError(f"Champ manquant: {field}")
+    
+    return cocktail_data
+
+
+def generate_cocktail_with_ollama(user_request, on_field=None):
+    """
+    Génère un cocktail avec Ollama (Llama 3.1)
+    
+    Avec on_field, la réponse est streamée et on_field(champ, valeur) est
+    appelé dès que chaque champ du JSON est complet.
+    """
+    try:
+        if on_field is None:
+            response = ollama.chat(
+                model=OLLAMA_COCKTAIL_MODEL,
+                messages=build_ollama_cocktail_messages(user_request),
+                options=OLLAMA_COCKTAIL_OPTIONS,
+                keep_alive=keep_alive_for(OLLAMA_COCKTAIL_MODEL)
+            )
+            return parse_ollama_cocktail(response['message']['content'])
+        
+        parser = IncrementalJSONParser()
+        content = []
+        for chunk in ollama.chat(
+            model=OLLAMA_COCKTAIL_MODEL,
+            messages=build_ollama_cocktail_messages(user_request),
+            options=OLLAMA_COCKTAIL_OPTIONS,
+            keep_alive=keep_alive_for(OLLAMA_COCKTAIL_MODEL),
+            stream=True
+        ):
+            token = chunk['message']['content']
+            content.append(token)
+            for kind, field, value in parser.feed(token):
+                if kind == 'field':
+                    on_field(field, value)
+        
+        return parse_ollama_cocktail(''.join(content))
+    
     except Exception as e:
         print(f"Erreur Ollama: {e}")
         raise
 
 
-def generate_cocktail_with_openai(user_request):
-    """Génère un cocktail avec OpenAI GPT"""
+OPENAI_COCKTAIL_MODEL = "gpt-3.5-turbo"
+
+
+def build_openai_cocktail_messages(user_request):
+    """Construit les messages de chat envoyés à OpenAI pour une demande client"""
     prompt = f"""Tu es un mixologue expert et créatif. Un client te demande : "{user_request}"
 
 Crée un cocktail original et réponds UNIQUEMENT au format JSON suivant :
@@ -246,30 +377,37 @@ Crée un cocktail original et réponds UNIQUEMENT au format JSON suivant :
 
 Sois créatif, original et assure-toi que le cocktail correspond à la demande du client."""
     
+    return [
+        {"role": "system", "content": "Tu es un mixologue expert et créatif."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def parse_openai_cocktail(ai_response):
+    """Parse le cocktail JSON renvoyé par OpenAI"""
+    try:
+        return extract_json(ai_response, 'openai_chat')
+    except JSONExtractionError:
+        # Fallback si l'IA ne retourne pas du JSON valide
+        raise Exception("Réponse JSON invalide d'OpenAI")
+
+
+def generate_cocktail_with_openai(user_request, on_field=None):
+    """Génère un cocktail avec OpenAI GPT"""
     from openai import OpenAI
     client = OpenAI(api_key=openai.api_key)
     
     response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "Tu es un mixologue expert et créatif."},
-            {"role": "user", "content": prompt}
-        ],
+        model=OPENAI_COCKTAIL_MODEL,
+        messages=build_openai_cocktail_messages(user_request),
         max_tokens=500,
         temperature=0.8
     )
     
-    ai_response = response.choices[0].message.content.strip()
-    
-    try:
-        cocktail_data = json.loads(ai_response)
-        return cocktail_data
-    except json.JSONDecodeError:
-        # Fallback si l'IA ne retourne pas du JSON valide
-        raise Exception("Réponse JSON invalide d'OpenAI")
+    return parse_openai_cocktail(response.choices[0].message.content)
 
 
-def generate_demo_cocktail(user_request):
+def generate_demo_cocktail(user_request, on_field=None):
     """Génère un cocktail de démonstration sans IA"""
     demo_cocktails = [
         {
@@ -295,6 +433,24 @@ def generate_demo_cocktail(user_request):
         return demo_cocktails[1]
 
 
+# Registre des fournisseurs de génération, le mode démo restant le dernier recours
+provider_registry = ProviderRegistry()
+provider_registry.register(
+    'ollama',
+    generate_cocktail_with_ollama,
+    enabled=lambda: OLLAMA_AVAILABLE and health_monitor.allow_request('ollama')
+)
+provider_registry.register(
+    'openai',
+    generate_cocktail_with_openai,
+    enabled=lambda: OPENAI_AVAILABLE and bool(openai.api_key)
+)
+provider_registry.register('demo', generate_demo_cocktail, fallback=True)
+
+
+OLLAMA_IMAGE_PROMPT_MODEL = 'brxce/stable-diffusion-prompt-generator'
+
+
 def generate_cocktail_image_prompt(cocktail_name, ingredients, description):
     """Génère un prompt pour l'image du cocktail en utilisant Ollama"""
     if not OLLAMA_AVAILABLE:
@@ -305,11 +461,12 @@ def generate_cocktail_image_prompt(cocktail_name, ingredients, description):
         user_prompt = f"Create a detailed Stable Diffusion prompt for a cocktail image: {cocktail_name}. Ingredients: {', '.join(ingredients)}. Description: {description}. Make it photorealistic, professional bar photography style, with beautiful lighting and garnish."
         
         response = ollama.chat(
-            model='brxce/stable-diffusion-prompt-generator',
+            model=OLLAMA_IMAGE_PROMPT_MODEL,
             messages=[{
                 'role': 'user',
                 'content': user_prompt
-            }]
+            }],
+            keep_alive=keep_alive_for(OLLAMA_IMAGE_PROMPT_MODEL)
         )
         
         return response['message']['content'].strip()
@@ -371,6 +528,117 @@ def get_background_music_suggestions(cocktail_style):
     return music_suggestions
 
 
+def recipe_stage(context):
+    """Étape recette : publie l'en-tête (nom, description, ingrédients) dès qu'il est connu"""
+    head = {}
+    
+    def on_field(field, value):
+        if field in ('name', 'description', 'ingredients'):
+            head[field] = value
+        if 'name' in head and 'ingredients' in head:
+            context.publish('recipe_head', dict(head))
+    
+    cocktail_data, provider = provider_registry.generate(context['user_request'], on_field=on_field)
+    print(f"Cocktail généré avec {provider}")
+    
+    if cocktail_data:
+        # Fournisseur non streamé : l'en-tête n'est connu qu'à la fin
+        context.publish('recipe_head', {
+            'name': cocktail_data.get('name', ''),
+            'description': cocktail_data.get('description', ''),
+            'ingredients': cocktail_data.get('ingredients', ''),
+        })
+    return cocktail_data
+
+
+def image_prompt_stage(context):
+    """Étape prompt image : démarre sur l'en-tête de la recette, sans attendre la fin"""
+    head = context['recipe_head']
+    return generate_cocktail_image_prompt(
+        head.get('name', ''),
+        head.get('ingredients', []),
+        head.get('description', '')
+    ) or ''
+
+
+def music_stage(context):
+    """Étape suggestions musicales"""
+    head = context['recipe_head']
+    return get_background_music_suggestions(f"{head.get('name', '')} {head.get('description', '')}")
+
+
+def save_stage(context):
+    """Étape d'enregistrement du cocktail en base de données"""
+    cocktail_data = context['recipe']
+    image_prompt = context['image_prompt']
+    
+    if context['recipe_head'].get('name') != cocktail_data.get('name'):
+        # Le fournisseur streamé a échoué après l'en-tête : le prompt vise un autre cocktail
+        image_prompt = generate_cocktail_image_prompt(
+            cocktail_data.get('name', ''),
+            cocktail_data.get('ingredients', []),
+            cocktail_data.get('description', '')
+        ) or ''
+    
+    cocktail = Cocktail.objects.create(
+        name=cocktail_data.get('name', 'Cocktail Sans Nom'),
+        description=cocktail_data.get('description', ''),
+        ingredients=cocktail_data.get('ingredients', ''),
+        musical_ambiance=cocktail_data.get('musical_ambiance', ''),
+        image_prompt=image_prompt,
+        user_request=context['user_request']
+    )
+    request_index.add(cocktail.id, cocktail.user_request)
+    index_cocktail_ingredients([cocktail])
+    cocktails_changed()
+    return cocktail
+
+
+# Pipeline cocktail + média : recette -> (prompt image, musique) -> enregistrement.
+# Le prompt image et la musique démarrent dès l'en-tête de la recette ;
+# la musique s'exécute en parallèle de l'enregistrement.
+media_pipeline = (
+    Pipeline()
+    .stage('recipe', recipe_stage, requires=['user_request'])
+    .stage('image_prompt', image_prompt_stage, requires=['recipe_head'])
+    .stage('music_suggestions', music_stage, requires=['recipe_head'])
+    .stage('cocktail', save_stage, requires=['recipe', 'image_prompt'])
+)
+
+
+def build_cocktail_with_media(user_request):
+    """
+    Pipeline complet d'un cocktail avec média : recette, prompt image,
+    suggestions musicales puis enregistrement en base
+    
+    Utilisé par la vue synchrone et par les tâches de génération en arrière-plan.
+    
+    Returns:
+        Données de la réponse (avec l'ID du cocktail créé et la durée de
+        chaque étape) ou None en cas d'échec
+    """
+    run = media_pipeline.run(user_request=user_request)
+    cocktail = run.values.get('cocktail')
+    
+    if cocktail is None:
+        return None
+    
+    # Réponse avec l'ID du cocktail créé
+    return {
+        'id': cocktail.id,
+        'name': cocktail.name,
+        'description': cocktail.description,
+        'ingredients': cocktail.ingredients,
+        'musical_ambiance': cocktail.musical_ambiance,
+        'image_prompt': cocktail.image_prompt,
+        'music_suggestions': run.values.get('music_suggestions'),
+        'user_request': cocktail.user_request,
+        'created_at': cocktail.created_at.isoformat(),
+        'is_favorite': False,
+        'stage_timings': run.timings
+    }
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def generate_cocktail_with_media(request):
@@ -386,76 +654,12 @@ def generate_cocktail_with_media(request):
         print(f"Parsed data: {data}")
         print(f"User request: '{user_request}'")
         
-        # Générer le cocktail de base
-        cocktail_data = None
-        
-        if OLLAMA_AVAILABLE:
-            try:
-                cocktail_data = generate_cocktail_with_ollama(user_request)
-                print("Cocktail généré avec Ollama")
-            except Exception as e:
-                print(f"Erreur Ollama: {e}")
-        
-        if not cocktail_data and OPENAI_AVAILABLE:
-            try:
-                cocktail_data = generate_cocktail_with_openai(user_request)
-                print("Cocktail généré avec OpenAI")
-            except Exception as e:
-                print(f"Erreur OpenAI: {e}")
-        
-        if not cocktail_data:
-            cocktail_data = generate_demo_cocktail(user_request)
-            print("Cocktail généré en mode démo")
-        
-        # Générer le prompt pour l'image
-        image_prompt = None
-        if cocktail_data:
-            image_prompt = generate_cocktail_image_prompt(
-                cocktail_data.get('name', ''),
-                cocktail_data.get('ingredients', []),
-                cocktail_data.get('description', '')
-            )
-        
-        # Générer les suggestions musicales
-        music_suggestions = None
-        if cocktail_data:
-            cocktail_style = f"{cocktail_data.get('name', '')} {cocktail_data.get('description', '')}"
-            music_suggestions = get_background_music_suggestions(cocktail_style)
-        
-        # Ajouter les nouvelles données au cocktail
-        if cocktail_data:
-            cocktail_data['image_prompt'] = image_prompt
-            cocktail_data['music_suggestions'] = music_suggestions
-            cocktail_data['user_request'] = user_request
-            
-            # Créer et sauvegarder le cocktail en base de données
-            cocktail = Cocktail.objects.create(
-                name=cocktail_data.get('name', 'Cocktail Sans Nom'),
-                description=cocktail_data.get('description', ''),
-                ingredients=cocktail_data.get('ingredients', ''),
-                musical_ambiance=cocktail_data.get('musical_ambiance', ''),
-                image_prompt=cocktail_data.get('image_prompt', ''),
-                user_request=user_request
-            )
-            
-            # Retourner la réponse avec l'ID du cocktail créé
-            response_data = {
-                'id': cocktail.id,
-                'name': cocktail.name,
-                'description': cocktail.description,
-                'ingredients': cocktail.ingredients,
-                'musical_ambiance': cocktail.musical_ambiance,
-                'image_prompt': cocktail.image_prompt,
-                'music_suggestions': music_suggestions,
-                'user_request': cocktail.user_request,
-                'created_at': cocktail.created_at.isoformat(),
-                'is_favorite': False
-            }
-            
+        response_data = build_cocktail_with_media(user_request)
+        if response_data:
             return JsonResponse(response_data)
         
         return JsonResponse({'error': 'Impossible de générer le cocktail'}, status=500)
-        
+    
     except json.JSONDecodeError:
         return JsonResponse({'error': 'JSON invalide'}, status=400)
     except Exception as e:
@@ -463,43 +667,385 @@ def generate_cocktail_with_media(request):
         return JsonResponse({'error': 'Erreur serveur'}, status=500)
 
 
+BATCH_MAX_ITEMS = getattr(settings, 'BATCH_MAX_ITEMS', 50)
+BATCH_CONCURRENCY = getattr(settings, 'BATCH_CONCURRENCY', 4)  # Générations simultanées par lot
+BATCH_CACHE_TIMEOUT = 3600
+BULK_MAX_IDS = getattr(settings, 'BULK_MAX_IDS', 10000)  # Identifiants par modification groupée
+
+
+def batch_cache_key(user_request):
+    """Clé de cache d'une demande libre (normalisée, voir cache_keys)"""
+    return make_cache_key('cocktail', user_request=user_request)
+
+
+def save_batch_results(user_requests, groups, results, saved):
+    """
+    Enregistre en un seul bulk_create les cocktails du lot qui n'ont pas
+    encore de ligne en base, puis met chaque résultat en cache avec son ID
+    
+    Args:
+        user_requests: Demandes du lot
+        groups: Clé de cache -> indices des demandes identiques
+        results: Clé de cache -> données du cocktail
+        saved: Clé de cache -> ID des cocktails déjà en base
+    
+    Returns:
+        Dictionnaire clé de cache -> ID du cocktail
+    """
+    keys = [key for key in groups if key in results and key not in saved]
+    cocktails = Cocktail.objects.bulk_create([
+        Cocktail(
+            name=results[key]['name'],
+            description=results[key]['description'],
+            ingredients=results[key]['ingredients'],
+            musical_ambiance=results[key]['musical_ambiance'],
+            image_prompt=results[key].get('image_prompt', ''),
+            user_request=user_requests[groups[key][0]]
+        )
+        for key in keys
+    ])
+    
+    index_cocktail_ingredients(cocktails)
+    if cocktails:
+        cocktails_changed()
+    
+    ids = dict(saved)
+    entries = {}
+    for key, cocktail in zip(keys, cocktails):
+        if cocktail.id is None:
+            continue
+        request_index.add(cocktail.id, cocktail.user_request)
+        ids[key] = cocktail.id
+        entries[key] = dict(results[key], id=cocktail.id)
+    if entries:
+        llm_cache.set_many(entries, BATCH_CACHE_TIMEOUT)
+    return ids
+
+
+def iter_batch_results(user_requests):
+    """
+    Génère un lot de cocktails et produit une ligne NDJSON par élément terminé
+    
+    Les demandes identiques (après normalisation) ne sont générées qu'une
+    fois, celles déjà en cache renvoient le cocktail déjà enregistré, et les
+    autres sont envoyées aux fournisseurs avec au plus BATCH_CONCURRENCY
+    appels simultanés. Les nouveaux cocktails sont enregistrés par un seul
+    bulk_create, dont les identifiants sont renvoyés dans la dernière ligne.
+    Si le client se déconnecte, les générations terminées sont tout de même
+    enregistrées ; celles qui n'ont pas démarré sont annulées.
+    """
+    # Regroupement des demandes identiques : clé -> indices dans le lot
+    groups = {}
+    for index, user_request in enumerate(user_requests):
+        groups.setdefault(batch_cache_key(user_request), []).append(index)
+    
+    # Résultats en cache : l'ID du cocktail enregistré est réutilisé s'il existe encore
+    cached = llm_cache.get_many(list(groups))
+    existing = set(Cocktail.objects.filter(
+        id__in=[cocktail_data.get('id') for cocktail_data in cached.values() if cocktail_data.get('id')]
+    ).values_list('id', flat=True))
+    saved = {key: cocktail_data['id'] for key, cocktail_data in cached.items() if cocktail_data.get('id') in existing}
+    
+    results = {}
+    for key, cocktail_data in cached.items():
+        if key not in saved:
+            cocktail_data = {field: value for field, value in cocktail_data.items() if field != 'id'}
+        results[key] = cocktail_data
+        for index in groups[key]:
+            yield json.dumps({
+                'index': index,
+                'status': 'ok',
+                'cached': True,
+                'cocktail': cocktail_data
+            }, ensure_ascii=False) + '\n'
+    
+    executor = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY, thread_name_prefix='batch-generation')
+    futures = {}
+    try:
+        futures = {
+            executor.submit(provider_registry.generate, user_requests[indices[0]]): key
+            for key, indices in groups.items() if key not in cached
+        }
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                cocktail_data, provider = future.result()
+            except Exception as e:
+                cocktail_data, provider, error = None, None, str(e)
+            else:
+                error = None if cocktail_data else 'Impossible de générer le cocktail'
+            
+            if cocktail_data:
+                results[key] = cocktail_data
+            for index in groups[key]:
+                line = {'index': index, 'status': 'ok' if cocktail_data else 'error', 'cached': False}
+                if cocktail_data:
+                    line.update({'provider': provider, 'cocktail': cocktail_data})
+                else:
+                    line['error'] = error
+                yield json.dumps(line, ensure_ascii=False) + '\n'
+    finally:
+        # Client déconnecté : les générations pas encore démarrées sont annulées
+        executor.shutdown(wait=False, cancel_futures=True)
+        # et celles déjà terminées sont enregistrées avec les autres
+        for future, key in futures.items():
+            if key not in results and future.done() and not future.cancelled() and future.exception() is None:
+                cocktail_data, _ = future.result()
+                if cocktail_data:
+                    results[key] = cocktail_data
+        ids = save_batch_results(user_requests, groups, results, saved)
+    
+    index_ids = {index: ids.get(key) for key, indices in groups.items() for index in indices}
+    yield json.dumps({
+        'status': 'done',
+        'ids': [index_ids[index] for index in range(len(user_requests))],
+        'generated': len(results) - len(cached),
+        'cached': len(cached),
+        'failed': len(groups) - len(results)
+    }) + '\n'
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def generate_cocktail_batch(request):
+    """
+    API endpoint pour générer plusieurs cocktails en un seul appel
+    
+    Corps : {"requests": ["demande 1", "demande 2", ...]}
+    Réponse : flux NDJSON, une ligne par élément dès qu'il est prêt
+    ({"index", "status", "cached", "cocktail"}), puis une ligne finale
+    {"status": "done", "ids": [...]} avec l'ID de chaque cocktail enregistré.
+    """
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'JSON invalide'}, status=400)
+    
+    if not isinstance(data, dict):
+        return JsonResponse({'error': 'Objet JSON attendu'}, status=400)
+    
+    user_requests = data.get('requests')
+    if not isinstance(user_requests, list) or not user_requests:
+        return JsonResponse({'error': 'Liste de demandes manquante'}, status=400)
+    if len(user_requests) > BATCH_MAX_ITEMS:
+        return JsonResponse({'error': f'Maximum {BATCH_MAX_ITEMS} demandes par lot'}, status=400)
+    
+    # Accepte des chaînes ou des objets {"user_request": ...}
+    user_requests = [
+        item.get('user_request', '') if isinstance(item, dict) else item
+        for item in user_requests
+    ]
+    if not all(isinstance(user_request, str) for user_request in user_requests):
+        return JsonResponse({'error': 'Chaque demande doit être une chaîne'}, status=400)
+    if not all(user_request.strip() for user_request in user_requests):
+        return JsonResponse({'error': 'Demande vide dans le lot'}, status=400)
+    
+    response = StreamingHttpResponse(iter_batch_results(user_requests), content_type='application/x-ndjson')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Pas de mise en tampon par nginx
+    return response
+
+
+@require_http_methods(["GET"])
+def api_search_cocktails(request):
+    """
+    API de recherche plein texte dans les cocktails
+    
+    Paramètres (query string) :
+    - q : mots recherchés dans le nom, la description, les ingrédients et la demande
+    - limit : nombre de résultats (défaut 20, maximum 50)
+    - fields : champs à renvoyer, comme pour /api/cocktails/
+    
+    Les résultats sont classés par pertinence ; chacun porte son score
+    (search_rank, None si la base n'a pas d'index plein texte).
+    """
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({'error': 'Paramètre q requis'}, status=400)
+    try:
+        fields = parse_fields_param(request.GET.get('fields'))
+        limit = int(request.GET.get('limit', API_COCKTAILS_DEFAULT_LIMIT))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+    
+    ranked = search_cocktails(query, limit)
+    cocktails = Cocktail.objects.only(*cocktail_columns(fields)).in_bulk([pk for pk, _ in ranked])
+    
+    results = []
+    for pk, rank in ranked:
+        if pk in cocktails:
+            data = cocktail_to_dict(cocktails[pk], fields)
+            data['search_rank'] = round(rank, 6) if rank is not None else None
+            results.append(data)
+    return JsonResponse(results, safe=False)
+
+
+@require_http_methods(["GET"])
+def api_pantry_cocktails(request):
+    """
+    API « qu'est-ce que je peux faire avec ce que j'ai »
+    
+    Paramètres (query string) :
+    - ingredients : ingrédients disponibles séparés par des virgules (gin,citron vert)
+    - limit : nombre de résultats (défaut 20, maximum 50)
+    - fields : champs à renvoyer, comme pour /api/cocktails/
+    
+    Les cocktails auxquels il manque le moins d'ingrédients viennent en
+    premier ; chacun porte le détail {matched, missing, score} dans pantry.
+    """
+    pantry = parse_pantry(request.GET.get('ingredients'))
+    if not pantry:
+        return JsonResponse({'error': 'Paramètre ingredients requis'}, status=400)
+    try:
+        fields = parse_fields_param(request.GET.get('fields'))
+        limit = int(request.GET.get('limit', API_COCKTAILS_DEFAULT_LIMIT))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+    
+    matches = pantry_matches(pantry, limit)
+    cocktails = Cocktail.objects.only(*cocktail_columns(fields)).in_bulk([match['cocktail_id'] for match in matches])
+    
+    results = []
+    for match in matches:
+        cocktail = cocktails.get(match.pop('cocktail_id'))
+        if cocktail is not None:
+            data = cocktail_to_dict(cocktail, fields)
+            data['pantry'] = match
+            results.append(data)
+    return JsonResponse(results, safe=False)
+
+
+@require_http_methods(["GET"])
+def api_similar_cocktails(request, cocktail_id):
+    """
+    API des cocktails aux ingrédients les plus proches d'un cocktail
+    
+    Paramètres (query string) :
+    - limit : nombre de résultats (défaut 10, maximum 50)
+    - fields : champs à renvoyer, comme pour /api/cocktails/
+    
+    Chaque résultat porte sa similarité cosinus (similarity, entre 0 et 1).
+    """
+    try:
+        fields = parse_fields_param(request.GET.get('fields'))
+        limit = int(request.GET.get('limit', SIMILAR_DEFAULT_LIMIT))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+    
+    if not Cocktail.objects.filter(id=cocktail_id).exists():
+        return JsonResponse({'error': 'Cocktail introuvable'}, status=404)
+    
+    # Marge pour les cocktails supprimés pendant la requête
+    ranked = similar_cocktails(cocktail_id, limit * 2)
+    cocktails = Cocktail.objects.only(*cocktail_columns(fields)).in_bulk([pk for pk, _ in ranked])
+    
+    results = []
+    for pk, similarity in ranked:
+        if pk in cocktails and len(results) < limit:
+            data = cocktail_to_dict(cocktails[pk], fields)
+            data['similarity'] = round(similarity, 4)
+            results.append(data)
+    return JsonResponse(results, safe=False)
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def toggle_favorite(request, cocktail_id):
-    """Toggle le statut favori d'un cocktail"""
+    """Toggle le statut favori d'un cocktail (un seul UPDATE, sans relecture préalable)"""
     try:
-        cocktail = get_object_or_404(Cocktail, id=cocktail_id)
-        cocktail.is_favorite = not cocktail.is_favorite
-        cocktail.save()
+        is_favorite = bulk.toggle_favorite(cocktail_id)
+        if is_favorite is None:
+            return JsonResponse({'error': 'Cocktail introuvable'}, status=404)
         
         return JsonResponse({
             'success': True,
-            'is_favorite': cocktail.is_favorite
+            'is_favorite': is_favorite
         })
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
 
+@csrf_exempt
+@require_http_methods(["POST"])
+def api_bulk_cocktails(request):
+    """
+    API de modification groupée des cocktails
+    
+    Corps : {"action": "favorite" | "unfavorite" | "delete", "ids": [1, 2, ...]}
+    Toutes les lignes sont traitées dans une seule transaction ; affected
+    compte les cocktails réellement modifiés ou supprimés (les identifiants
+    inconnus et les favoris déjà dans l'état demandé sont ignorés).
+    """
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'JSON invalide'}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({'error': 'Objet JSON attendu'}, status=400)
+    
+    action = data.get('action')
+    if action not in bulk.ACTIONS:
+        return JsonResponse({'error': f"Action inconnue (attendu: {', '.join(bulk.ACTIONS)})"}, status=400)
+    try:
+        ids = bulk.parse_ids(data.get('ids'), BULK_MAX_IDS)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    try:
+        affected = bulk.apply_action(action, ids)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+    
+    return JsonResponse({
+        'success': True,
+        'action': action,
+        'requested': len(ids),
+        'affected': affected
+    })
+
+
 @require_http_methods(["GET"])
+@http_cache
+@condition(etag_func=cocktails_etag)
 def api_cocktails(request):
-    """API pour récupérer la liste des cocktails"""
-    cocktails = Cocktail.objects.all()[:20]  # Limite à 20 résultats
-    
-    cocktails_data = []
-    for cocktail in cocktails:
-        cocktails_data.append({
-            'id': cocktail.id,
-            'name': cocktail.name,
-            'description': cocktail.description,
-            'ingredients': cocktail.ingredients,
-            'musical_ambiance': cocktail.musical_ambiance,
-            'image_prompt': cocktail.image_prompt,
-            'user_request': cocktail.user_request,
-            'is_favorite': cocktail.is_favorite,
-            'created_at': cocktail.created_at.isoformat()
-        })
+    """
+    API pour récupérer la liste des cocktails, du plus récent au plus ancien
+    
+    Paramètres (query string) :
+    - limit : nombre de cocktails (défaut 20, maximum 100)
+    - cursor : curseur de la page suivante (en-tête X-Next-Cursor de la page précédente)
+    - fields : champs à renvoyer, ex. fields=id,name,thumbnail_url,created_at
     
-    return JsonResponse(cocktails_data, safe=False)
+    La réponse reste une liste ; la page suivante est indiquée par les
+    en-têtes X-Next-Cursor et Link (rel="next"). L'ETag suit la version de
+    la collection : If-None-Match reçoit un 304 sans requête SQL tant
+    qu'aucun cocktail n'a été créé, modifié ou supprimé.
+    """
+    try:
+        fields = parse_fields_param(request.GET.get('fields'))
+        limit = int(request.GET.get('limit', API_COCKTAILS_DEFAULT_LIMIT))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    limit = max(1, min(limit, API_COCKTAILS_MAX_LIMIT))
+    
+    queryset = Cocktail.objects.only(*cocktail_columns(fields))
+    try:
+        cocktails, next_cursor = keyset_page(queryset, request.GET.get('cursor'), limit)
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    cocktails_data = [cocktail_to_dict(cocktail, fields) for cocktail in cocktails]
+    
+    response = JsonResponse(cocktails_data, safe=False)
+    if next_cursor:
+        query = request.GET.copy()
+        query['cursor'] = next_cursor
+        response['X-Next-Cursor'] = next_cursor
+        response['Link'] = f'<{request.path}?{query.urlencode()}>; rel="next"'
+    return response
 
 
 @csrf_exempt
@@ -507,8 +1053,127 @@ def api_cocktails(request):
 def delete_cocktail(request, cocktail_id):
     """API pour supprimer un cocktail"""
     try:
-        cocktail = get_object_or_404(Cocktail, id=cocktail_id)
-        cocktail.delete()
+        if not bulk.delete_cocktails([cocktail_id]):
+            return JsonResponse({'success': False, 'error': 'Cocktail introuvable'}, status=404)
         return JsonResponse({'success': True, 'message': 'Cocktail supprimé avec succès'})
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@require_http_methods(["GET"])
+def cocktail_image(request, digest):
+    """
+    Sert une image générée ; son URL dépend de son contenu, elle est donc immuable
+    
+    Paramètres optionnels :
+    - size : déclinaison réduite (thumb, card... voir IMAGE_VARIANT_SIZES)
+    - format : avif, webp ou png ; sans format, le plus léger accepté par le navigateur
+    """
+    size = request.GET.get('size')
+    fmt = request.GET.get('format')
+    negotiated = False
+    
+    if size and not PIL_AVAILABLE:
+        size = None  # Sans Pillow, seule l'image d'origine est disponible
+    if size:
+        if not fmt:
+            fmt = negotiate_format(request.headers.get('Accept', ''))
+            negotiated = True
+        if not variant_renderer.is_valid(size, fmt):
+            return JsonResponse({'error': 'Taille ou format d\'image inconnu'}, status=400)
+        etag = f'"{digest}-{size}.{fmt}"'
+    else:
+        etag = f'"{digest}"'
+    
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        image = variant_renderer.open(digest, size, fmt) if size else open_image(digest)
+        if image is None:
+            raise Http404("Image introuvable")
+        content_type = VARIANT_FORMATS[fmt][1] if size else 'image/png'
+        response = FileResponse(image, content_type=content_type)
+    response['ETag'] = etag
+    response['Cache-Control'] = IMAGE_CACHE_CONTROL
+    if negotiated:
+        response['Vary'] = 'Accept'
+    return response
+
+
+@require_http_methods(["GET"])
+def api_providers(request):
+    """API pour inspecter le classement courant des fournisseurs de génération"""
+    return JsonResponse({'providers': provider_registry.ranking()})
+
+
+@require_http_methods(["GET"])
+def api_cache_stats(request):
+    """API pour inspecter les taux de succès du cache des résultats IA (processus courant)"""
+    stats = llm_cache.stats() if hasattr(llm_cache, 'stats') else {}
+    return JsonResponse({'cache': stats})
+
+
+def job_long_poll_timeout(request):
+    """Durée d'attente demandée pour un long-poll, bornée par JOB_LONG_POLL_TIMEOUT"""
+    maximum = getattr(settings, 'JOB_LONG_POLL_TIMEOUT', 30)
+    try:
+        return max(0.0, min(float(request.GET.get('timeout', maximum)), maximum))
+    except ValueError:
+        return maximum
+
+
+def job_response(job):
+    """Réponse de suivi d'une tâche (les tâches interrompues sont reprises au démarrage, voir ensure_started)"""
+    if job is None:
+        return JsonResponse({'error': 'Tâche introuvable'}, status=404)
+    return JsonResponse(job.to_dict())
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def api_create_job(request):
+    """
+    API pour lancer une génération de cocktail avec média en arrière-plan
+    
+    Répond immédiatement (202) avec l'identifiant de la tâche ; le résultat
+    s'obtient via api/jobs/<id>/ (polling) ou api/jobs/<id>/wait/ (long-poll).
+    """
+    try:
+        data = json.loads(request.body)
+        user_request = data.get('user_request', '')
+        
+        if not user_request:
+            return JsonResponse({'error': 'Requête utilisateur manquante'}, status=400)
+        
+        job = job_pool.enqueue('cocktail_with_media', {'user_request': user_request})
+        return JsonResponse({
+            'job_id': str(job.id),
+            'status': job.status,
+            'status_url': reverse('cocktails:api_job_status', args=[job.id]),
+            'wait_url': reverse('cocktails:api_job_wait', args=[job.id]),
+        }, status=202)
+    
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'JSON invalide'}, status=400)
+    except Exception as e:
+        print(f"Erreur inattendue: {e}")
+        return JsonResponse({'error': 'Erreur serveur'}, status=500)
+
+
+@require_http_methods(["GET"])
+def api_job_status(request, job_id):
+    """API pour consulter l'état d'une tâche de génération"""
+    return job_response(GenerationJob.objects.filter(id=job_id).first())
+
+
+@require_http_methods(["GET"])
+def api_job_wait(request, job_id):
+    """
+    API long-poll : attend la fin de la tâche (au plus ?timeout= secondes)
+    
+    Sous WSGI, l'attente occupe un worker du serveur : JOB_LONG_POLL_TIMEOUT
+    vaut 0 par défaut et la vue répond aussitôt avec l'état courant (le
+    client interroge à nouveau). Le long-poll sans thread bloqué est servi
+    par views_async.api_job_wait (ASGI, ASYNC_VIEWS=True).
+    """
+    return job_response(wait_for_job(job_id, job_long_poll_timeout(request)))
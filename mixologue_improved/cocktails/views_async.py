@@ -0,0 +1,408 @@
+# -*- coding: utf-8 -*-
+"""
+Variantes asyncio des vues de génération
+Ce module est utilisé à la place de views/views_ollama lorsque l'application
+est servie par asgi.py avec ASYNC_VIEWS=True : les appels à Ollama, OpenAI et
+Stable Diffusion ne bloquent plus un thread par requête en cours.
+"""
+
+import asyncio
+import json
+import logging
+import weakref
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from django.utils.decorators import method_decorator
+from django.views import View
+from .models import Cocktail, GenerationJob
+from .health import health_monitor
+from .ingredients import index_cocktail_ingredients
+from .ollama_service import async_ollama_service, get_async_http_client
+from .residency import keep_alive_for
+from .similarity import get_similarity_threshold, request_index
+from .streaming import format_sse
+from .versions import cocktails_changed
+from . import views
+from .views_ollama import (
+    get_stable_diffusion_url,
+    aunavailable_response,
+    parse_recipe_params,
+    parse_image_params,
+    build_fallback_image_prompt,
+    build_generation_params,
+    read_stream_params,
+    event_stream_response,
+    streamed_recipe_payload,
+    recipe_response,
+    parse_refinement_params,
+    generation_not_found_response,
+    refinement_response,
+    parse_image_options,
+    cached_image_response,
+    image_response,
+    suggestions_response,
+)
+
+logger = logging.getLogger(__name__)
+
+# Un client ollama.AsyncClient et un client AsyncOpenAI par boucle
+# d'événements (voir get_async_http_client)
+_ollama_clients = weakref.WeakKeyDictionary()
+_openai_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_ollama_client():
+    """Retourne le client Ollama asynchrone de la boucle courante."""
+    loop = asyncio.get_running_loop()
+    client = _ollama_clients.get(loop)
+    
+    if client is None:
+        client = views.ollama.AsyncClient()
+        _ollama_clients[loop] = client
+    return client
+
+
+def get_async_openai_client():
+    """Retourne le client OpenAI asynchrone de la boucle courante."""
+    from openai import AsyncOpenAI
+    loop = asyncio.get_running_loop()
+    client = _openai_clients.get(loop)
+    
+    if client is None or client.is_closed():
+        client = AsyncOpenAI(api_key=views.openai.api_key)
+        _openai_clients[loop] = client
+    return client
+
+
+async def generate_cocktail_with_ollama(user_request, on_field=None):
+    """Version asynchrone de views.generate_cocktail_with_ollama"""
+    response = await get_async_ollama_client().chat(
+        model=views.OLLAMA_COCKTAIL_MODEL,
+        messages=views.build_ollama_cocktail_messages(user_request),
+        options=views.OLLAMA_COCKTAIL_OPTIONS,
+        keep_alive=keep_alive_for(views.OLLAMA_COCKTAIL_MODEL)
+    )
+    return views.parse_ollama_cocktail(response['message']['content'])
+
+
+async def generate_cocktail_with_openai(user_request, on_field=None):
+    """Version asynchrone de views.generate_cocktail_with_openai"""
+    response = await get_async_openai_client().chat.completions.create(
+        model=views.OPENAI_COCKTAIL_MODEL,
+        messages=views.build_openai_cocktail_messages(user_request),
+        max_tokens=500,
+        temperature=0.8
+    )
+    return views.parse_openai_cocktail(response.choices[0].message.content)
+
+
+views.provider_registry.register_async('ollama', generate_cocktail_with_ollama)
+views.provider_registry.register_async('openai', generate_cocktail_with_openai)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+async def generate_cocktail(request):
+    """Version asynchrone de views.generate_cocktail"""
+    try:
+        data = json.loads(request.body)
+        user_request = data.get('user_request', '')
+        
+        if not user_request:
+            return JsonResponse({'error': 'Aucune demande fournie'}, status=400)
+        
+        threshold = get_similarity_threshold(data)
+        score = None
+        if threshold is not None:
+            similar, score = await sync_to_async(views.find_similar_cocktail)(user_request, threshold)
+            if similar:
+                print(f"Cocktail {similar.id} réutilisé (similarité {score:.3f})")
+                return JsonResponse(views.similarity_payload(similar, score, reused=True))
+        
+        cocktail_data, provider = await views.provider_registry.agenerate(user_request)
+        print(f"Cocktail généré avec {provider}")
+        
+        cocktail = await Cocktail.objects.acreate(
+            name=cocktail_data['name'],
+            description=cocktail_data['description'],
+            ingredients=cocktail_data['ingredients'],
+            musical_ambiance=cocktail_data['musical_ambiance'],
+            image_prompt=cocktail_data.get('image_prompt', ''),
+            user_request=user_request
+        )
+        request_index.add(cocktail.id, user_request)
+        await sync_to_async(index_cocktail_ingredients)([cocktail])
+        await sync_to_async(cocktails_changed)()
+        
+        if threshold is not None:
+            return JsonResponse(views.similarity_payload(cocktail, score, reused=False))
+        return JsonResponse(views.cocktail_to_dict(cocktail))
+    
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class GenerateCocktailView(View):
+    """
+    Version asynchrone de views_ollama.GenerateCocktailView.
+    """
+    
+    async def post(self, request):
+        try:
+            data = json.loads(request.body)
+            params, error = parse_recipe_params(data)
+            if error:
+                return error
+            
+            unavailable = await aunavailable_response('ollama')
+            if unavailable:
+                return unavailable
+            
+            recipe = await async_ollama_service.generate_cocktail_recipe(**params)
+            
+            if not recipe:
+                return JsonResponse({
+                    'error': 'Impossible de générer la recette',
+                    'code': 'GENERATION_FAILED'
+                }, status=500)
+            
+            generation_id = async_ollama_service.recipe_generation_id(**params)
+            return recipe_response(request, recipe, async_ollama_service.model, generation_id)
+        
+        except json.JSONDecodeError:
+            return JsonResponse({
+                'error': 'Format JSON invalide',
+                'code': 'INVALID_JSON'
+            }, status=400)
+        
+        except Exception as e:
+            logger.error(f"Erreur lors de la génération de recette: {e}")
+            return JsonResponse({
+                'error': 'Erreur interne du serveur',
+                'code': 'INTERNAL_ERROR'
+            }, status=500)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class StreamCocktailView(View):
+    """
+    Version asynchrone de views_ollama.StreamCocktailView.
+    """
+    
+    async def get(self, request):
+        return await self.post(request)
+    
+    async def post(self, request):
+        try:
+            params, error = read_stream_params(request)
+        except json.JSONDecodeError:
+            return JsonResponse({
+                'error': 'Format JSON invalide',
+                'code': 'INVALID_JSON'
+            }, status=400)
+        if error:
+            return error
+        
+        unavailable = await aunavailable_response('ollama')
+        if unavailable:
+            return unavailable
+        
+        generation_id = async_ollama_service.recipe_generation_id(**params)
+        
+        async def events():
+            async for event, payload in async_ollama_service.stream_cocktail_recipe(**params):
+                if event == 'recipe':
+                    payload = streamed_recipe_payload(payload, async_ollama_service.model, generation_id)
+                yield format_sse(event, payload)
+            yield format_sse('done', {})
+        
+        return event_stream_response(events())
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class RefineCocktailView(View):
+    """
+    Version asynchrone de views_ollama.RefineCocktailView.
+    """
+    
+    async def post(self, request):
+        try:
+            data = json.loads(request.body)
+            params, error = parse_refinement_params(data)
+            if error:
+                return error
+            
+            if await async_ollama_service.get_generation(params['generation_id']) is None:
+                return generation_not_found_response()
+            
+            unavailable = await aunavailable_response('ollama')
+            if unavailable:
+                return unavailable
+            
+            result = await async_ollama_service.refine_cocktail_recipe(**params)
+            
+            if not result:
+                return JsonResponse({
+                    'error': 'Impossible d\'affiner la recette',
+                    'code': 'REFINEMENT_FAILED'
+                }, status=500)
+            
+            return refinement_response(request, result, async_ollama_service.model)
+        
+        except json.JSONDecodeError:
+            return JsonResponse({
+                'error': 'Format JSON invalide',
+                'code': 'INVALID_JSON'
+            }, status=400)
+        
+        except Exception as e:
+            logger.error(f"Erreur lors de l'affinage de recette: {e}")
+            return JsonResponse({
+                'error': 'Erreur interne du serveur',
+                'code': 'INTERNAL_ERROR'
+            }, status=500)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class GenerateCocktailImageView(View):
+    """
+    Version asynchrone de views_ollama.GenerateCocktailImageView.
+    """
+    
+    async def post(self, request):
+        try:
+            client = get_async_http_client()
+            
+            data = json.loads(request.body)
+            params, error = parse_image_params(data)
+            if error:
+                return error
+            options, error = parse_image_options(data)
+            if error:
+                return error
+            
+            unavailable = None if options['reproducible'] else await aunavailable_response('stable_diffusion')
+            if unavailable:
+                return unavailable
+            
+            prompt = (
+                await async_ollama_service.generate_image_prompt(**params, reproducible=options['reproducible'])
+                or build_fallback_image_prompt(**params)
+            )
+            generation_params = build_generation_params(prompt, options['reproducible'])
+            
+            cached = await sync_to_async(cached_image_response)(
+                generation_params, prompt, params['cocktail_name'], **options
+            )
+            if cached:
+                return cached
+            
+            unavailable = await aunavailable_response('stable_diffusion')
+            if unavailable:
+                return unavailable
+            
+            sd_response = await client.post(
+                f"{get_stable_diffusion_url()}/sdapi/v1/txt2img",
+                json=generation_params,
+                timeout=120
+            )
+            
+            if sd_response.status_code >= 500:
+                await health_monitor.arecord_failure('stable_diffusion', f"HTTP {sd_response.status_code}")
+            else:
+                await health_monitor.arecord_success('stable_diffusion')
+            
+            if sd_response.status_code != 200:
+                logger.error(f"Erreur Stable Diffusion: {sd_response.text}")
+                return JsonResponse({
+                    'error': 'Erreur lors de la génération de l\'image',
+                    'code': 'GENERATION_FAILED'
+                }, status=500)
+            
+            # Écriture du fichier et rattachement au cocktail : E/S synchrones
+            return await sync_to_async(image_response)(
+                sd_response.json(), prompt, generation_params, params['cocktail_name'],
+                **options
+            )
+        
+        except json.JSONDecodeError:
+            return JsonResponse({
+                'error': 'Format JSON invalide',
+                'code': 'INVALID_JSON'
+            }, status=400)
+        
+        except httpx.HTTPError as e:
+            logger.error(f"Erreur de connexion Stable Diffusion: {str(e)}")
+            await health_monitor.arecord_failure('stable_diffusion', str(e))
+            return JsonResponse({
+                'error': 'Service Stable Diffusion non accessible',
+                'code': 'SD_CONNECTION_ERROR'
+            }, status=503)
+        
+        except Exception as e:
+            logger.error(f"Erreur lors de la génération d'image: {e}")
+            return JsonResponse({
+                'error': 'Erreur interne du serveur',
+                'code': 'INTERNAL_ERROR'
+            }, status=500)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class CocktailSuggestionsView(View):
+    """
+    Version asynchrone de views_ollama.CocktailSuggestionsView.
+    """
+    
+    async def post(self, request):
+        try:
+            data = json.loads(request.body)
+            
+            mood = data.get('mood', 'détendu')
+            occasion = data.get('occasion', 'apéritif')
+            
+            unavailable = await aunavailable_response('ollama')
+            if unavailable:
+                return unavailable
+            
+            suggestions = await async_ollama_service.get_cocktail_suggestions(mood, occasion)
+            
+            if not suggestions:
+                return JsonResponse({
+                    'error': 'Impossible de générer des suggestions',
+                    'code': 'SUGGESTIONS_FAILED'
+                }, status=500)
+            
+            return suggestions_response(suggestions, mood, occasion, async_ollama_service.model)
+        
+        except json.JSONDecodeError:
+            return JsonResponse({
+                'error': 'Format JSON invalide',
+                'code': 'INVALID_JSON'
+            }, status=400)
+        
+        except Exception as e:
+            logger.error(f"Erreur lors de la génération de suggestions: {e}")
+            return JsonResponse({
+                'error': 'Erreur interne du serveur',
+                'code': 'INTERNAL_ERROR'
+            }, status=500)
+
+
+@require_http_methods(["GET"])
+async def api_job_wait(request, job_id):
+    """
+    Version asynchrone de views.api_job_wait : l'attente ne bloque pas de thread.
+    """
+    poll_interval = getattr(settings, 'JOB_POLL_INTERVAL', 0.5)
+    deadline = asyncio.get_running_loop().time() + views.job_long_poll_timeout(request)
+    
+    while True:
+        job = await GenerationJob.objects.filter(id=job_id).afirst()
+        if job is None or job.is_finished or asyncio.get_running_loop().time() >= deadline:
+            return views.job_response(job)
+        await asyncio.sleep(poll_interval)
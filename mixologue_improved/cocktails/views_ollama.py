@@ -5,19 +5,402 @@ Ce module contient les vues qui intègrent l'IA locale Ollama.
 """
 
 import base64
+import hashlib
 import json
 import logging
-from django.http import JsonResponse
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import condition, require_http_methods
 from django.utils.decorators import method_decorator
 from django.views import View
-from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
+from .cache_keys import make_cache_key
+from .health import health_monitor
+from .image_store import (
+    find_cached_image,
+    image_url,
+    read_image_base64,
+    remember_image,
+    reproducible_seed,
+    save_image,
+)
+from .image_variants import variant_renderer
+from .models import Cocktail
 from .ollama_service import ollama_service
+from .residency import model_residency
+from .streaming import format_sse
+from .versions import OLLAMA_MODELS, cocktails_changed, get_version, http_cache
 
 logger = logging.getLogger(__name__)
 
+# Liste des modèles : appels à /api/tags et /api/ps mutualisés entre les requêtes
+OLLAMA_MODELS_CACHE_TIMEOUT = getattr(settings, 'OLLAMA_MODELS_CACHE_TIMEOUT', 30)
+
+NEGATIVE_PROMPT = "blurry, low quality, distorted, ugly, bad anatomy, extra limbs, text, watermark, signature"
+
+
+UNAVAILABLE_ERRORS = {
+    'ollama': ('Service Ollama indisponible', 'OLLAMA_UNAVAILABLE'),
+    'stable_diffusion': ('Service Stable Diffusion non disponible', 'SD_UNAVAILABLE'),
+}
+
+
+def unavailable_response(dependency):
+    """
+    Vérifie le disjoncteur d'une dépendance sans sonde en direct.
+    
+    Returns:
+        Réponse 503 si le disjoncteur est ouvert, None sinon
+    """
+    if health_monitor.allow_request(dependency):
+        return None
+    
+    error, code = UNAVAILABLE_ERRORS[dependency]
+    response = JsonResponse({'error': error, 'code': code}, status=503)
+    response['Retry-After'] = str(health_monitor.retry_after(dependency))
+    return response
+
+
+async def aunavailable_response(dependency):
+    """Version asynchrone de unavailable_response (cache lu hors de la boucle d'événements)."""
+    return await sync_to_async(unavailable_response)(dependency)
+
+
+def get_stable_diffusion_url():
+    """URL de base de l'API Stable Diffusion."""
+    return getattr(settings, 'STABLE_DIFFUSION_URL', 'http://localhost:7860')
+
+
+def parse_recipe_params(data):
+    """
+    Valide les paramètres d'une demande de recette.
+    
+    Returns:
+        Tuple (paramètres, réponse d'erreur) : l'un des deux vaut None
+    """
+    ingredients = data.get('ingredients', [])
+    
+    if not ingredients:
+        return None, JsonResponse({
+            'error': 'Au moins un ingrédient est requis',
+            'code': 'MISSING_INGREDIENTS'
+        }, status=400)
+    
+    if not isinstance(ingredients, list):
+        return None, JsonResponse({
+            'error': 'Les ingrédients doivent être fournis sous forme de liste',
+            'code': 'INVALID_INGREDIENTS_FORMAT'
+        }, status=400)
+    
+    return {
+        'ingredients': ingredients,
+        'style': data.get('style', 'classique'),
+        'difficulty': data.get('difficulty', 'facile'),
+    }, None
+
+
+def parse_image_params(data):
+    """
+    Valide les paramètres d'une demande d'image.
+    
+    Returns:
+        Tuple (paramètres, réponse d'erreur) : l'un des deux vaut None
+    """
+    cocktail_name = data.get('cocktail_name', '')
+    ingredients = data.get('ingredients', [])
+    
+    if not cocktail_name and not ingredients:
+        return None, JsonResponse({
+            'error': 'Nom du cocktail ou ingrédients requis',
+            'code': 'MISSING_PARAMETERS'
+        }, status=400)
+    
+    if isinstance(ingredients, list):
+        ingredients_list = ingredients
+    else:
+        ingredients_list = [str(ingredients)] if ingredients else []
+    
+    return {
+        'cocktail_name': cocktail_name,
+        'ingredients': ingredients_list,
+        'style': data.get('style', 'realistic'),
+        'glass_type': data.get('glass_type', 'cocktail glass'),
+        'garnish': data.get('garnish', ''),
+    }, None
+
+
+def build_fallback_image_prompt(cocktail_name, ingredients, style, glass_type, garnish):
+    """Construit un prompt Stable Diffusion sans Ollama."""
+    ingredients_str = ', '.join(ingredients)
+    prompt_parts = [
+        f"A beautiful {style} photograph of a {cocktail_name} cocktail" if cocktail_name else f"A beautiful {style} cocktail",
+        f"served in a {glass_type}",
+        f"made with {ingredients_str}" if ingredients_str else "",
+        f"garnished with {garnish}" if garnish else "",
+        "professional food photography, high quality, detailed, appetizing, well-lit, clean background"
+    ]
+    return ' '.join(filter(None, prompt_parts))
+
+
+def build_generation_params(prompt, reproducible=False):
+    """
+    Paramètres de génération txt2img pour Stable Diffusion.
+    
+    En mode reproductible, la graine est dérivée du prompt et des autres
+    paramètres au lieu d'être tirée au hasard (-1).
+    """
+    params = {
+        "prompt": prompt,
+        "negative_prompt": NEGATIVE_PROMPT,
+        "steps": 30,
+        "cfg_scale": 7.5,
+        "width": 512,
+        "height": 512,
+        "sampler_name": "Euler a",
+        "batch_size": 1,
+        "n_iter": 1,
+        "seed": -1
+    }
+    if reproducible:
+        params["seed"] = reproducible_seed(params)
+    return params
+
+
+def read_stream_params(request):
+    """
+    Lit les paramètres d'une génération streamée.
+    
+    Accepte un corps JSON (POST) ou la query string (GET, pour EventSource) :
+    ?ingredients=vodka&ingredients=citron vert&style=moderne
+    """
+    if request.method == 'GET':
+        ingredients = request.GET.getlist('ingredients')
+        if len(ingredients) == 1 and ',' in ingredients[0]:
+            ingredients = [i.strip() for i in ingredients[0].split(',') if i.strip()]
+        data = {
+            'ingredients': ingredients,
+            'style': request.GET.get('style', 'classique'),
+            'difficulty': request.GET.get('difficulty', 'facile'),
+        }
+    else:
+        data = json.loads(request.body)
+    return parse_recipe_params(data)
+
+
+def event_stream_response(events):
+    """Enveloppe un flux d'événements SSE dans une réponse non bufferisée."""
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Désactive le buffering nginx
+    return response
+
+
+def streamed_recipe_payload(payload, model, generation_id=None):
+    """Ajoute les métadonnées de génération à la recette finale d'un flux."""
+    return dict(payload, generated_by='Ollama', model_used=model, generation_id=generation_id)
+
+
+def recipe_response(request, recipe, model, generation_id=None, **extra):
+    """Ajoute les métadonnées de génération et construit la réponse JSON."""
+    recipe['generated_by'] = 'Ollama'
+    recipe['model_used'] = model
+    recipe['generation_timestamp'] = request.META.get('HTTP_X_FORWARDED_FOR', 
+                                                    request.META.get('REMOTE_ADDR'))
+    
+    logger.info(f"Recette générée avec succès: {recipe.get('nom', 'Sans nom')}")
+    
+    return JsonResponse({
+        'success': True,
+        'recipe': recipe,
+        'generation_id': generation_id,
+        **extra
+    })
+
+
+def parse_refinement_params(data):
+    """
+    Valide les paramètres d'une demande d'affinage.
+    
+    Returns:
+        Tuple (paramètres, réponse d'erreur) : l'un des deux vaut None
+    """
+    generation_id = str(data.get('generation_id', '')).strip()
+    instruction = str(data.get('instruction', '')).strip()
+    
+    if not generation_id or not instruction:
+        return None, JsonResponse({
+            'error': 'generation_id et instruction sont requis',
+            'code': 'MISSING_PARAMETERS'
+        }, status=400)
+    
+    return {'generation_id': generation_id, 'instruction': instruction}, None
+
+
+def generation_not_found_response():
+    """Réponse 404 pour une génération inconnue ou expirée."""
+    return JsonResponse({
+        'error': 'Génération inconnue ou expirée',
+        'code': 'GENERATION_NOT_FOUND'
+    }, status=404)
+
+
+def refinement_response(request, result, model):
+    """Construit la réponse JSON d'un affinage (recette, lignée et mesures Ollama)."""
+    return recipe_response(
+        request, result['recipe'], model, result['generation_id'],
+        parent_id=result['parent_id'],
+        metrics=result['metrics']
+    )
+
+
+BOOLEAN_VALUES = {'true': True, '1': True, 'yes': True, 'false': False, '0': False, 'no': False}
+
+
+def parse_boolean(value):
+    """
+    Booléen reçu en JSON : true/false, 0/1 ou chaîne ("false" vaut False).
+    
+    Raises:
+        ValueError: Si la valeur n'est pas un booléen reconnu
+    """
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str) and value.strip().lower() in BOOLEAN_VALUES:
+        return BOOLEAN_VALUES[value.strip().lower()]
+    raise ValueError(value)
+
+
+def parse_image_options(data):
+    """
+    Valide les options de stockage d'une image générée, avant toute génération.
+    
+    - cocktail_id : cocktail auquel rattacher l'image (entier, optionnel)
+    - include_base64 : renvoyer aussi l'image encodée dans le JSON (ancien format)
+    - reproducible : graine fixée par le prompt et image servie depuis le cache
+      si elle a déjà été générée (défaut: IMAGE_REPRODUCIBLE_DEFAULT)
+    
+    Returns:
+        Tuple (options, réponse d'erreur) : l'un des deux vaut None
+    """
+    cocktail_id = data.get('cocktail_id')
+    if cocktail_id in (None, ''):
+        cocktail_id = None
+    elif isinstance(cocktail_id, bool) or not str(cocktail_id).strip().isdigit():
+        return None, JsonResponse({
+            'error': 'cocktail_id doit être un entier',
+            'code': 'INVALID_COCKTAIL_ID'
+        }, status=400)
+    else:
+        cocktail_id = int(str(cocktail_id).strip())
+    
+    options = {'cocktail_id': cocktail_id}
+    defaults = {
+        'include_base64': False,
+        'reproducible': getattr(settings, 'IMAGE_REPRODUCIBLE_DEFAULT', False),
+    }
+    for name, default in defaults.items():
+        try:
+            options[name] = parse_boolean(data.get(name, default))
+        except ValueError:
+            return None, JsonResponse({
+                'error': f'{name} doit être un booléen',
+                'code': 'INVALID_PARAMETERS'
+            }, status=400)
+    return options, None
+
+
+def stored_image_response(image_hash, prompt, generation_params, cocktail_name, cocktail_id=None,
+                          include_base64=False, cache_hit=False, image_base64=None):
+    """
+    Construit la réponse JSON d'une image stockée et la rattache au cocktail demandé.
+    
+    L'image est désignée par une URL stable (mise en cache longue durée)
+    plutôt que renvoyée en base64 dans le JSON.
+    """
+    linked = False
+    if cocktail_id:
+        linked = Cocktail.objects.filter(id=cocktail_id).update(image_hash=image_hash) > 0
+        if linked:
+            cocktails_changed([cocktail_id])
+        else:
+            logger.warning(f"Cocktail {cocktail_id} introuvable, image non rattachée")
+    
+    payload = {
+        'success': True,
+        'image_url': image_url(image_hash),
+        'image_hash': image_hash,
+        'cocktail_id': cocktail_id if linked else None,
+        'prompt_used': prompt,
+        'parameters': generation_params,
+        'cache_hit': cache_hit,
+        'generated_by': 'Stable Diffusion'
+    }
+    if include_base64:
+        payload['image_base64'] = image_base64 or read_image_base64(image_hash)
+    return JsonResponse(payload)
+
+
+def cached_image_response(generation_params, prompt, cocktail_name, cocktail_id=None,
+                          include_base64=False, reproducible=False):
+    """
+    Réponse servie depuis le cache d'images reproductibles.
+    
+    Returns:
+        Réponse JSON (cache_hit: true), ou None s'il faut appeler Stable Diffusion
+    """
+    if not reproducible:
+        return None
+    image_hash = find_cached_image(generation_params)
+    if image_hash is None:
+        return None
+    
+    logger.info(f"Image trouvée dans le cache pour: {cocktail_name or 'cocktail personnalisé'}")
+    return stored_image_response(image_hash, prompt, generation_params, cocktail_name,
+                                 cocktail_id, include_base64, cache_hit=True)
+
+
+def image_response(result, prompt, generation_params, cocktail_name, cocktail_id=None,
+                   include_base64=False, reproducible=False):
+    """Enregistre l'image générée par Stable Diffusion et construit la réponse JSON."""
+    # Récupérer la première image générée
+    if result.get('images') and len(result['images']) > 0:
+        image_base64 = result['images'][0]
+        image_hash = save_image(image_base64)
+        variant_renderer.schedule(image_hash)  # Miniatures préparées hors de la requête
+        if reproducible:
+            remember_image(generation_params, image_hash)
+        
+        logger.info(f"Image générée avec succès pour: {cocktail_name or 'cocktail personnalisé'}")
+        
+        return stored_image_response(image_hash, prompt, generation_params, cocktail_name,
+                                     cocktail_id, include_base64, image_base64=image_base64)
+    
+    return JsonResponse({
+        'error': 'Aucune image générée',
+        'code': 'NO_IMAGE_GENERATED'
+    }, status=500)
+
+
+def suggestions_response(suggestions, mood, occasion, model):
+    """Construit la réponse JSON des suggestions."""
+    logger.info(f"Suggestions générées pour humeur: {mood}, occasion: {occasion}")
+    
+    return JsonResponse({
+        'success': True,
+        'suggestions': suggestions,
+        'parameters': {
+            'mood': mood,
+            'occasion': occasion
+        },
+        'generated_by': 'Ollama',
+        'model_used': model
+    })
+
 
 class OllamaHealthView(View):
     """
@@ -26,17 +409,30 @@ class OllamaHealthView(View):
     
     def get(self, request):
         """
-        Vérifie si Ollama est disponible et fonctionnel.
+        Retourne l'état des dépendances IA connu du moniteur de santé.
+        
+        Aucune sonde n'est faite en direct : l'état (disponibilité, dernière
+        latence, disjoncteur) provient des sondes d'arrière-plan partagées.
         """
-        is_available = ollama_service.is_available()
+        dependencies = health_monitor.report()
+        ollama_state = dependencies['ollama']
+        is_available = bool(ollama_state['available']) and ollama_state['breaker'] != 'open'
+        
+        if ollama_state['available'] is None:
+            status = 'unknown'
+        else:
+            status = 'healthy' if is_available else 'unavailable'
         
         return JsonResponse({
-            'status': 'healthy' if is_available else 'unavailable',
+            'status': status,
             'service': 'Ollama',
             'available': is_available,
+            'latency_ms': ollama_state['latency_ms'],
+            'breaker': ollama_state['breaker'],
             'base_url': ollama_service.base_url,
             'model': ollama_service.model,
-            'prompt_model': ollama_service.prompt_model
+            'prompt_model': ollama_service.prompt_model,
+            'dependencies': dependencies
         })
 
 
@@ -56,40 +452,19 @@ class GenerateCocktailView(View):
         - difficulty: Niveau de difficulté (optionnel, défaut: "facile")
         """
         try:
-            # Parser les données JSON
+            # Parser et valider les données JSON
             data = json.loads(request.body)
+            params, error = parse_recipe_params(data)
+            if error:
+                return error
             
-            # Extraire les paramètres
-            ingredients = data.get('ingredients', [])
-            style = data.get('style', 'classique')
-            difficulty = data.get('difficulty', 'facile')
-            
-            # Validation des paramètres
-            if not ingredients:
-                return JsonResponse({
-                    'error': 'Au moins un ingrédient est requis',
-                    'code': 'MISSING_INGREDIENTS'
-                }, status=400)
-            
-            if not isinstance(ingredients, list):
-                return JsonResponse({
-                    'error': 'Les ingrédients doivent être fournis sous forme de liste',
-                    'code': 'INVALID_INGREDIENTS_FORMAT'
-                }, status=400)
-            
-            # Vérifier la disponibilité d'Ollama
-            if not ollama_service.is_available():
-                return JsonResponse({
-                    'error': 'Service Ollama indisponible',
-                    'code': 'OLLAMA_UNAVAILABLE'
-                }, status=503)
+            # Échouer immédiatement si le disjoncteur Ollama est ouvert
+            unavailable = unavailable_response('ollama')
+            if unavailable:
+                return unavailable
             
             # Générer la recette
-            recipe = ollama_service.generate_cocktail_recipe(
-                ingredients=ingredients,
-                style=style,
-                difficulty=difficulty
-            )
+            recipe = ollama_service.generate_cocktail_recipe(**params)
             
             if not recipe:
                 return JsonResponse({
@@ -97,19 +472,105 @@ class GenerateCocktailView(View):
                     'code': 'GENERATION_FAILED'
                 }, status=500)
             
-            # Ajouter des métadonnées
-            recipe['generated_by'] = 'Ollama'
-            recipe['model_used'] = ollama_service.model
-            recipe['generation_timestamp'] = request.META.get('HTTP_X_FORWARDED_FOR', 
-                                                            request.META.get('REMOTE_ADDR'))
+            generation_id = ollama_service.recipe_generation_id(**params)
+            return recipe_response(request, recipe, ollama_service.model, generation_id)
+        
+        except json.JSONDecodeError:
+            return JsonResponse({
+                'error': 'Format JSON invalide',
+                'code': 'INVALID_JSON'
+            }, status=400)
+        
+        except Exception as e:
+            logger.error(f"Erreur lors de la génération de recette: {e}")
+            return JsonResponse({
+                'error': 'Erreur interne du serveur',
+                'code': 'INTERNAL_ERROR'
+            }, status=500)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class StreamCocktailView(View):
+    """
+    Vue pour générer une recette de cocktail en streaming (Server-Sent Events).
+    
+    Événements émis :
+    - field : un champ de premier niveau complet ({"field": "nom", "value": ...})
+    - item : un élément de liste complet ({"field": "ingredients", "index": 0, "value": ...})
+    - recipe : la recette complète, également mise en cache
+    - error : échec de la génération
+    - done : fin du flux
+    """
+    
+    def get(self, request):
+        return self.post(request)
+    
+    def post(self, request):
+        try:
+            params, error = read_stream_params(request)
+        except json.JSONDecodeError:
+            return JsonResponse({
+                'error': 'Format JSON invalide',
+                'code': 'INVALID_JSON'
+            }, status=400)
+        if error:
+            return error
+        
+        # Échouer immédiatement si le disjoncteur Ollama est ouvert
+        unavailable = unavailable_response('ollama')
+        if unavailable:
+            return unavailable
+        
+        generation_id = ollama_service.recipe_generation_id(**params)
+        
+        def events():
+            for event, payload in ollama_service.stream_cocktail_recipe(**params):
+                if event == 'recipe':
+                    payload = streamed_recipe_payload(payload, ollama_service.model, generation_id)
+                yield format_sse(event, payload)
+            yield format_sse('done', {})
+        
+        return event_stream_response(events())
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class RefineCocktailView(View):
+    """
+    Vue pour affiner une recette générée ("moins sucré", "version sans alcool").
+    """
+    
+    def post(self, request):
+        """
+        Affine une recette en réutilisant le contexte de sa génération.
+        
+        Paramètres attendus (JSON):
+        - generation_id: Identifiant renvoyé avec la recette (ou un affinage précédent)
+        - instruction: Modification souhaitée
+        """
+        try:
+            data = json.loads(request.body)
+            params, error = parse_refinement_params(data)
+            if error:
+                return error
             
-            logger.info(f"Recette générée avec succès: {recipe.get('nom', 'Sans nom')}")
+            if ollama_service.get_generation(params['generation_id']) is None:
+                return generation_not_found_response()
             
-            return JsonResponse({
-                'success': True,
-                'recipe': recipe
-            })
+            # Échouer immédiatement si le disjoncteur Ollama est ouvert
+            unavailable = unavailable_response('ollama')
+            if unavailable:
+                return unavailable
+            
+            result = ollama_service.refine_cocktail_recipe(**params)
             
+            if not result:
+                return JsonResponse({
+                    'error': 'Impossible d\'affiner la recette',
+                    'code': 'REFINEMENT_FAILED'
+                }, status=500)
+            
+            return refinement_response(request, result, ollama_service.model)
+        
         except json.JSONDecodeError:
             return JsonResponse({
                 'error': 'Format JSON invalide',
@@ -117,7 +578,7 @@ class GenerateCocktailView(View):
             }, status=400)
         
         except Exception as e:
-            logger.error(f"Erreur lors de la génération de recette: {e}")
+            logger.error(f"Erreur lors de l'affinage de recette: {e}")
             return JsonResponse({
                 'error': 'Erreur interne du serveur',
                 'code': 'INTERNAL_ERROR'
@@ -140,96 +601,55 @@ class GenerateCocktailImageView(View):
         - style: Style de l'image (défaut: "realistic")
         - glass_type: Type de verre (défaut: "cocktail glass")
         - garnish: Garniture
+        - cocktail_id: Cocktail auquel rattacher l'image (optionnel)
+        - include_base64: Renvoyer aussi l'image en base64 (défaut: false)
+        - reproducible: Graine fixée et image réutilisée si déjà générée (cache_hit)
+        
+        L'image est renvoyée sous forme d'URL stable (image_url).
         """
         try:
-            # Vérifier la disponibilité de Stable Diffusion
-            try:
-                import requests
-                from django.conf import settings
-                
-                sd_health = requests.get(
-                    f"{getattr(settings, 'STABLE_DIFFUSION_URL', 'http://localhost:7860')}/docs",
-                    timeout=5
-                )
-                if sd_health.status_code != 200:
-                    return JsonResponse({
-                        'error': 'Service Stable Diffusion non disponible',
-                        'code': 'SD_UNAVAILABLE'
-                    }, status=503)
-            except requests.exceptions.RequestException:
-                return JsonResponse({
-                    'error': 'Service Stable Diffusion non accessible',
-                    'code': 'SD_UNREACHABLE'
-                }, status=503)
-            
-            # Parser les données JSON
+            # Parser et valider les données JSON
             data = json.loads(request.body)
+            params, error = parse_image_params(data)
+            if error:
+                return error
+            options, error = parse_image_options(data)
+            if error:
+                return error
             
-            # Récupérer les paramètres de génération
-            cocktail_name = data.get('cocktail_name', '')
-            ingredients = data.get('ingredients', [])
-            style = data.get('style', 'realistic')
-            glass_type = data.get('glass_type', 'cocktail glass')
-            garnish = data.get('garnish', '')
-            
-            if not cocktail_name and not ingredients:
-                return JsonResponse({
-                    'error': 'Nom du cocktail ou ingrédients requis',
-                    'code': 'MISSING_PARAMETERS'
-                }, status=400)
-            
-            # Générer un prompt créatif avec Ollama
-            if isinstance(ingredients, list):
-                ingredients_list = ingredients
-            else:
-                ingredients_list = [str(ingredients)] if ingredients else []
+            # Échouer immédiatement si le disjoncteur Stable Diffusion est ouvert
+            # (en mode reproductible, l'image est peut-être déjà en cache)
+            unavailable = None if options['reproducible'] else unavailable_response('stable_diffusion')
+            if unavailable:
+                return unavailable
             
-            # Utiliser Ollama pour créer un prompt artistique
-            creative_prompt = ollama_service.generate_image_prompt(
-                cocktail_name=cocktail_name,
-                ingredients=ingredients_list,
-                style=style,
-                glass_type=glass_type,
-                garnish=garnish
+            # Utiliser Ollama pour créer un prompt artistique, avec un fallback statique
+            prompt = (
+                ollama_service.generate_image_prompt(**params, reproducible=options['reproducible'])
+                or build_fallback_image_prompt(**params)
             )
+            generation_params = build_generation_params(prompt, options['reproducible'])
             
-            # Fallback si Ollama échoue
-            if not creative_prompt:
-                ingredients_str = ', '.join(ingredients_list)
-                prompt_parts = [
-                    f"A beautiful {style} photograph of a {cocktail_name} cocktail" if cocktail_name else f"A beautiful {style} cocktail",
-                    f"served in a {glass_type}",
-                    f"made with {ingredients_str}" if ingredients_str else "",
-                    f"garnished with {garnish}" if garnish else "",
-                    "professional food photography, high quality, detailed, appetizing, well-lit, clean background"
-                ]
-                prompt = ' '.join(filter(None, prompt_parts))
-            else:
-                prompt = creative_prompt
-            
-            negative_prompt = "blurry, low quality, distorted, ugly, bad anatomy, extra limbs, text, watermark, signature"
+            cached = cached_image_response(generation_params, prompt, params['cocktail_name'], **options)
+            if cached:
+                return cached
             
-            # Paramètres de génération
-            generation_params = {
-                "prompt": prompt,
-                "negative_prompt": negative_prompt,
-                "steps": 30,
-                "cfg_scale": 7.5,
-                "width": 512,
-                "height": 512,
-                "sampler_name": "Euler a",
-                "batch_size": 1,
-                "n_iter": 1,
-                "seed": -1
-            }
+            unavailable = unavailable_response('stable_diffusion')
+            if unavailable:
+                return unavailable
             
             # Appeler Stable Diffusion
             sd_response = requests.post(
-                f"{getattr(settings, 'STABLE_DIFFUSION_URL', 'http://localhost:7860')}/sdapi/v1/txt2img",
+                f"{get_stable_diffusion_url()}/sdapi/v1/txt2img",
                 json=generation_params,
                 timeout=120
             )
             
+            if sd_response.status_code >= 500:
+                health_monitor.record_failure('stable_diffusion', f"HTTP {sd_response.status_code}")
+            else:
+                health_monitor.record_success('stable_diffusion')
+            
             if sd_response.status_code != 200:
                 logger.error(f"Erreur Stable Diffusion: {sd_response.text}")
                 return JsonResponse({
@@ -237,28 +657,11 @@ class GenerateCocktailImageView(View):
                     'code': 'GENERATION_FAILED'
                 }, status=500)
             
-            result = sd_response.json()
-            
-            # Récupérer la première image générée
-            if result.get('images') and len(result['images']) > 0:
-                image_base64 = result['images'][0]
-                
-                logger.info(f"Image générée avec succès pour: {cocktail_name or 'cocktail personnalisé'}")
-                
-                return JsonResponse({
-                    'success': True,
-                    'image_base64': image_base64,
-                    'prompt_used': prompt,
-                    'parameters': generation_params,
-                    'info': result.get('info', {}),
-                    'generated_by': 'Stable Diffusion'
-                })
-            else:
-                return JsonResponse({
-                    'error': 'Aucune image générée',
-                    'code': 'NO_IMAGE_GENERATED'
-                }, status=500)
-            
+            return image_response(
+                sd_response.json(), prompt, generation_params, params['cocktail_name'],
+                **options
+            )
+        
         except json.JSONDecodeError:
             return JsonResponse({
                 'error': 'Format JSON invalide',
@@ -267,6 +670,7 @@ class GenerateCocktailImageView(View):
         
         except requests.exceptions.RequestException as e:
             logger.error(f"Erreur de connexion Stable Diffusion: {str(e)}")
+            health_monitor.record_failure('stable_diffusion', str(e))
             return JsonResponse({
                 'error': 'Service Stable Diffusion non accessible',
                 'code': 'SD_CONNECTION_ERROR'
@@ -301,12 +705,10 @@ class CocktailSuggestionsView(View):
             mood = data.get('mood', 'détendu')
             occasion = data.get('occasion', 'apéritif')
             
-            # Vérifier la disponibilité d'Ollama
-            if not ollama_service.is_available():
-                return JsonResponse({
-                    'error': 'Service Ollama indisponible',
-                    'code': 'OLLAMA_UNAVAILABLE'
-                }, status=503)
+            # Échouer immédiatement si le disjoncteur Ollama est ouvert
+            unavailable = unavailable_response('ollama')
+            if unavailable:
+                return unavailable
             
             # Obtenir les suggestions
             suggestions = ollama_service.get_cocktail_suggestions(mood, occasion)
@@ -317,19 +719,8 @@ class CocktailSuggestionsView(View):
                     'code': 'SUGGESTIONS_FAILED'
                 }, status=500)
             
-            logger.info(f"Suggestions générées pour humeur: {mood}, occasion: {occasion}")
-            
-            return JsonResponse({
-                'success': True,
-                'suggestions': suggestions,
-                'parameters': {
-                    'mood': mood,
-                    'occasion': occasion
-                },
-                'generated_by': 'Ollama',
-                'model_used': ollama_service.model
-            })
-            
+            return suggestions_response(suggestions, mood, occasion, ollama_service.model)
+        
         except json.JSONDecodeError:
             return JsonResponse({
                 'error': 'Format JSON invalide',
@@ -344,30 +735,68 @@ class CocktailSuggestionsView(View):
             }, status=500)
 
 
+def ollama_models_entry(request):
+    """
+    Liste des modèles Ollama et leur résidence, mise en cache quelques secondes.
+
+    Le résultat est gardé sur la requête, échec compris : la fonction d'ETag
+    et la vue partagent le même appel, Ollama est interrogé au plus une fois.
+
+    Returns:
+        Dictionnaire {payload, etag}, ou None si Ollama refuse la requête ou ne répond pas
+    """
+    if not hasattr(request, 'ollama_models'):
+        # Marqueur d'échec posé avant l'appel : une exception ne provoque pas de second essai
+        request.ollama_models = None
+        key = make_cache_key('ollama_models', version=get_version(OLLAMA_MODELS))
+        entry = cache.get(key)
+        if entry is None:
+            response = ollama_service.session.get(f"{ollama_service.base_url}/api/tags", timeout=10)
+            if response.status_code == 200:
+                payload = {
+                    'success': True,
+                    'models': response.json().get('models', []),
+                    'configured_model': ollama_service.model,
+                    'configured_prompt_model': ollama_service.prompt_model,
+                    'residency': model_residency.report()
+                }
+                digest = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+                entry = {'payload': payload, 'etag': f"models-{digest[:32]}"}
+                cache.set(key, entry, OLLAMA_MODELS_CACHE_TIMEOUT)
+        request.ollama_models = entry
+    return request.ollama_models
+
+
+def ollama_models_etag(request):
+    """ETag de la liste des modèles : empreinte du contenu mis en cache."""
+    try:
+        entry = ollama_models_entry(request)
+    except Exception as e:
+        logger.error(f"Erreur lors de la récupération des modèles: {e}")
+        return None
+    return entry['etag'] if entry else None
+
+
 @require_http_methods(["GET"])
+@http_cache
+@condition(etag_func=ollama_models_etag)
 def ollama_models_view(request):
     """
-    Vue pour lister les modèles Ollama disponibles.
+    Vue pour lister les modèles Ollama disponibles et leur résidence en mémoire (/api/ps).
+    
+    Ollama n'est interrogé qu'une fois par OLLAMA_MODELS_CACHE_TIMEOUT
+    secondes ; un client à jour (If-None-Match) reçoit un 304.
     """
     try:
-        import requests
-        
-        response = requests.get(f"{ollama_service.base_url}/api/tags", timeout=10)
-        
-        if response.status_code == 200:
-            models_data = response.json()
-            return JsonResponse({
-                'success': True,
-                'models': models_data.get('models', []),
-                'configured_model': ollama_service.model,
-                'configured_prompt_model': ollama_service.prompt_model
-            })
+        entry = ollama_models_entry(request)
+        if entry is not None:
+            return JsonResponse(entry['payload'])
         else:
             return JsonResponse({
                 'error': 'Impossible de récupérer la liste des modèles',
                 'code': 'MODELS_FETCH_FAILED'
             }, status=500)
-            
+    
     except Exception as e:
         logger.error(f"Erreur lors de la récupération des modèles: {e}")
         return JsonResponse({
@@ -3,6 +3,11 @@ ASGI config for mixologue_improved project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Set ``ASYNC_VIEWS=True`` to route the generation endpoints to the asyncio
+views in ``cocktails.views_async``, e.g.::
+
+    ASYNC_VIEWS=True gunicorn -k uvicorn.workers.UvicornWorker mixologue_improved.asgi:application
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -14,3 +19,13 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mixologue_improved.settings")
 
 application = get_asgi_application()
+
+# Préchargement des modèles Ollama (MODEL_WARMUP_ON_STARTUP)
+from cocktails.residency import model_residency  # noqa: E402
+
+model_residency.ensure_started()
+
+# Reprise des tâches de génération interrompues par le redémarrage (JOB_RUNNER=thread)
+from cocktails.jobs import job_pool  # noqa: E402
+
+job_pool.ensure_started()
@@ -135,7 +135,18 @@ STATICFILES_DIRS = [
 
 # Media files
 MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+MEDIA_ROOT = os.getenv('MEDIA_ROOT', os.path.join(BASE_DIR, 'media'))  # Images générées (cocktails/images/)
+
+# Images reproductibles : graine dérivée du prompt et réutilisation des images déjà générées
+IMAGE_REPRODUCIBLE_DEFAULT = os.getenv('IMAGE_REPRODUCIBLE_DEFAULT', 'False').lower() == 'true'
+IMAGE_CACHE_TIMEOUT = int(os.getenv('IMAGE_CACHE_TIMEOUT', str(30 * 24 * 3600)))  # Secondes (30 jours)
+
+# Déclinaisons des images (miniatures WebP/AVIF), produites dans un pool de processus
+IMAGE_VARIANT_SIZES = {'thumb': 128, 'card': 256}  # Côté maximal en pixels
+IMAGE_VARIANT_PREGENERATE = [('thumb', 'webp'), ('card', 'webp')]  # Préparées dès l'enregistrement
+IMAGE_VARIANT_WORKERS = int(os.getenv('IMAGE_VARIANT_WORKERS', '2'))
+IMAGE_VARIANT_QUALITY = int(os.getenv('IMAGE_VARIANT_QUALITY', '80'))
+IMAGE_VARIANT_TIMEOUT = int(os.getenv('IMAGE_VARIANT_TIMEOUT', '30'))  # Attente maximale d'un rendu à la demande
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -145,6 +156,133 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # OpenAI Configuration
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 
+# Ollama Configuration
+OLLAMA_URL = os.getenv('OLLAMA_URL', 'http://ollama:11434')
+OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'llama3.2:latest')
+OLLAMA_PROMPT_MODEL = os.getenv('OLLAMA_PROMPT_MODEL', 'llama3.2:3b')
+OLLAMA_TIMEOUT = int(os.getenv('OLLAMA_TIMEOUT', '60'))
+OLLAMA_TEMPERATURE = float(os.getenv('OLLAMA_TEMPERATURE', '0.8'))
+OLLAMA_MAX_TOKENS = int(os.getenv('OLLAMA_MAX_TOKENS', '2000'))
+
+# Conversation : durée de maintien du modèle (et de son cache KV) en mémoire
+# après une génération, et durée de conservation des contextes d'affinage
+OLLAMA_KEEP_ALIVE = os.getenv('OLLAMA_KEEP_ALIVE', '30m')
+REFINEMENT_CONTEXT_TIMEOUT = int(os.getenv('REFINEMENT_CONTEXT_TIMEOUT', '3600'))
+
+# Résidence des modèles : modèles préchargés et gardés en mémoire par Ollama,
+# au format "modèle=keep_alive" séparés par des virgules (-1 = jamais déchargé)
+OLLAMA_RESIDENT_MODELS = dict(
+    item.strip().rsplit('=', 1)
+    for item in os.getenv('OLLAMA_RESIDENT_MODELS', ','.join([
+        f"{OLLAMA_MODEL}={OLLAMA_KEEP_ALIVE}",
+        f"{OLLAMA_PROMPT_MODEL}={OLLAMA_KEEP_ALIVE}",
+        f"llama3.1:latest={OLLAMA_KEEP_ALIVE}",
+        f"brxce/stable-diffusion-prompt-generator={OLLAMA_KEEP_ALIVE}",
+    ])).split(',')
+    if '=' in item
+)
+MODEL_WARMUP_ON_STARTUP = os.getenv('MODEL_WARMUP_ON_STARTUP', 'False').lower() == 'true'  # Thread de préchargement dans les workers
+MODEL_RESIDENCY_INTERVAL = int(os.getenv('MODEL_RESIDENCY_INTERVAL', '60'))  # Secondes entre deux vérifications de /api/ps
+MODEL_WARMUP_TIMEOUT = int(os.getenv('MODEL_WARMUP_TIMEOUT', '300'))  # Durée maximale d'un chargement
+
+# Pool de connexions HTTP keep-alive partagé par le processus
+OLLAMA_POOL_CONNECTIONS = int(os.getenv('OLLAMA_POOL_CONNECTIONS', '4'))  # Nombre d'hôtes gardés en pool
+OLLAMA_POOL_SIZE = int(os.getenv('OLLAMA_POOL_SIZE', '10'))  # Connexions keep-alive conservées par hôte
+# False : au-delà de OLLAMA_POOL_SIZE appels simultanés, des connexions
+# supplémentaires sont ouvertes puis fermées après usage (ce n'est pas un
+# plafond) ; True : les appels en trop attendent qu'une connexion se libère
+OLLAMA_POOL_BLOCK = os.getenv('OLLAMA_POOL_BLOCK', 'False').lower() == 'true'
+
+# Retry borné avec backoff exponentiel bruité (erreurs de connexion et 5xx)
+OLLAMA_MAX_RETRIES = int(os.getenv('OLLAMA_MAX_RETRIES', '2'))
+OLLAMA_RETRY_BACKOFF = float(os.getenv('OLLAMA_RETRY_BACKOFF', '0.5'))
+OLLAMA_RETRY_JITTER = float(os.getenv('OLLAMA_RETRY_JITTER', '0.5'))
+
+# Cache
+# - default : cache SQLite persistant, partagé par tous les workers de l'hôte
+#   (état de santé, verrous single-flight, résultats)
+# - llm : LRU en mémoire du processus devant le cache partagé, pour les
+#   résultats des modèles
+CACHE_SQLITE_PATH = os.getenv('CACHE_SQLITE_PATH', str(BASE_DIR / 'cache.sqlite3'))
+CACHES = {
+    'default': {
+        'BACKEND': 'cocktails.cache_backends.SQLiteCache',
+        'LOCATION': CACHE_SQLITE_PATH,
+        'TIMEOUT': 3600,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '10000')),
+        },
+    },
+    'llm': {
+        'BACKEND': 'cocktails.cache_backends.TieredCache',
+        'LOCATION': 'default',
+        'TIMEOUT': 3600,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_LOCAL_MAX_ENTRIES', '500')),  # Taille du LRU par processus
+            'LOCAL_TIMEOUT': int(os.getenv('CACHE_LOCAL_TIMEOUT', '300')),  # Secondes max en mémoire locale
+        },
+    },
+}
+
+# Réutilisation des demandes quasi identiques (désactivée si le seuil est vide)
+SIMILAR_REQUEST_THRESHOLD = float(os.getenv('SIMILAR_REQUEST_THRESHOLD')) if os.getenv('SIMILAR_REQUEST_THRESHOLD') else None
+SIMILARITY_INDEX_MAX_DOCS = int(os.getenv('SIMILARITY_INDEX_MAX_DOCS', '5000'))  # Demandes gardées en mémoire
+
+# Cocktails similaires (matrice cocktail x ingrédient, NumPy/SciPy)
+RECOMMENDATION_INDEX_PATH = os.getenv('RECOMMENDATION_INDEX_PATH', str(BASE_DIR / 'recommendations.npz'))
+RECOMMENDATION_MERGE_ROWS = int(os.getenv('RECOMMENDATION_MERGE_ROWS', '1000'))  # Ajouts avant réécriture du fichier
+
+# Tâches de génération en arrière-plan
+# JOB_RUNNER=thread : le serveur web exécute les tâches dans un pool de threads
+# JOB_RUNNER=external : seule la commande run_generation_jobs les exécute
+JOB_RUNNER = os.getenv('JOB_RUNNER', 'thread')
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))  # Tâches simultanées par processus
+JOB_STALE_AFTER = int(os.getenv('JOB_STALE_AFTER', '600'))  # Secondes avant reprise d'une tâche interrompue
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '0.5'))
+# Attente maximale de api/jobs/<id>/wait/ : sous WSGI chaque attente occupe un
+# worker du serveur, d'où 0 par défaut (réponse immédiate, le client interroge)
+JOB_LONG_POLL_TIMEOUT = int(os.getenv('JOB_LONG_POLL_TIMEOUT', '30' if os.getenv('ASYNC_VIEWS', 'False').lower() == 'true' else '0'))
+
+# Génération par lots (menus partenaires)
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', '50'))
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', '4'))  # Appels simultanés aux fournisseurs par lot
+BULK_MAX_IDS = int(os.getenv('BULK_MAX_IDS', '10000'))  # Identifiants par requête de /api/cocktails/bulk/
+
+# Historique : fragments de page mis en cache par version des données,
+# total servi depuis le cache et recalculé en arrière-plan
+HISTORY_CACHE_TIMEOUT = int(os.getenv('HISTORY_CACHE_TIMEOUT', '3600'))
+COUNT_CACHE_MAX_AGE = int(os.getenv('COUNT_CACHE_MAX_AGE', '300'))  # Secondes avant recalcul du total
+COUNT_ESTIMATE_THRESHOLD = int(os.getenv('COUNT_ESTIMATE_THRESHOLD', '100000'))  # PostgreSQL : estimation au-delà
+
+# Lectures HTTP conditionnelles (ETag versionné, 304 sans lecture de la base)
+HTTP_CACHE_MAX_AGE = int(os.getenv('HTTP_CACHE_MAX_AGE', '0'))  # Navigateur : secondes avant revalidation
+HTTP_CACHE_SHARED_MAX_AGE = int(os.getenv('HTTP_CACHE_SHARED_MAX_AGE', '0'))  # Proxy : secondes avant revalidation
+OLLAMA_MODELS_CACHE_TIMEOUT = int(os.getenv('OLLAMA_MODELS_CACHE_TIMEOUT', '30'))  # Liste des modèles Ollama
+
+# Coalescence des générations identiques (single-flight)
+SINGLE_FLIGHT_LOCK_TIMEOUT = int(os.getenv('SINGLE_FLIGHT_LOCK_TIMEOUT', str(OLLAMA_TIMEOUT + 30)))
+SINGLE_FLIGHT_POLL_INTERVAL = float(os.getenv('SINGLE_FLIGHT_POLL_INTERVAL', '0.25'))
+
+# Moniteur de santé des dépendances IA et disjoncteur
+HEALTH_MONITOR_ENABLED = os.getenv('HEALTH_MONITOR_ENABLED', 'True').lower() == 'true'
+HEALTH_CHECK_INTERVAL = int(os.getenv('HEALTH_CHECK_INTERVAL', '15'))  # Secondes entre deux sondes
+HEALTH_CHECK_TIMEOUT = float(os.getenv('HEALTH_CHECK_TIMEOUT', '5'))
+CIRCUIT_BREAKER_THRESHOLD = int(os.getenv('CIRCUIT_BREAKER_THRESHOLD', '3'))  # Échecs consécutifs avant ouverture
+CIRCUIT_BREAKER_COOLDOWN = int(os.getenv('CIRCUIT_BREAKER_COOLDOWN', '30'))  # Secondes avant une nouvelle tentative
+
+# Registre des fournisseurs de génération (Ollama, OpenAI, démo)
+PROVIDER_STATS_WINDOW = int(os.getenv('PROVIDER_STATS_WINDOW', '50'))  # Appels pris en compte par fournisseur
+PROVIDER_MIN_SAMPLES = int(os.getenv('PROVIDER_MIN_SAMPLES', '5'))  # Mesures minimales avant classement
+PROVIDER_MAX_ERROR_RATE = float(os.getenv('PROVIDER_MAX_ERROR_RATE', '0.5'))  # Au-delà, le fournisseur est ignoré
+PROVIDER_PROBATION_INTERVAL = int(os.getenv('PROVIDER_PROBATION_INTERVAL', '60'))  # Secondes avant une nouvelle chance
+
+# Vues de génération asyncio (déploiement ASGI via mixologue_improved.asgi)
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False').lower() == 'true'
+
+# Stable Diffusion Configuration
+STABLE_DIFFUSION_URL = os.getenv('STABLE_DIFFUSION_URL', 'http://localhost:7860')
+
 # Security settings
 if not DEBUG:
     SECURE_BROWSER_XSS_FILTER = True
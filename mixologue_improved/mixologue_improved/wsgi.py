@@ -14,3 +14,13 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mixologue_improved.settings")
 
 application = get_wsgi_application()
+
+# Préchargement des modèles Ollama (MODEL_WARMUP_ON_STARTUP)
+from cocktails.residency import model_residency  # noqa: E402
+
+model_residency.ensure_started()
+
+# Reprise des tâches de génération interrompues par le redémarrage (JOB_RUNNER=thread)
+from cocktails.jobs import job_pool  # noqa: E402
+
+job_pool.ensure_started()